@@ -0,0 +1,186 @@
+import ast
+from pathlib import Path
+from typing import Dict, Any
+
+import metrics
+import semantic
+import duplication
+import call_graph
+import perf_smells
+
+_BLOCK_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+def collect_import_refs(tree: ast.AST) -> Dict[str, Any]:
+    """
+    Collects everything the cross-reference pass needs from a file in a single walk:
+    'from' imports, plain imports and the attributes accessed on names bound by plain imports.
+    """
+    import_froms = []
+    imports = []
+    attr_refs = {}
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom):
+            import_froms.append({
+                "module": node.module,
+                "level": node.level,
+                "names": [alias.name for alias in node.names]
+            })
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                imports.append({"name": alias.name, "alias": alias.asname or alias.name.split('.')[-1]})
+        elif isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+            attr_refs.setdefault(node.value.id, set()).add(node.attr)
+
+    # Only attribute accesses on imported module aliases can resolve to another project file
+    aliases = {imp["alias"] for imp in imports}
+    return {
+        "import_froms": import_froms,
+        "imports": imports,
+        "attr_refs": {name: sorted(attrs) for name, attrs in attr_refs.items() if name in aliases}
+    }
+
+def module_names(rel_path: Path):
+    """
+    Returns every dotted name a project file can be imported as, from its full package path down
+    to its bare module name, since the project may sit on sys.path at any of those levels.
+    """
+    parts = list(rel_path.with_suffix("").parts)
+    if parts and parts[-1] == "__init__":
+        parts.pop()
+    return [".".join(parts[i:]) for i in range(len(parts))]
+
+def build_module_index(files):
+    """
+    Maps every dotted module name to a project file, given (key, path relative to the project
+    root) pairs. A file's full dotted path wins over shorter aliases of deeper files
+    (so `subprocess` is the top-level module, not `asyncio/subprocess.py`); remaining ties go
+    to the shallower, then alphabetically first, file so the index does not depend on walk order.
+    """
+    module_to_file = {}
+    ranks = {}
+    for key, rel_path in files:
+        names = module_names(rel_path)
+        for depth, mod_name in enumerate(names):
+            rank = (depth > 0, len(names), rel_path.as_posix())
+            if mod_name not in ranks or rank < ranks[mod_name]:
+                ranks[mod_name] = rank
+                module_to_file[mod_name] = key
+    return module_to_file
+
+def module_resolver(rel_path: Path, module_to_file: Dict[str, Any]):
+    """
+    Returns a resolve(mod_name, level) function that maps an import statement in the file at
+    rel_path to its entry in module_to_file (None when the module is not part of the project).
+
+    Absolute imports in a file outside any package are looked up next to the file first, since a
+    script's own directory is on sys.path; otherwise they go straight to the global index.
+    """
+    package_parts = list(rel_path.parts)[:-1]
+    in_package = not package_parts or ".".join(package_parts) in module_to_file
+
+    def resolve(mod_name, level=0):
+        if level > 0:
+            # Relative imports climb one package per extra dot
+            rel_parts = package_parts[:max(len(package_parts) - (level - 1), 0)]
+            return module_to_file.get(".".join(rel_parts + (mod_name.split(".") if mod_name else [])))
+        if not in_package:
+            target = module_to_file.get(".".join(package_parts + [mod_name]))
+            if target is not None:
+                return target
+        return module_to_file.get(mod_name)
+
+    return resolve
+
+def resolve_import_refs(source, rel_path: Path, refs: Dict[str, Any], module_to_file: Dict[str, Any]):
+    """
+    Resolves the import edges of one file (see collect_import_refs) against a module index and
+    yields (target, name) pairs: names pulled in with 'from' imports ('*' for star imports) and
+    attributes accessed on plain-imported module aliases. source is the file's own entry in
+    module_to_file; edges back into it are skipped.
+    """
+    resolve = module_resolver(rel_path, module_to_file)
+    resolved = {}
+
+    for imp in refs["import_froms"]:
+        key = (imp["module"], imp["level"])
+        if key not in resolved:
+            resolved[key] = resolve(imp["module"], imp["level"])
+
+        target = resolved[key]
+        if target is not None and target != source:
+            for name in imp["names"]:
+                yield target, name
+
+    attr_refs = refs["attr_refs"]
+    for imp in refs["imports"]:
+        attrs = attr_refs.get(imp["alias"])
+        if not attrs:
+            continue
+        target = resolve(imp["name"])
+        if target is not None and target != source:
+            # Attribute accesses on the module alias (e.g. `utils.helper`) count as usages
+            for attr in attrs:
+                yield target, attr
+
+def analyze_source(file_path: str, code: str, use_globals=False, use_duplicates=False, use_imports=False,
+                   use_similarity=False, fragment_lines=None, use_calls=False, use_perf=False) -> Dict[str, Any]:
+    """
+    Parses a file once and derives every per-file result identify.py needs from that single tree:
+    block complexity and LLOC, global variables, class structure, semantic relevance,
+    import edges, (with use_calls) call graph references, (with use_perf) performance smells,
+    normalized duplicate hashes, (with use_similarity) MinHash signatures and (with
+    fragment_lines) hashed statement fragments of at least that many lines.
+    """
+    try:
+        tree = ast.parse(code)
+    except Exception:
+        tree = None
+
+    if tree is None:
+        # Unparsable files yield the same neutral results as the individual analyzers
+        func_metrics = []
+        globals_list = semantic.detect_global_variables(code)
+        class_info = semantic.analyze_class_structure(code)
+        relevance = semantic.evaluate_semantic_relevance(file_path, code)
+        import_refs = {"import_froms": [], "imports": [], "attr_refs": {}}
+        call_refs = call_graph.collect_references(ast.Module(body=[], type_ignores=[]))
+    else:
+        func_metrics = metrics.get_function_metrics(code, tree=tree)
+        globals_list = semantic.detect_global_variables(code, tree=tree)
+        class_info = semantic.analyze_class_structure(code, tree=tree)
+        relevance = semantic.evaluate_semantic_relevance(file_path, code, tree=tree)
+        import_refs = collect_import_refs(tree) if use_imports else None
+        call_refs = call_graph.collect_references(tree) if use_calls else None
+
+    result = {
+        "func_metrics": func_metrics,
+        "semantic_score": semantic.get_semantic_slob_score(file_path, code, globals_list, class_info, relevance),
+        "semantic_info": relevance,
+        "global_vars": globals_list if use_globals else []
+    }
+    if use_imports:
+        result["import_refs"] = import_refs
+    if use_calls:
+        result["call_refs"] = call_refs
+    if use_perf:
+        result["perf_smells"] = perf_smells.detect_perf_smells(tree) if tree is not None else []
+    if fragment_lines:
+        result["fragments"] = duplication.hash_fragments(tree, fragment_lines) if tree is not None else []
+
+    if use_duplicates:
+        # Hashing normalizes nodes in place, so it has to be the last consumer of the tree
+        nodes_by_line = {}
+        if tree is not None:
+            nodes_by_line = {node.lineno: node for node in ast.walk(tree) if isinstance(node, _BLOCK_NODES)}
+        for m in func_metrics:
+            node = nodes_by_line.get(m["line"])
+            if node is not None:
+                normalized = duplication.normalize_block(node, m["raw_code"], m["end_line"])
+            else:
+                normalized = duplication.normalize_code(m["raw_code"])
+            m["code_hash"] = duplication.hash_normalized(normalized)
+            if use_similarity:
+                m["minhash"] = duplication.get_minhash(normalized)
+
+    return result
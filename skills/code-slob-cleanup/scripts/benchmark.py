@@ -9,12 +9,15 @@
 import time
 import os
 import sys
+import random
+import string
+import tracemalloc
 
 import inspect
 import numpy as np
 import matplotlib.pyplot as plt
 import json
-from typing import Callable, List, Any, Dict
+from typing import Callable, List, Any, Dict, Tuple
 from pathlib import Path
 from hypothesis import given, settings, Phase, HealthCheck
 import hypothesis.strategies as st
@@ -26,7 +29,7 @@ verification_root = current_file.parents[1]
 sys.path.insert(0, str(project_root))
 sys.path.insert(0, str(verification_root))
 
-from common import load_module_from_path, get_common_functions, get_common_classes, infer_strategy, smart_infer_arg_strategies, get_display_name
+from common import load_module_from_path, get_common_functions, get_common_classes, get_common_methods, get_public_functions, infer_strategy, smart_infer_arg_strategies, get_display_name, load_job_config, emit_result
 
 def generate_benchmark_inputs(func: Callable, num_inputs: int = 100, validate: bool = True, config: Dict[str, Any] = None) -> List[Any]:
     """Generates a list of input tuples for the given function using Hypothesis."""
@@ -61,12 +64,38 @@ def generate_benchmark_inputs(func: Callable, num_inputs: int = 100, validate: b
             
     return valid_inputs
 
-def measure_execution_time(func: Callable, input_args_list: List[tuple], num_runs: int = 50) -> List[float]:
-    """Measures execution time of func(*args) for the list of inputs."""
-    env_runs = os.getenv("BENCHMARK_RUNS")
-    if env_runs:
-        num_runs = int(env_runs)
-        
+# Each timing sample repeats the inputs until it lasts this long, so sub-microsecond functions are
+# not lost in perf_counter resolution and call overhead
+MIN_SAMPLE_TIME = max(2e-4, 10000 * time.get_clock_info("perf_counter").resolution)
+MAX_BATCH_SIZE = 1 << 16
+
+def _time_batch(func: Callable, input_args_list: List[tuple], batch_size: int) -> float:
+    """Returns the seconds spent calling func(*args) for every input, batch_size times over."""
+    start = time.perf_counter()
+    for _ in range(batch_size):
+        for args in input_args_list:
+            try:
+                func(*args)
+            except Exception:
+                pass
+    return time.perf_counter() - start
+
+def calibrate_batch_size(func: Callable, input_args_list: List[tuple], min_time: float = None) -> int:
+    """Doubles the number of passes over the inputs until one sample takes at least min_time (MIN_SAMPLE_TIME)."""
+    min_time = MIN_SAMPLE_TIME if min_time is None else min_time
+    batch_size = 1
+    while batch_size < MAX_BATCH_SIZE and _time_batch(func, input_args_list, batch_size) < min_time:
+        batch_size *= 2
+    return batch_size
+
+def measure_execution_time(func: Callable, input_args_list: List[tuple], num_runs: int = None) -> List[float]:
+    """
+    Measures execution time of func(*args) for the list of inputs, in seconds per pass over the
+    inputs. num_runs defaults to BENCHMARK_RUNS, or 50.
+    """
+    if num_runs is None:
+        num_runs = int(os.getenv("BENCHMARK_RUNS") or 50)
+
     times = []
     for _ in range(5):
         for args in input_args_list:
@@ -75,20 +104,299 @@ def measure_execution_time(func: Callable, input_args_list: List[tuple], num_run
             except:
                 pass
 
+    batch_size = calibrate_batch_size(func, input_args_list)
     for _ in range(num_runs):
-        start = time.perf_counter()
+        times.append(_time_batch(func, input_args_list, batch_size) / batch_size)
+        
+    return times
+
+def measure_interleaved(orig_func: Callable, ref_func: Callable, input_args_list: List[tuple], num_runs: int = None,
+                        order: str = None) -> Tuple[List[float], List[float]]:
+    """
+    Times both versions under the same conditions by alternating their samples, so drift in CPU
+    frequency, thermal state or background load hits both alike. order is 'abba' (original
+    first on even runs, refactored first on odd ones) or 'random' (a coin flip per run), from
+    BENCHMARK_ORDER by default. Each version repeats the inputs its own calibrated number of
+    times, so one sample of either lasts about MIN_SAMPLE_TIME however far apart their speeds are.
+    num_runs defaults to BENCHMARK_RUNS, or 50. Returns (original times, refactored times) in
+    seconds per pass over the inputs.
+    """
+    if num_runs is None:
+        num_runs = int(os.getenv("BENCHMARK_RUNS") or 50)
+    order = order or os.getenv("BENCHMARK_ORDER", "abba")
+
+    for func in (orig_func, ref_func):
+        _time_batch(func, input_args_list, 5)
+    orig_batch = calibrate_batch_size(orig_func, input_args_list)
+    ref_batch = calibrate_batch_size(ref_func, input_args_list)
+
+    rng = random.Random(0)
+    orig_times, ref_times = [], []
+    for i in range(num_runs):
+        pair = [(orig_func, orig_batch, orig_times), (ref_func, ref_batch, ref_times)]
+        if (order == "random" and rng.random() < 0.5) or (order != "random" and i % 2):
+            pair.reverse()
+        for func, batch_size, times in pair:
+            times.append(_time_batch(func, input_args_list, batch_size) / batch_size)
+    return orig_times, ref_times
+
+import multiprocessing
+from queue import Empty
+
+def measure_memory(func: Callable, input_args_list: List[tuple]) -> Dict[str, int]:
+    """
+    Runs func(*args) once per input under tracemalloc and returns, in bytes, the largest peak of
+    a single call ("peak"), the per-call peaks summed over all inputs ("allocated", a lower bound
+    on the bytes allocated) and what the calls left allocated ("retained", e.g. caches). Peaks
+    are measured from the memory in use before each call, so the inputs themselves do not count.
+    """
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        peak = allocated = 0
+        start_size, _ = tracemalloc.get_traced_memory()
         for args in input_args_list:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
             try:
                 func(*args)
             except Exception:
                 pass
-        end = time.perf_counter()
-        times.append(end - start)
-        
-    return times
+            _, call_peak = tracemalloc.get_traced_memory()
+            peak = max(peak, call_peak - before)
+            allocated += call_peak - before
+        end_size, _ = tracemalloc.get_traced_memory()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return {"peak": peak, "allocated": allocated, "retained": max(0, end_size - start_size)}
+
+def report_memory(display_name: str, orig_func: Callable, ref_func: Callable, inputs: List[tuple]):
+    """Prints the memory use of both versions over the same inputs as a [MEMORY] line and returns both measure_memory results."""
+    orig = measure_memory(orig_func, inputs)
+    ref = measure_memory(ref_func, inputs)
+    print(f"[MEMORY] {display_name}: orig {orig['peak'] / 1024:.1f} KiB peak, ref {ref['peak'] / 1024:.1f} KiB peak "
+          f"(allocated {orig['allocated'] / 1024:.1f}/{ref['allocated'] / 1024:.1f} KiB, "
+          f"retained {orig['retained'] / 1024:.1f}/{ref['retained'] / 1024:.1f} KiB)")
+    return orig, ref
+
+
+# Speedup statistics: Tukey fences for outliers, percentile bootstrap for the confidence
+# interval of the ratio of means and a permutation test for the difference of means
+OUTLIER_IQR_FACTOR = 1.5
+BOOTSTRAP_RESAMPLES = 10000
+PERMUTATION_RESAMPLES = 5000
+CONFIDENCE_LEVEL = 0.95
+SIGNIFICANCE_LEVEL = 0.05
+
+def trim_outliers(times) -> np.ndarray:
+    """Drops samples outside the Tukey fences (OUTLIER_IQR_FACTOR interquartile ranges past the quartiles)."""
+    times = np.asarray(times, dtype=float)
+    q1, q3 = np.percentile(times, [25, 75])
+    margin = OUTLIER_IQR_FACTOR * (q3 - q1)
+    return times[(times >= q1 - margin) & (times <= q3 + margin)]
+
+def speedup_statistics(orig_times, ref_times, seed: int = 0) -> Dict[str, Any]:
+    """
+    Compares two timing samples after outlier trimming and returns the speedup (ratio of mean
+    times), its bootstrap confidence interval, the permutation test p-value and a verdict:
+    'faster' or 'slower' when the difference is significant and the whole interval lies on
+    one side of 1.0x, else 'inconclusive'.
+    """
+    rng = np.random.default_rng(seed)
+    orig = trim_outliers(orig_times)
+    ref = trim_outliers(ref_times)
+    ratio = orig.mean() / ref.mean()
+
+    # Resampled means of both samples, one bootstrap replicate per row
+    orig_means = orig[rng.integers(0, len(orig), size=(BOOTSTRAP_RESAMPLES, len(orig)))].mean(axis=1)
+    ref_means = ref[rng.integers(0, len(ref), size=(BOOTSTRAP_RESAMPLES, len(ref)))].mean(axis=1)
+    tail = (1 - CONFIDENCE_LEVEL) / 2 * 100
+    ci_low, ci_high = np.percentile(orig_means / ref_means, [tail, 100 - tail])
+
+    pooled = np.concatenate([orig, ref])
+    shuffled = rng.permuted(np.broadcast_to(pooled, (PERMUTATION_RESAMPLES, len(pooled))), axis=1)
+    diffs = shuffled[:, :len(orig)].mean(axis=1) - shuffled[:, len(orig):].mean(axis=1)
+    observed = abs(orig.mean() - ref.mean())
+    p_value = (np.count_nonzero(np.abs(diffs) >= observed) + 1) / (PERMUTATION_RESAMPLES + 1)
+
+    verdict = "inconclusive"
+    if p_value < SIGNIFICANCE_LEVEL and ci_low > 1:
+        verdict = "faster"
+    elif p_value < SIGNIFICANCE_LEVEL and ci_high < 1:
+        verdict = "slower"
+    return {"speedup": float(ratio), "ci_low": float(ci_low), "ci_high": float(ci_high),
+            "p_value": float(p_value), "verdict": verdict}
+
+def compare_timings(orig_times, ref_times):
+    """Returns speedup_statistics of the two samples, or None when the refactored mean is zero."""
+    if trim_outliers(ref_times).mean() <= 0:
+        return None
+    return speedup_statistics(orig_times, ref_times)
+
+def format_confidence_interval(stats: Dict[str, Any]) -> str:
+    """Formats the bootstrap interval of speedup_statistics results: '95% CI 1.41x-1.63x'."""
+    return f"{CONFIDENCE_LEVEL:.0%} CI {stats['ci_low']:.2f}x-{stats['ci_high']:.2f}x"
+
+def format_statistics(stats) -> str:
+    """Formats compare_timings results: '1.52x (95% CI 1.41x-1.63x, p=0.001, faster)', or 'N/A' for None."""
+    if stats is None:
+        return "N/A"
+    return f"{stats['speedup']:.2f}x ({format_confidence_interval(stats)}, p={stats['p_value']:.3f}, {stats['verdict']})"
+
+def format_speedup(orig_times, ref_times) -> str:
+    """Formats the [SPEEDUP] value of two timing samples (see format_statistics)."""
+    return format_statistics(compare_timings(orig_times, ref_times))
+
+
+# Input sizes for the scaling benchmark (BENCHMARK_SCALING=1): a geometric series, so the
+# points are evenly spaced on a log-log plot
+SCALING_SIZES = [2 ** k for k in range(4, 13)]
+# Growing stops once a single call takes longer than this many seconds
+SCALING_TIME_BUDGET = 0.2
+SCALING_MIN_POINTS = 3
+SCALING_RUNS = 5
+# Seconds the scaling fit of one function may take; past it only the scaling report is dropped
+SCALING_TIMEOUT = 30
+
+def _is_sized(value) -> bool:
+    return isinstance(value, (str, list, tuple, dict, set, frozenset))
+
+def _scaled_elements(items, n: int, rng: random.Random) -> list:
+    """Returns n elements resembling items: fresh random ints/strings when items are all of that type, else items cycled."""
+    if not items or all(isinstance(x, int) and not isinstance(x, bool) for x in items):
+        return [rng.randint(-n, n) for _ in range(n)]
+    if all(isinstance(x, str) for x in items):
+        return ["".join(rng.choices(string.ascii_letters, k=rng.randint(1, 8))) for _ in range(n)]
+    return [items[i % len(items)] for i in range(n)]
+
+def scale_input(args: tuple, n: int, seed: int = 0) -> tuple:
+    """
+    Returns a copy of an argument tuple with every sized argument (str, list, tuple, set, dict)
+    grown to n elements. Non-negative ints are taken to be counts and set to n, but only when
+    the call has no sized argument, since next to a container an int is usually an index or a key.
+    """
+    rng = random.Random(seed)
+    has_sized = any(_is_sized(a) for a in args)
+    scaled = []
+    for arg in args:
+        if isinstance(arg, str):
+            alphabet = arg or string.ascii_letters
+            scaled.append("".join(rng.choice(alphabet) for _ in range(n)))
+        elif isinstance(arg, dict):
+            keys = list(arg)
+            if keys and all(isinstance(k, str) for k in keys):
+                new_keys = [f"{keys[i % len(keys)]}{i}" for i in range(n)]
+            else:
+                new_keys = list(range(n))
+            values = _scaled_elements(list(arg.values()), n, rng)
+            scaled.append(dict(zip(new_keys, values)))
+        elif isinstance(arg, (list, tuple, set, frozenset)):
+            scaled.append(type(arg)(_scaled_elements(list(arg), n, rng)))
+        elif isinstance(arg, int) and not isinstance(arg, bool) and arg >= 0 and not has_sized:
+            scaled.append(n)
+        else:
+            scaled.append(arg)
+    return tuple(scaled)
+
+def is_scalable(args: tuple) -> bool:
+    """Whether scale_input changes anything about this argument tuple."""
+    return any(_is_sized(a) or (isinstance(a, int) and not isinstance(a, bool) and a >= 0) for a in args)
+
+def fit_complexity_exponent(sizes: List[int], times: List[float]) -> float:
+    """Fits time ~ c * n^k by least squares on the log-log points and returns k."""
+    slope, _ = np.polyfit(np.log(sizes), np.log(np.maximum(times, 1e-9)), 1)
+    return float(slope)
+
+def measure_scaling(func: Callable, base_args: tuple, sizes: List[int] = None) -> Dict[int, float]:
+    """
+    Times func on base_args scaled to each size in turn and returns {size: best seconds per call}.
+    Stops at the first size that raises or whose best call exceeds SCALING_TIME_BUDGET.
+    """
+    timings = {}
+    for n in sizes or SCALING_SIZES:
+        args = scale_input(base_args, n)
+        try:
+            func(*args)
+        except Exception:
+            break
+        best = float(np.min(measure_execution_time(func, [args], num_runs=SCALING_RUNS)))
+        timings[n] = best
+        if best > SCALING_TIME_BUDGET:
+            break
+    return timings
+
+def report_scaling(display_name: str, orig_func: Callable, ref_func: Callable, inputs: List[tuple]):
+    """
+    Prints the empirical complexity exponents of both versions as a [SCALING] line and returns
+    them as (orig, ref), or None when they could not be fitted.
+    """
+    base_args = next((args for args in inputs if is_scalable(args)), None)
+    if base_args is None:
+        print(f"[SKIP] {display_name} (Scaling: no sized arguments)")
+        return None
+    orig_timings = measure_scaling(orig_func, base_args)
+    ref_timings = measure_scaling(ref_func, base_args, sizes=list(orig_timings))
+    sizes = [n for n in orig_timings if n in ref_timings]
+    if len(sizes) < SCALING_MIN_POINTS:
+        print(f"[SKIP] {display_name} (Scaling: only {len(sizes)} input sizes could be timed)")
+        return None
+    orig_exp = fit_complexity_exponent(sizes, [orig_timings[n] for n in sizes])
+    ref_exp = fit_complexity_exponent(sizes, [ref_timings[n] for n in sizes])
+    print(f"[SCALING] {display_name}: orig ~n^{orig_exp:.1f}, ref ~n^{ref_exp:.1f}")
+    return float(orig_exp), float(ref_exp)
+
+def _scaling_worker(display_name, orig_func, ref_func, inputs, result_queue):
+    try:
+        result_queue.put(report_scaling(display_name, orig_func, ref_func, inputs))
+    except Exception as e:
+        print(f"[SKIP] {display_name} (Scaling: {e})")
+        result_queue.put(None)
+
+def run_scaling(display_name: str, orig_func: Callable, ref_func: Callable, inputs: List[tuple], timeout: float = None):
+    """
+    Runs report_scaling in a child process with a time budget of its own (SCALING_TIMEOUT), so a
+    slow fit only drops the scaling report and not the function's speedup. The child is forked
+    where the platform supports it; elsewhere the default start method has to pickle the
+    functions, and scaling is skipped if they cannot be. Returns the exponents, or None.
+    """
+    timeout = SCALING_TIMEOUT if timeout is None else timeout
+    context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+    result_queue = context.Queue()
+    process = context.Process(target=_scaling_worker, args=(display_name, orig_func, ref_func, inputs, result_queue))
+    try:
+        process.start()
+    except Exception as e:
+        print(f"[SKIP] {display_name} (Scaling: {e})")
+        return None
+    try:
+        result = result_queue.get(timeout=timeout)
+    except Empty:
+        print(f"[SKIP] {display_name} (Scaling: Timeout)")
+        process.terminate()
+        result = None
+    process.join()
+    return result
+
+def emit_benchmark_result(display_name: str, stats, orig_times, ref_times, memory, scaling=None):
+    """
+    Appends one function's benchmark results to the result file (see common.emit_result): the
+    compare_timings statistics, the per-pass timings, both measure_memory results and, with
+    BENCHMARK_SCALING, the complexity exponents.
+    """
+    record = {"tool": "benchmark", "name": display_name, "status": "OK", "speedup": stats,
+              "timings": {"orig": [float(t) for t in orig_times], "ref": [float(t) for t in ref_times]},
+              "memory": {"orig": memory[0], "ref": memory[1]}}
+    if scaling is not None:
+        record["scaling"] = {"orig": scaling[0], "ref": scaling[1]}
+    emit_result(record)
+
+def skip_benchmark(display_name: str, reason: str):
+    """Prints a benchmark [SKIP] line and emits the matching result record."""
+    print(f"[SKIP] {display_name} ({reason})")
+    emit_result({"tool": "benchmark", "name": display_name, "status": "SKIP", "reason": reason})
 
-import multiprocessing
-from queue import Empty
 
 # ... (imports remain)
 
@@ -104,27 +412,26 @@ def worker_benchmark_func(orig_path, ref_path, func_name, config):
         
         inputs = generate_benchmark_inputs(orig_func, config=config)
         if not inputs:
-            print(f"[SKIP] {display_name} (Unable to generate benchmark inputs)")
+            skip_benchmark(display_name, "Unable to generate benchmark inputs")
             return
             
         try:
-            orig_times = measure_execution_time(orig_func, inputs)
-            ref_times = measure_execution_time(ref_func, inputs)
+            orig_times, ref_times = measure_interleaved(orig_func, ref_func, inputs)
             
             if not orig_times or not ref_times:
-                print(f"[SKIP] {display_name} (Benchmark execution failed)")
+                skip_benchmark(display_name, "Benchmark execution failed")
                 return
 
-            orig_avg = np.mean(orig_times)
-            ref_avg = np.mean(ref_times)
-            
-            speedup = f"{orig_avg / ref_avg:.2f}x" if ref_avg > 0 else "N/A"
-            print(f"[SPEEDUP] {display_name}: {speedup}")
+            stats = compare_timings(orig_times, ref_times)
+            print(f"[SPEEDUP] {display_name}: {format_statistics(stats)}")
+            memory = report_memory(display_name, orig_func, ref_func, inputs)
+            scaling = run_scaling(display_name, orig_func, ref_func, inputs) if os.getenv("BENCHMARK_SCALING") else None
+            emit_benchmark_result(display_name, stats, orig_times, ref_times, memory, scaling)
         except Exception as e:
-            print(f"[SKIP] {display_name} (Error during benchmark: {e})")
+            skip_benchmark(display_name, f"Error during benchmark: {e}")
     except Exception as e:
         display_name = get_display_name(func_name, config)
-        print(f"[SKIP] {display_name} (Worker Error: {e})")
+        skip_benchmark(display_name, f"Worker Error: {e}")
 
 def worker_benchmark_class_method(orig_path, ref_path, cls_name, method_name, config):
     # Similar logic for class methods
@@ -141,13 +448,13 @@ def worker_benchmark_class_method(orig_path, ref_path, cls_name, method_name, co
         try:
             init_inputs = generate_benchmark_inputs(orig_cls, 1, config=config)
             if not init_inputs:
-                print(f"[SKIP] {display_name} (Unable to generate constructor arguments)")
+                skip_benchmark(display_name, "Unable to generate constructor arguments")
                 return
             init_args = init_inputs[0]
             inst_orig = orig_cls(*init_args)
             inst_ref = ref_cls(*init_args)
         except Exception as e:
-            print(f"[SKIP] {display_name} (Error during constructor: {e})")
+            skip_benchmark(display_name, f"Error during constructor: {e}")
             return
             
         bound_orig = getattr(inst_orig, method_name)
@@ -155,17 +462,16 @@ def worker_benchmark_class_method(orig_path, ref_path, cls_name, method_name, co
         
         inputs = generate_benchmark_inputs(bound_orig, config=config)
         if not inputs:
-            print(f"[SKIP] {display_name} (Unable to generate benchmark inputs)")
+            skip_benchmark(display_name, "Unable to generate benchmark inputs")
             return
             
-        orig_times = measure_execution_time(bound_orig, inputs)
-        ref_times = measure_execution_time(bound_ref, inputs)
-        
-        orig_avg = np.mean(orig_times)
-        ref_avg = np.mean(ref_times)
+        orig_times, ref_times = measure_interleaved(bound_orig, bound_ref, inputs)
         
-        speedup = f"{orig_avg / ref_avg:.2f}x" if ref_avg > 0 else "N/A"
-        print(f"[SPEEDUP] {display_name}: {speedup}")
+        stats = compare_timings(orig_times, ref_times)
+        print(f"[SPEEDUP] {display_name}: {format_statistics(stats)}")
+        memory = report_memory(display_name, bound_orig, bound_ref, inputs)
+        scaling = run_scaling(display_name, bound_orig, bound_ref, inputs) if os.getenv("BENCHMARK_SCALING") else None
+        emit_benchmark_result(display_name, stats, orig_times, ref_times, memory, scaling)
     except Exception:
         pass
 
@@ -176,5 +482,44 @@ def run_with_timeout(target, args, name, timeout=15):
     if p.is_alive():
         p.terminate()
         p.join()
-        print(f"[SKIP] {name} (Timeout)")
+        skip_benchmark(name, "Timeout")
+
+# Seconds one function's benchmark may run before it is reported as [SKIP] (Timeout)
+BENCHMARK_TIMEOUT = 60
+
+def benchmark_files(orig_path, ref_path, config: Dict[str, Any] = None, timeout: float = BENCHMARK_TIMEOUT, skip=()):
+    """
+    Benchmarks every function and class method the two files have in common, one at a time so
+    the measurements do not compete for the CPU, each in its own process (see run_with_timeout).
+    Prints the results and emits one result record per function. Functions and classes named in
+    skip are left out. With BENCHMARK_SCALING, each function also gets SCALING_TIMEOUT for the
+    scaling fit on top of timeout.
+    """
+    try:
+        orig_mod = load_module_from_path(orig_path, "original_mod")
+        ref_mod = load_module_from_path(ref_path, "refactored_mod")
+    except Exception as e:
+        skip_benchmark(Path(ref_path).name, f"Worker Error: {e}")
+        return
+    if os.getenv("BENCHMARK_SCALING"):
+        timeout += SCALING_TIMEOUT
+
+    for func_name in get_public_functions(orig_mod, ref_mod):
+        if func_name in skip:
+            continue
+        run_with_timeout(worker_benchmark_func, (orig_path, ref_path, func_name, config),
+                         get_display_name(func_name, config), timeout=timeout)
+    for cls_name in sorted(set(get_common_classes(orig_mod, ref_mod)) - set(skip)):
+        for method_name in get_common_methods(getattr(orig_mod, cls_name), getattr(ref_mod, cls_name)):
+            run_with_timeout(worker_benchmark_class_method, (orig_path, ref_path, cls_name, method_name, config),
+                             get_display_name(f"{cls_name}.{method_name}", config), timeout=timeout)
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: benchmark.py <original.py> <refactored.py>")
+        sys.exit(2)
+    orig_path, ref_path = sys.argv[1], sys.argv[2]
+    benchmark_files(orig_path, ref_path, load_job_config(Path(orig_path).parent))
 
+if __name__ == '__main__':  # pragma: no cover
+    main()
@@ -0,0 +1,466 @@
+import ast
+import re
+import configparser
+from collections import defaultdict
+from typing import Dict, Any
+
+import analysis
+
+# Decorators that only wrap or describe a definition; any other decorator is assumed to
+# register the definition somewhere (routes, fixtures, CLI commands, ...)
+_TRANSPARENT_DECORATORS = {
+    "property", "staticmethod", "classmethod", "cached_property", "setter", "getter", "deleter",
+    "abstractmethod", "lru_cache", "cache", "wraps", "dataclass", "total_ordering",
+    "contextmanager", "asynccontextmanager", "overload", "override", "final", "singledispatch"
+}
+
+# Builtins that reach an attribute by a (constant) name
+_REFLECTIVE_CALLS = {"getattr", "hasattr", "setattr", "delattr"}
+
+_DEF_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+# `name = module:attr` entry point declarations (extras such as `[cli]` are ignored)
+_ENTRY_POINT_RE = re.compile(r"""([A-Za-z_][\w.]*)\s*:\s*([A-Za-z_][\w.]*)""")
+
+def _decorator_name(node):
+    if isinstance(node, ast.Call):
+        node = node.func
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Name):
+        return node.id
+    return None
+
+def _attribute_chain(node):
+    """Returns [root, attr, ...] for a `name.attr.attr` expression, or None for anything else."""
+    attrs = []
+    while isinstance(node, ast.Attribute):
+        attrs.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        return [node.id] + attrs[::-1]
+    return None
+
+def _constant_prefix(node):
+    """Returns the constant start of a `"prefix" + name` or f"prefix{name}" attribute name, if any."""
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        node = node.left
+    elif isinstance(node, ast.JoinedStr) and node.values:
+        node = node.values[0]
+    if isinstance(node, ast.Constant) and isinstance(node.value, str) and node.value:
+        return node.value
+    return None
+
+def _is_main_check(node) -> bool:
+    test = node.test
+    return (isinstance(test, ast.Compare) and isinstance(test.left, ast.Name) and test.left.id == "__name__"
+            and len(test.comparators) == 1 and isinstance(test.comparators[0], ast.Constant)
+            and test.comparators[0].value == "__main__")
+
+def collect_references(tree: ast.AST) -> Dict[str, Any]:
+    """
+    Collects the per-file facts the call graph is built from, in a single walk:
+
+    - defs: [qualname, kind, line, registered] for every module-level function and class and
+      every function or class defined directly in a class body (`Class.method`). Definitions
+      nested in functions are folded into their enclosing definition.
+    - scopes: per enclosing definition ('' for module-level code), the names loaded, the
+      attributes accessed (including constant getattr/hasattr names), `name.attr...` chains
+      and the constant prefixes of computed getattr names (`getattr(self, "visit_" + kind)`,
+      also through a local variable assigned such an expression).
+    - from_imports, imports, exports (`__all__`, when it is a literal) and whether the
+      module has an `if __name__ == "__main__":` block.
+    """
+    defs = []
+    scopes = defaultdict(lambda: {"names": set(), "attrs": set(), "chains": set(), "prefixes": set()})
+    from_imports = []
+    imports = []
+    exports = None
+    main_block = False
+    # Variables holding a prefixed string, and variables used as getattr names, per scope
+    prefixed_vars = defaultdict(dict)
+    getattr_vars = defaultdict(set)
+
+    # (node, enclosing scope, whether the node sits directly in a class body)
+    stack = [(child, "", False) for child in ast.iter_child_nodes(tree)]
+    while stack:
+        node, scope, in_class = stack.pop()
+        if isinstance(node, _DEF_NODES):
+            if not scope or in_class:
+                qualname = f"{scope}.{node.name}" if scope else node.name
+                registered = any(_decorator_name(d) not in _TRANSPARENT_DECORATORS for d in node.decorator_list)
+                kind = "class" if isinstance(node, ast.ClassDef) else "function"
+                defs.append([qualname, kind, node.lineno, registered])
+                inner, inner_in_class = qualname, kind == "class"
+            else:
+                inner, inner_in_class = scope, False
+            # Decorators, defaults, annotations and bases are evaluated in the enclosing scope
+            outer = list(node.decorator_list)
+            if isinstance(node, ast.ClassDef):
+                outer += node.bases + [kw.value for kw in node.keywords]
+            else:
+                outer += [node.args, node.returns] if node.returns else [node.args]
+            stack.extend((child, scope, False) for child in outer)
+            stack.extend((child, inner, inner_in_class) for child in node.body)
+            continue
+
+        refs = scopes[scope]
+        if isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Load):
+                refs["names"].add(node.id)
+        elif isinstance(node, ast.Attribute):
+            chain = _attribute_chain(node)
+            if chain is not None:
+                refs["names"].add(chain[0])
+                refs["attrs"].update(chain[1:])
+                refs["chains"].add(tuple(chain))
+                continue
+            refs["attrs"].add(node.attr)
+        elif isinstance(node, ast.Call):
+            if isinstance(node.func, ast.Name) and node.func.id in _REFLECTIVE_CALLS and len(node.args) >= 2:
+                name = node.args[1]
+                if isinstance(name, ast.Constant) and isinstance(name.value, str):
+                    refs["attrs"].add(name.value)
+                    chain = _attribute_chain(node.args[0])
+                    if chain is not None:
+                        refs["chains"].add(tuple(chain + [name.value]))
+                elif _constant_prefix(name) is not None:
+                    refs["prefixes"].add(_constant_prefix(name))
+                elif isinstance(name, ast.Name):
+                    getattr_vars[scope].add(name.id)
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                imports.append([alias.name, alias.asname])
+        elif isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                from_imports.append([node.module, node.level, alias.name, alias.asname])
+        elif (isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)
+              and _constant_prefix(node.value) is not None):
+            prefixed_vars[scope][node.targets[0].id] = _constant_prefix(node.value)
+        elif not scope and isinstance(node, ast.If) and _is_main_check(node):
+            main_block = True
+        elif not scope and isinstance(node, ast.Assign) and isinstance(node.value, (ast.List, ast.Tuple)):
+            if any(isinstance(t, ast.Name) and t.id == "__all__" for t in node.targets):
+                exports = [e.value for e in node.value.elts if isinstance(e, ast.Constant) and isinstance(e.value, str)]
+
+        stack.extend((child, scope, False) for child in ast.iter_child_nodes(node))
+
+    for scope, names in getattr_vars.items():
+        scopes[scope]["prefixes"].update(prefixed_vars[scope][n] for n in names if n in prefixed_vars[scope])
+
+    return {
+        "defs": sorted(defs, key=lambda d: d[2]),
+        "scopes": {
+            name: {"names": sorted(refs["names"]), "attrs": sorted(refs["attrs"]),
+                   "chains": sorted(list(c) for c in refs["chains"]), "prefixes": sorted(refs["prefixes"])}
+            for name, refs in scopes.items()
+        },
+        "from_imports": from_imports,
+        "imports": imports,
+        "exports": exports,
+        "main_block": main_block
+    }
+
+class CallGraph:
+    """
+    Whole-program reference graph over the facts of collect_references.
+
+    Nodes are (file, qualname) for definitions, (file, '') for a module's top-level code and
+    (None, attr) for attribute names. Names are resolved through imports, package re-exports
+    and (transitive) star imports; `module.attr` chains and `Class.attr` accesses are resolved
+    exactly. Any other `obj.attr` (or constant getattr) reaches every method called attr through
+    its attribute node, which keeps the graph linear in the number of references. A computed
+    getattr name with a constant prefix reaches every method name starting with it.
+
+    Besides its explicit references, a definition implies its module's top-level code and, for
+    methods, its class; a class implies its dunder methods, and a module or class implies the
+    definitions it registers through non-wrapping decorators.
+    """
+    def __init__(self):
+        self.files = {}
+        self.edges = {}
+        self.external = set()
+
+    def add_file(self, key, rel_path, facts, external=False):
+        """
+        Adds a file's collect_references facts. External files (e.g. tests outside the scan)
+        take part in resolution and reachability but are not counted by used_outside.
+        """
+        self.files[key] = (rel_path, facts)
+        if external:
+            self.external.add(key)
+
+    def build(self):
+        """Resolves every file's references; must be called after all files are added."""
+        self.module_to_file = analysis.build_module_index((key, rel) for key, (rel, _) in self.files.items())
+        self.package_of = {}
+        self.defs = {}
+        self.def_lines = {}
+        self.children = defaultdict(list)
+        self.methods_by_name = defaultdict(list)
+        self.registered = set()
+        self.bindings = {}
+        self.stars = {}
+        self._exports = {}
+        self._prefixed = {}
+
+        for key, (rel, facts) in self.files.items():
+            names = analysis.module_names(rel)
+            self.package_of[key] = (names[0] if rel.stem == "__init__" else names[0].rpartition(".")[0]) if names else ""
+            for qualname, kind, line, registered in facts["defs"]:
+                self.defs[(key, qualname)] = (kind, line)
+                self.def_lines[(key, line)] = (key, qualname)
+                parent, _, name = qualname.rpartition(".")
+                self.children[(key, parent)].append((key, qualname))
+                if parent:
+                    self.methods_by_name[name].append((key, qualname))
+                if registered:
+                    self.registered.add((key, qualname))
+            self._bind_imports(key, rel, facts)
+
+        for key, (rel, facts) in self.files.items():
+            for scope, refs in facts["scopes"].items():
+                self.edges[(key, scope)] = self._resolve_scope(key, refs)
+            # Importing a name counts as using it, even if it is only re-exported
+            module_edges = self.edges.setdefault((key, ""), set())
+            for name, binding in self.bindings[key].items():
+                if binding[0] == "from":
+                    module_edges.update(self._export(binding[1], binding[2]))
+        self._exports = {}
+
+    def _bind_imports(self, key, rel, facts):
+        resolve = analysis.module_resolver(rel, self.module_to_file)
+        bindings = {}
+        stars = []
+        for name, asname in facts["imports"]:
+            # `import a.b` binds `a`; `import a.b as c` binds `c` to `a.b`
+            target = resolve(name if asname else name.split(".")[0])
+            if target is not None:
+                bindings[asname or name.split(".")[0]] = ("module", target)
+        for module, level, name, asname in facts["from_imports"]:
+            target = resolve(module, level)
+            if target is None or target == key:
+                continue
+            if name == "*":
+                stars.append(target)
+            else:
+                bindings[asname or name] = ("from", target, name)
+        self.bindings[key] = bindings
+        self.stars[key] = stars
+
+    def _star_exports(self, key, name) -> bool:
+        exports = self.files[key][1]["exports"]
+        return name in exports if exports is not None else not name.startswith("_")
+
+    def _export(self, key, name):
+        """Returns the nodes that `name` refers to in the namespace of module key."""
+        memo_key = (key, name)
+        if memo_key in self._exports:
+            return self._exports[memo_key]
+        # Guards against import cycles; a cyclic lookup resolves to nothing
+        self._exports[memo_key] = ()
+
+        found = ()
+        binding = self.bindings[key].get(name)
+        if (key, name) in self.defs:
+            found = ((key, name),)
+        elif binding is not None:
+            found = ((binding[1], ""),) if binding[0] == "module" else self._export(binding[1], binding[2])
+        else:
+            found = tuple(node for star in self.stars[key] if self._star_exports(star, name)
+                          for node in self._export(star, name))
+            if not found:
+                # `pkg.name` may be a submodule that was never imported in the package itself
+                package = self.package_of[key]
+                if package and self.files[key][0].stem == "__init__":
+                    submodule = self.module_to_file.get(f"{package}.{name}")
+                    if submodule is not None:
+                        found = ((submodule, ""),)
+        self._exports[memo_key] = found
+        return found
+
+    def _resolve_scope(self, key, refs):
+        targets = set()
+        for name in refs["names"]:
+            targets.update(self._export(key, name))
+        for chain in refs["chains"]:
+            nodes = self._export(key, chain[0])
+            for attr in chain[1:]:
+                found = []
+                for node_key, qualname in nodes:
+                    if not qualname:
+                        found.extend(self._export(node_key, attr))
+                    elif self.defs.get((node_key, qualname), ("",))[0] == "class" and (node_key, f"{qualname}.{attr}") in self.defs:
+                        found.append((node_key, f"{qualname}.{attr}"))
+                targets.update(found)
+                nodes = [n for n in found if not n[1] or self.defs[n][0] == "class"]
+                if not nodes:
+                    break
+        targets.update((None, attr) for attr in refs["attrs"])
+        for prefix in refs["prefixes"]:
+            if prefix not in self._prefixed:
+                self._prefixed[prefix] = [name for name in self.methods_by_name if name.startswith(prefix)]
+            targets.update((None, name) for name in self._prefixed[prefix])
+        return targets
+
+    def successors(self, node):
+        key, qualname = node
+        if key is None:
+            return self.methods_by_name.get(qualname, ())
+        result = list(self.edges.get(node, ()))
+        if qualname:
+            result.append((key, ""))
+            parent = qualname.rpartition(".")[0]
+            if parent:
+                result.append((key, parent))
+            if self.defs[node][0] == "class":
+                result.extend(child for child in self.children.get(node, ())
+                              if child in self.registered or _is_dunder(child[1].rpartition(".")[2]))
+        else:
+            result.extend(child for child in self.children.get(node, ()) if child in self.registered)
+            # Importing a submodule runs its package's __init__.py first
+            package = self.package_of[key].rpartition(".")[0] if self.files[key][0].stem == "__init__" else self.package_of[key]
+            parent_module = self.module_to_file.get(package) if package else None
+            if parent_module is not None and parent_module != key:
+                result.append((parent_module, ""))
+        return result
+
+    def resolve_entry_point(self, module, attr_path):
+        """Returns the nodes a `module:attr.attr` entry point declaration refers to."""
+        key = self.module_to_file.get(module)
+        if key is None:
+            return []
+        nodes = [(key, "")]
+        for attr in attr_path.split(".") if attr_path else []:
+            found = []
+            for node_key, qualname in nodes:
+                if not qualname:
+                    found.extend(self._export(node_key, attr))
+                elif (node_key, f"{qualname}.{attr}") in self.defs:
+                    found.append((node_key, f"{qualname}.{attr}"))
+            nodes = found
+        return nodes
+
+    def reachable(self, roots):
+        """Returns every node reachable from roots with a worklist traversal, linear in the number of edges."""
+        seen = set(roots)
+        work = list(seen)
+        while work:
+            for succ in self.successors(work.pop()):
+                if succ not in seen:
+                    seen.add(succ)
+                    work.append(succ)
+        return seen
+
+    def unreachable(self, roots):
+        """
+        Returns {file: {line: qualname}} of the definitions not reachable from roots. Members of
+        an unreachable class are left out, since they go away with it.
+        """
+        reached = self.reachable(roots)
+        dead = defaultdict(dict)
+        for node, (kind, line) in self.defs.items():
+            if node in reached or node[0] in self.external:
+                continue
+            parent = node[1].rpartition(".")[0]
+            if parent and (node[0], parent) not in reached:
+                continue
+            dead[node[0]][line] = node[1]
+        return dead
+
+    def used_outside(self):
+        """
+        Returns {file: names} of the definitions referenced from another file, by their
+        unqualified names (as reported for methods by the metrics pass).
+        """
+        used = defaultdict(set)
+        # Up to two referencing files per attribute name are enough to tell whether one is foreign
+        attr_files = defaultdict(set)
+        for (src, _), targets in self.edges.items():
+            if src in self.external:
+                continue
+            for target_key, qualname in targets:
+                if target_key is None:
+                    files = attr_files[qualname]
+                    if len(files) < 2:
+                        files.add(src)
+                elif target_key != src and qualname:
+                    used[target_key].add(qualname.rpartition(".")[2])
+        for name, files in attr_files.items():
+            for key, qualname in self.methods_by_name.get(name, ()):
+                if files - {key}:
+                    used[key].add(name)
+        return used
+
+def _is_dunder(name: str) -> bool:
+    return name.startswith("__") and name.endswith("__")
+
+def _setup_py_entry_points(source: str):
+    """
+    Returns the strings passed as entry_points= to setup() in a setup.py, following names bound
+    at module level (e.g. `entry_points={"console_scripts": SCRIPTS}`). Nothing else in the file
+    is read, so annotations and dict literals elsewhere are not mistaken for declarations.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return []
+    assigned = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    assigned[target.id] = node.value
+    stack = [kw.value for node in ast.walk(tree)
+             if isinstance(node, ast.Call) and _decorator_name(node.func) == "setup"
+             for kw in node.keywords if kw.arg == "entry_points"]
+    strings, seen = [], set()
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            strings.append(node.value)
+        elif isinstance(node, ast.Name):
+            if node.id in assigned and node.id not in seen:
+                seen.add(node.id)
+                stack.append(assigned[node.id])
+        elif isinstance(node, (ast.Dict, ast.List, ast.Tuple, ast.Set)):
+            # Dict keys are group names such as "console_scripts"; only values declare entry points
+            stack.extend(node.values if isinstance(node, ast.Dict) else node.elts)
+    return strings
+
+def declared_entry_points(root):
+    """
+    Returns (module, attr) pairs for the console scripts and other entry points declared in the
+    pyproject.toml, setup.cfg or setup.py at root.
+    """
+    declarations = []
+    pyproject = root / "pyproject.toml"
+    if pyproject.exists():
+        try:
+            import tomllib
+            data = tomllib.loads(pyproject.read_text(encoding="utf-8"))
+        except (ImportError, ValueError, OSError):
+            data = {}
+        project = data.get("project", {})
+        groups = [project.get("scripts", {}), project.get("gui-scripts", {}),
+                  *project.get("entry-points", {}).values(), data.get("tool", {}).get("poetry", {}).get("scripts", {})]
+        for group in groups:
+            for value in group.values():
+                # Poetry also accepts {callable = "module:attr"} tables
+                declarations.append(value.get("callable", "") if isinstance(value, dict) else str(value))
+    setup_cfg = root / "setup.cfg"
+    if setup_cfg.exists():
+        parser = configparser.ConfigParser()
+        try:
+            parser.read(setup_cfg, encoding="utf-8")
+        except configparser.Error:
+            pass
+        if parser.has_section("options.entry_points"):
+            declarations.extend(value for _, value in parser.items("options.entry_points"))
+    setup_py = root / "setup.py"
+    if setup_py.exists():
+        try:
+            declarations.extend(_setup_py_entry_points(setup_py.read_text(encoding="utf-8")))
+        except (OSError, UnicodeDecodeError):
+            pass
+    return [match for text in declarations for match in _ENTRY_POINT_RE.findall(text)]
@@ -0,0 +1,230 @@
+# /// script
+# dependencies = [
+#     "radon",
+# ]
+# ///
+
+import sys
+import json
+import sqlite3
+import hashlib
+import argparse
+from pathlib import Path
+
+# Ensure we can import local modules
+sys.path.append(str(Path(__file__).parent))
+
+import analysis
+from scan_cache import get_tool_version
+
+# Bump when the schema or the meaning of stored hashes changes
+INDEX_FORMAT = 1
+
+# Modules that decide which blocks exist and how they are hashed
+HASH_MODULES = ["analysis.py", "metrics.py", "duplication.py"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, content_hash TEXT, version TEXT);
+CREATE TABLE IF NOT EXISTS blocks (
+    hash TEXT NOT NULL,
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    end_line INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blocks_hash ON blocks (hash);
+CREATE INDEX IF NOT EXISTS blocks_path ON blocks (path);
+"""
+
+def hash_blocks(file_path, code: str):
+    """
+    Returns (name, line, end_line, code_hash) for every function and class in code,
+    hashed exactly like identify.py --duplicates so both tools can share an index.
+    """
+    result = analysis.analyze_source(str(file_path), code, use_duplicates=True)
+    return [(m["name"], m["line"], m["end_line"], m["code_hash"]) for m in result["func_metrics"]]
+
+def content_hash(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+class CloneIndex:
+    """
+    Persistent SQLite index of normalized block hashes -> locations.
+
+    Files are keyed on their absolute path, so one index can hold several repositories.
+    Each file's blocks are replaced as a unit, which keeps updates incremental: only files
+    whose content hash changed are re-hashed, and lookups by hash go through an index.
+    Each file records the normalizer version that hashed it. Files hashed by another version
+    are ignored by lookups and re-hashed when their repository is next scanned, so a tool
+    upgrade in one repository leaves the entries of the others in place.
+    """
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.executescript(_SCHEMA)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(files)")]
+        if "version" not in columns:
+            # Indexes written before files recorded their version: every row counts as stale
+            with self.conn:
+                self.conn.execute("ALTER TABLE files ADD COLUMN version TEXT")
+        self.version = get_tool_version(HASH_MODULES, INDEX_FORMAT)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    @staticmethod
+    def path_key(file_path) -> str:
+        return str(Path(file_path).resolve())
+
+    def content_hashes(self, root):
+        """Returns {path key: content hash} for the files under root indexed by this version."""
+        prefix = self.path_key(root).rstrip("/") + "/"
+        return dict(self.conn.execute(
+            "SELECT path, content_hash FROM files WHERE substr(path, 1, ?) = ? AND version = ?",
+            (len(prefix), prefix, self.version)
+        ).fetchall())
+
+    def set_blocks(self, file_path, blocks, digest=None):
+        """Replaces the stored blocks of file_path with (name, line, end_line, code_hash) tuples."""
+        key = self.path_key(file_path)
+        self.conn.execute("DELETE FROM blocks WHERE path = ?", (key,))
+        self.conn.executemany(
+            "INSERT INTO blocks (hash, path, name, line, end_line) VALUES (?, ?, ?, ?, ?)",
+            [(code_hash, key, name, line, end_line) for name, line, end_line, code_hash in blocks]
+        )
+        self.conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?)", (key, digest, self.version))
+
+    def update_file(self, file_path) -> bool:
+        """
+        Re-hashes file_path if its content changed since it was indexed; a missing file is removed.
+        Returns True when the index changed.
+        """
+        path = Path(file_path)
+        try:
+            code = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return self.remove_file(path)
+        digest = content_hash(code)
+        row = self.conn.execute("SELECT content_hash, version FROM files WHERE path = ?", (self.path_key(path),)).fetchone()
+        if row == (digest, self.version):
+            return False
+        self.set_blocks(path, hash_blocks(path, code), digest)
+        return True
+
+    def remove_file(self, file_path) -> bool:
+        key = self.path_key(file_path)
+        cursor = self.conn.execute("DELETE FROM files WHERE path = ?", (key,))
+        self.conn.execute("DELETE FROM blocks WHERE path = ?", (key,))
+        return cursor.rowcount > 0
+
+    def prune(self, root, keep):
+        """Removes indexed files under root that are not in keep (e.g. deleted since the last scan)."""
+        prefix = self.path_key(root).rstrip("/") + "/"
+        keep = {self.path_key(p) for p in keep}
+        stale = [path for (path,) in self.conn.execute(
+            "SELECT path FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+        ) if path not in keep]
+        for path in stale:
+            self.remove_file(path)
+        return stale
+
+    def lookup(self, code_hash):
+        """Returns every indexed location of code_hash as dicts with path, name, line and end_line."""
+        return [
+            {"path": path, "name": name, "line": line, "end_line": end_line}
+            for path, name, line, end_line in self.conn.execute(
+                "SELECT blocks.path, name, line, end_line FROM blocks JOIN files ON files.path = blocks.path "
+                "WHERE hash = ? AND version = ? ORDER BY blocks.path, line", (code_hash, self.version)
+            )
+        ]
+
+    def clone_groups(self, root=None):
+        """
+        Returns the groups of blocks sharing a hash, largest first.
+        With root, only groups that have at least one copy under root are returned.
+        """
+        query = ("SELECT hash FROM blocks JOIN files ON files.path = blocks.path "
+                 "WHERE version = ? GROUP BY hash HAVING COUNT(*) > 1")
+        groups = []
+        for (code_hash,) in self.conn.execute(query, (self.version,)).fetchall():
+            locations = self.lookup(code_hash)
+            if root is not None:
+                prefix = self.path_key(root).rstrip("/") + "/"
+                if not any(loc["path"].startswith(prefix) for loc in locations):
+                    continue
+            groups.append({"hash": code_hash, "locations": locations})
+        groups.sort(key=lambda g: (-len(g["locations"]), g["locations"][0]["path"], g["locations"][0]["line"]))
+        return groups
+
+def format_location(loc) -> str:
+    return f"{loc['path']}::{loc['name']} (Lines {loc['line']}-{loc['end_line']})"
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain a persistent index of normalized code block hashes.")
+    parser.add_argument("--index", type=str, default=".code-slob-clones.db", help="Path of the SQLite index (default: .code-slob-clones.db)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Index every Python file under a directory")
+    build.add_argument("target_dir", type=str, help="Directory to index")
+
+    update = subparsers.add_parser("update", help="Re-index the given files (deleted files are removed)")
+    update.add_argument("paths", nargs="*", help="Changed files; read from stdin, one per line, if omitted")
+
+    dump = subparsers.add_parser("dump", help="Print clone groups stored in the index")
+    dump.add_argument("--root", type=str, help="Only show groups with a copy under this directory")
+    dump.add_argument("--json", action="store_true", help="Print the groups as JSON")
+
+    args = parser.parse_args()
+
+    with CloneIndex(args.index) as index:
+        if args.command == "build":
+            # Imported here so the index module itself stays free of identify.py's CLI
+            from identify import iter_python_files
+
+            target_dir = Path(args.target_dir).resolve()
+            if not target_dir.exists():
+                print(f"Error: {target_dir} does not exist.", file=sys.stderr)
+                sys.exit(1)
+            paths = list(iter_python_files(target_dir))
+            changed = 0
+            for path in paths:
+                try:
+                    changed += index.update_file(path)
+                except Exception as e:
+                    print(f"Error processing {path}: {e}", file=sys.stderr)
+            removed = index.prune(target_dir, paths)
+            print(f"Indexed {len(paths)} files ({changed} updated, {len(removed)} removed).")
+        elif args.command == "update":
+            paths = args.paths or [line.strip() for line in sys.stdin if line.strip()]
+            changed = 0
+            for path in paths:
+                if not path.endswith(".py"):
+                    continue
+                try:
+                    changed += index.update_file(path)
+                except Exception as e:
+                    print(f"Error processing {path}: {e}", file=sys.stderr)
+            print(f"Updated {changed} of {len(paths)} files.")
+        else:
+            groups = index.clone_groups(Path(args.root) if args.root else None)
+            if args.json:
+                print(json.dumps(groups, indent=2))
+            elif not groups:
+                print("No clone groups found.")
+            else:
+                print(f"Found {len(groups)} clone groups:")
+                for group in groups:
+                    print(f"--- {group['hash'][:12]} ({len(group['locations'])} copies) ---")
+                    for loc in group["locations"]:
+                        print(f"  - {format_location(loc)}")
+
+if __name__ == "__main__":
+    main()
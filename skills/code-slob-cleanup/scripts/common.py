@@ -4,6 +4,7 @@
 # ]
 # ///
 
+import os
 import sys
 
 import importlib.util
@@ -37,6 +38,65 @@ def get_common_classes(mod1, mod2) -> List[str]:
     cls2 = {n for n, c in inspect.getmembers(mod2, inspect.isclass) if getattr(c, '__module__', None) == mod2.__name__}
     return list(cls1.intersection(cls2))
 
+def get_public_functions(mod1, mod2) -> List[str]:
+    """
+    Returns the sorted names of the public functions present in both modules. Private helpers
+    (leading underscore) are not verified or benchmarked on their own, since they are only
+    reachable through the public functions that call them.
+    """
+    return sorted(n for n in get_common_functions(mod1, mod2) if not n.startswith('_'))
+
+def get_common_methods(cls1, cls2) -> List[str]:
+    """Returns the sorted names of the public methods both classes define in their own bodies."""
+    methods1 = {n for n, f in vars(cls1).items() if inspect.isfunction(f) and not n.startswith('_')}
+    methods2 = {n for n, f in vars(cls2).items() if inspect.isfunction(f) and not n.startswith('_')}
+    return sorted(methods1.intersection(methods2))
+
+def load_job_config(job_dir) -> Dict[str, Any]:
+    """Loads a job's type_hints.json; a missing or malformed file yields an empty config."""
+    try:
+        with open(Path(job_dir) / "type_hints.json", 'r') as f:
+            config = json.load(f)
+    except Exception:
+        return {}
+    return config if isinstance(config, dict) else {}
+
+# Names a JSON-lines file verify.py and benchmark.py append one result record per function to
+# (see emit_result). Their worker processes inherit it, so every record reaches the same file.
+RESULTS_ENV_VAR = "CODE_SLOB_RESULTS"
+
+def emit_result(record: Dict[str, Any], path=None):
+    """
+    Appends record as one JSON line to path, or to the file named by RESULTS_ENV_VAR (if set).
+    The line goes out in a single append-mode write, so records of parallel processes do not
+    interleave.
+    """
+    path = path or os.environ.get(RESULTS_ENV_VAR)
+    if not path:
+        return
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, (json.dumps(record, default=str) + "\n").encode())
+    finally:
+        os.close(fd)
+
+def parse_result_line(line: str):
+    """Returns the record on one result file line, or None if it is not a JSON object."""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) else None
+
+def read_results(path) -> List[Dict[str, Any]]:
+    """Reads every record of a result file (see emit_result); a missing file has none."""
+    try:
+        with open(path) as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return []
+    return [record for record in map(parse_result_line, lines) if record is not None]
+
 def get_display_name(name: str, config: Dict[str, Any] = None) -> str:
     """Returns path/to/file.py:name if available in config['functions'], else just name."""
     if config:
@@ -1,6 +1,35 @@
+# /// script
+# dependencies = [
+#     "radon",
+#     "numpy",
+# ]
+# ///
+
 import ast
 import hashlib
 import os
+import re
+import textwrap
+import zlib
+from functools import lru_cache
+
+# MinHash / LSH settings for near-duplicate detection
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 128
+# Blocks with fewer shingles are too small for a meaningful similarity estimate
+MIN_SHINGLES = 30
+# Buckets larger than this are compared against their first member only, keeping LSH near-linear
+MAX_BUCKET_SIZE = 50
+_MERSENNE_PRIME = (1 << 31) - 1
+
+# Statement fragments shorter than this many lines are not reported as clones
+MIN_FRAGMENT_LINES = 5
+_DEF_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+# Identifier fields FunctionalNormalizer renames to placeholders; they are erased from fragment hashes
+_IDENTIFIER_FIELDS = {
+    (ast.Name, "id"), (ast.arg, "arg"),
+    (ast.FunctionDef, "name"), (ast.AsyncFunctionDef, "name"), (ast.ClassDef, "name")
+}
 
 class FunctionalNormalizer(ast.NodeTransformer):
     def __init__(self):
@@ -64,25 +93,30 @@ class FunctionalNormalizer(ast.NodeTransformer):
             self.var_count += 1
         return ast.copy_location(ast.arg(arg=self.var_map[node.arg], annotation=self.visit(node.annotation) if node.annotation else None, type_comment=node.type_comment), node)
 
+def _normalize_tree(tree) -> str:
+    """
+    Strips docstrings from a parsed tree and renames its identifiers, returning the unparsed result.
+    The tree is modified in place.
+    """
+    # Remove docstrings
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef, ast.AsyncFunctionDef, ast.Module)):
+            if (node.body and isinstance(node.body[0], ast.Expr) and 
+                isinstance(node.body[0].value, (ast.Str, ast.Constant))):
+                node.body.pop(0)
+    
+    # Rename identifiers for functional clone detection
+    tree = FunctionalNormalizer().visit(tree)
+                
+    return ast.unparse(tree).strip()
+
 def normalize_code(code: str) -> str:
     """
     Normalizes Python code by parsing it into an AST, stripping docs/comments,
     and renaming identifiers to placeholders to catch functional clones.
     """
     try:
-        tree = ast.parse(code)
-        
-        # Remove docstrings
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.FunctionDef, ast.ClassDef, ast.AsyncFunctionDef, ast.Module)):
-                if (node.body and isinstance(node.body[0], ast.Expr) and 
-                    isinstance(node.body[0].value, (ast.Str, ast.Constant))):
-                    node.body.pop(0)
-        
-        # Rename identifiers for functional clone detection
-        tree = FunctionalNormalizer().visit(tree)
-                    
-        return ast.unparse(tree).strip()
+        return _normalize_tree(ast.parse(code))
     except Exception:
         return code.strip()
 
@@ -90,22 +124,295 @@ def get_code_hash(code: str) -> str:
     """
     Returns a SHA-256 hash of the normalized code.
     """
-    normalized = normalize_code(code)
+    return hash_normalized(normalize_code(code))
+
+def normalize_block(node, raw_code: str, end_line: int) -> str:
+    """
+    Returns the same result as normalize_code(raw_code) for a block, reusing its node from an
+    already parsed file instead of re-parsing the block source.
+
+    Only top-level blocks whose source slice covers the whole node are normalized from the tree;
+    indented or truncated slices don't parse on their own, so they keep using normalize_code.
+    WARNING: normalizes the node in place, so the tree must not be used afterwards.
+    """
+    if node.col_offset != 0 or getattr(node, "end_lineno", None) != end_line:
+        return normalize_code(raw_code)
+    try:
+        # The block slice starts at the definition line, so decorators are not part of it
+        node.decorator_list = []
+        return _normalize_tree(ast.Module(body=[node], type_ignores=[]))
+    except Exception:
+        return normalize_code(raw_code)
+
+def hash_normalized(normalized: str) -> str:
+    """Returns the SHA-256 hash used to group exact functional clones."""
     return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
 
+@lru_cache(maxsize=None)
+def _permutations():
+    """
+    The (a, b) coefficients of the MinHash permutations, drawn once from a fixed seed. NumPy is
+    imported here rather than at module level, so scans without --similarity do not need it.
+    """
+    import numpy as np
+    rng = np.random.RandomState(1)
+    return (rng.randint(1, _MERSENNE_PRIME, size=NUM_PERMUTATIONS).astype(np.uint64),
+            rng.randint(0, _MERSENNE_PRIME, size=NUM_PERMUTATIONS).astype(np.uint64))
+
+def get_minhash(normalized: str):
+    """
+    Computes a MinHash signature over token shingles of normalized code.
+    Returns None for blocks too small to compare meaningfully.
+    """
+    tokens = re.findall(r"\w+|[^\w\s]", normalized)
+    if len(tokens) < SHINGLE_SIZE + MIN_SHINGLES - 1:
+        return None
+    shingles = {
+        zlib.crc32(" ".join(tokens[i:i + SHINGLE_SIZE]).encode('utf-8'))
+        for i in range(len(tokens) - SHINGLE_SIZE + 1)
+    }
+    import numpy as np
+    perm_a, perm_b = _permutations()
+    values = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+    # Universal hashing (a*x + b) mod p simulates NUM_PERMUTATIONS random permutations
+    permuted = (perm_a[:, None] * values[None, :] + perm_b[:, None]) % _MERSENNE_PRIME
+    return permuted.min(axis=1).tolist()
+
+def _lsh_bands(threshold: float, num_perm: int = NUM_PERMUTATIONS):
+    """
+    Picks the (bands, rows) split whose LSH threshold (1/b)^(1/r) is closest to, but not above,
+    the requested Jaccard similarity, so true matches are rarely missed.
+    """
+    best = (num_perm, 1)
+    best_gap = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        lsh_threshold = (1.0 / bands) ** (1.0 / rows)
+        if lsh_threshold > threshold:
+            continue
+        gap = threshold - lsh_threshold
+        if best_gap is None or gap < best_gap:
+            best, best_gap = (bands, rows), gap
+    return best
+
+def _is_nested(cand, other, span=None, other_span=None) -> bool:
+    # A class and its own methods are naturally similar; that is not duplication
+    if cand["file"] != other["file"]:
+        return False
+    if span and other_span:
+        return (span[0] <= other_span[0] and other_span[1] <= span[1]) or \
+               (other_span[0] <= span[0] and span[1] <= other_span[1])
+    code, other_code = cand.get("raw_code", ""), other.get("raw_code", "")
+    return bool(code and other_code) and (code in other_code or other_code in code)
+
+def find_near_duplicates(candidates, threshold: float = 0.8, signatures=None, spans=None):
+    """
+    Finds candidates whose normalized code has an estimated Jaccard similarity of at least
+    threshold using MinHash signatures and locality-sensitive hashing, without comparing all pairs.
+    signatures optionally maps candidate index -> precomputed MinHash signature.
+    spans optionally maps candidate index -> (start, end) lines, so nesting can be detected without raw code.
+    Exact clones (same code_hash) are left to find_duplicates.
+    """
+    import numpy as np
+    signatures = signatures or {}
+    spans = spans or {}
+    bands, rows = _lsh_bands(threshold)
+
+    # Collapse exact clones so a heavily duplicated block only enters the buckets once
+    representatives = {}
+    for idx, cand in enumerate(candidates):
+        sig = signatures.get(idx)
+        if sig is None:
+            if cand.get("raw_code") is None:
+                continue
+            sig = get_minhash(normalize_code(cand["raw_code"]))
+        if sig is None:
+            continue
+        key = cand.get("code_hash") or idx
+        if key not in representatives:
+            representatives[key] = (np.asarray(sig), [])
+        representatives[key][1].append(idx)
+
+    keys = list(representatives)
+    buckets = {}
+    for pos, key in enumerate(keys):
+        sig = representatives[key][0]
+        for band in range(bands):
+            band_key = (band, sig[band * rows:(band + 1) * rows].tobytes())
+            buckets.setdefault(band_key, []).append(pos)
+
+    similar = {}
+    checked = set()
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        if len(members) > MAX_BUCKET_SIZE:
+            pairs = ((members[0], other) for other in members[1:])
+        else:
+            pairs = ((a, b) for i, a in enumerate(members) for b in members[i + 1:])
+        for a, b in pairs:
+            if (a, b) in checked:
+                continue
+            checked.add((a, b))
+            similarity = float(np.mean(representatives[keys[a]][0] == representatives[keys[b]][0]))
+            if similarity >= threshold:
+                similar.setdefault(a, []).append((b, similarity))
+                similar.setdefault(b, []).append((a, similarity))
+
+    for cand in candidates:
+        cand["is_near_duplicate"] = False
+        cand["near_duplicate_locations"] = []
+
+    for pos, matches in similar.items():
+        for idx in representatives[keys[pos]][1]:
+            cand = candidates[idx]
+            for other_pos, similarity in sorted(matches, key=lambda m: (-m[1], m[0])):
+                for other_idx in representatives[keys[other_pos]][1]:
+                    other = candidates[other_idx]
+                    if _is_nested(cand, other, spans.get(idx), spans.get(other_idx)):
+                        continue
+                    cand["near_duplicate_locations"].append(
+                        f"{other['file']}::{other['function']} (Line {other['line']}) ({similarity:.0%} similar)"
+                    )
+            cand["is_near_duplicate"] = bool(cand["near_duplicate_locations"])
+
+    return candidates
+
+def _is_docstring(stmt) -> bool:
+    return (isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant)
+            and isinstance(stmt.value.value, str))
+
+def _span(nodes) -> int:
+    return nodes[-1].end_lineno - nodes[0].lineno + 1
+
+def hash_fragments(tree, min_lines: int = MIN_FRAGMENT_LINES):
+    """
+    Hashes every AST subtree bottom-up (Merkle style) in a single post-order pass: a node's digest
+    combines its type, its fields and its children's digests, so the whole file costs linear time.
+    Following FunctionalNormalizer, identifiers are replaced by a placeholder and docstrings are ignored.
+
+    Returns the statement fragments spanning at least min_lines lines: single compound or simple
+    statements plus the statement sequences forming the bodies of compound statements.
+    Function and class definitions are left to find_duplicates. Each fragment records the index of
+    its nearest enclosing fragment as 'parent'.
+    """
+    digests = {}
+    fragments = []
+    stack = [(tree, False)]
+    while stack:
+        node, visited = stack.pop()
+        if not visited:
+            stack.append((node, True))
+            stack.extend((child, False) for child in ast.iter_child_nodes(node))
+            continue
+
+        h = hashlib.blake2b(type(node).__name__.encode('utf-8'), digest_size=16)
+        for name in node._fields:
+            value = getattr(node, name, None)
+            if name == "body" and isinstance(node, _DEF_NODES) and value and _is_docstring(value[0]):
+                value = value[1:]
+            h.update(name.encode('utf-8'))
+            if isinstance(value, ast.AST):
+                h.update(digests[id(value)])
+            elif isinstance(value, list):
+                h.update(b"[")
+                for item in value:
+                    h.update(digests[id(item)] if isinstance(item, ast.AST) else repr(item).encode('utf-8'))
+                h.update(b"]")
+            elif (type(node), name) in _IDENTIFIER_FIELDS:
+                h.update(b"_")
+            else:
+                h.update(repr(value).encode('utf-8'))
+        digests[id(node)] = h.digest()
+
+        if not isinstance(node, ast.stmt) or isinstance(node, _DEF_NODES):
+            continue
+        if _span([node]) >= min_lines:
+            fragments.append((node.lineno, -node.end_lineno, 0, digests[id(node)].hex()))
+        for name in ("body", "orelse", "finalbody"):
+            body = getattr(node, name, None)
+            if isinstance(body, list) and len(body) > 1 and _span(body) >= min_lines:
+                seq = hashlib.blake2b(b"seq", digest_size=16)
+                for stmt in body:
+                    seq.update(digests[id(stmt)])
+                fragments.append((body[0].lineno, -body[-1].end_lineno, 1, seq.hexdigest()))
+
+    # Outer fragments sort before the fragments they contain, so a stack yields each parent
+    fragments.sort()
+    result = []
+    open_fragments = []
+    for line, neg_end, _, digest in fragments:
+        end_line = -neg_end
+        while open_fragments and result[open_fragments[-1]]["end_line"] < line:
+            open_fragments.pop()
+        parent = open_fragments[-1] if open_fragments else None
+        result.append({"hash": digest, "line": line, "end_line": end_line, "parent": parent})
+        open_fragments.append(len(result) - 1)
+    return result
+
+def find_duplicate_fragments(fragments_by_file, source_lines=None):
+    """
+    Indexes fragments from hash_fragments() across files and returns the groups of duplicated fragments.
+    fragments_by_file maps a file label to its fragment list. When source_lines (a callable
+    returning a file's lines) is given, each hash group is confirmed by normalizing the fragment
+    source with normalize_code, which also restores FunctionalNormalizer's consistent renaming.
+    Groups whose members all sit inside other duplicated fragments are not reported.
+    """
+    index = {}
+    for file_label, fragments in fragments_by_file.items():
+        for pos, fragment in enumerate(fragments):
+            index.setdefault(fragment["hash"], []).append((file_label, pos))
+
+    groups = []
+    for members in index.values():
+        if len(members) < 2:
+            continue
+        if source_lines is None:
+            groups.append(members)
+            continue
+        confirmed = {}
+        for file_label, pos in members:
+            fragment = fragments_by_file[file_label][pos]
+            lines = source_lines(file_label)
+            snippet = textwrap.dedent("\n".join(lines[fragment["line"] - 1:fragment["end_line"]]))
+            confirmed.setdefault(get_code_hash(snippet), []).append((file_label, pos))
+        groups.extend(group for group in confirmed.values() if len(group) > 1)
+
+    duplicated = {member for group in groups for member in group}
+    results = []
+    for group in groups:
+        enclosed = all(
+            fragments_by_file[f][pos]["parent"] is not None and (f, fragments_by_file[f][pos]["parent"]) in duplicated
+            for f, pos in group
+        )
+        if enclosed:
+            continue
+        locations = sorted(
+            ({"file": f, "line": fragments_by_file[f][pos]["line"], "end_line": fragments_by_file[f][pos]["end_line"]}
+             for f, pos in group),
+            key=lambda loc: (loc["file"], loc["line"])
+        )
+        lines = locations[0]["end_line"] - locations[0]["line"] + 1
+        results.append({"lines": lines, "locations": locations})
+
+    results.sort(key=lambda g: (-g["lines"], g["locations"][0]["file"], g["locations"][0]["line"]))
+    return results
+
 def find_duplicates(candidates):
     """
     Groups candidates by their code hash and identifies duplicates.
-    Expects each candidate to have a 'raw_code' field.
+    Expects each candidate to have a 'raw_code' field, or a precomputed 'code_hash'.
     """
     hash_map = {}
     
     for cand in candidates:
-        if "raw_code" not in cand:
+        if "code_hash" in cand:
+            c_hash = cand["code_hash"]
+        elif "raw_code" in cand:
+            c_hash = get_code_hash(cand["raw_code"])
+            cand["code_hash"] = c_hash
+        else:
             continue
-            
-        c_hash = get_code_hash(cand["raw_code"])
-        cand["code_hash"] = c_hash
         
         if c_hash not in hash_map:
             hash_map[c_hash] = []
@@ -136,6 +443,10 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Utility for detecting duplicate code blocks using AST normalization.")
     parser.add_argument("target_dir", type=str, help="Directory to scan for duplicates")
+    parser.add_argument("--similarity", type=float, help="Also report near-duplicates with at least this Jaccard similarity (e.g. 0.8)")
+    parser.add_argument("--index", type=str, help="Update this persistent clone index (see clone_index.py) with the scanned files and report indexed clones")
+    parser.add_argument("--fragments", action="store_true", help="Also report duplicated statement blocks inside functions")
+    parser.add_argument("--min-fragment-lines", type=int, default=MIN_FRAGMENT_LINES, help=f"Minimum fragment size in lines (default: {MIN_FRAGMENT_LINES})")
     args = parser.parse_args()
 
     target_dir = Path(args.target_dir)
@@ -145,6 +456,8 @@ if __name__ == "__main__":
 
     # Simple scan for this script to work standalone
     candidates = []
+    fragments_by_file = {}
+    sources = {}
     for root, dirs, files in os.walk(target_dir):
         for file in files:
             if file.endswith(".py"):
@@ -153,11 +466,15 @@ if __name__ == "__main__":
                     content = path.read_text()
                     import ast
                     tree = ast.parse(content)
+                    if args.fragments:
+                        label = str(path.relative_to(target_dir))
+                        fragments_by_file[label] = hash_fragments(tree, args.min_fragment_lines)
+                        sources[label] = content.splitlines()
                     for node in ast.walk(tree):
                         if isinstance(node, (ast.FunctionDef, ast.ClassDef, ast.AsyncFunctionDef)):
                             # Very rough extraction for standalone use
                             lines = content.splitlines()
-                            end = getattr(node, 'endline', len(lines))
+                            end = getattr(node, 'end_lineno', len(lines))
                             raw_code = "\n".join(lines[node.lineno-1:end])
                             candidates.append({
                                 "file": str(path.relative_to(target_dir)),
@@ -178,3 +495,47 @@ if __name__ == "__main__":
         for d in dupes:
             print(f"--- {d['file']}::{d['function']} (Line {d['line']}) ---")
             print(f"Duplicates found in: {', '.join(d['duplicate_locations'])}")
+
+    if args.similarity:
+        find_near_duplicates(candidates, args.similarity)
+        near = [c for c in candidates if c.get("is_near_duplicate")]
+        if not near:
+            print("No near-duplicates found.")
+        else:
+            print(f"Found {len(near)} near-duplicate blocks:")
+            for d in near:
+                print(f"--- {d['file']}::{d['function']} (Line {d['line']}) ---")
+                print(f"Similar code found in: {', '.join(d['near_duplicate_locations'])}")
+
+    if args.fragments:
+        groups = find_duplicate_fragments(fragments_by_file, sources.__getitem__)
+        if not groups:
+            print("No duplicated fragments found.")
+        else:
+            print(f"Found {len(groups)} duplicated fragments:")
+            for g in groups:
+                print(f"--- {g['lines']} lines ---")
+                locations = [f"{loc['file']} (Lines {loc['line']}-{loc['end_line']})" for loc in g["locations"]]
+                print(f"Found in: {', '.join(locations)}")
+
+    if args.index:
+        # The index hashes blocks like identify.py, which needs radon
+        from clone_index import CloneIndex, format_location
+        from identify import iter_python_files
+
+        with CloneIndex(args.index) as index:
+            paths = list(iter_python_files(target_dir))
+            for path in paths:
+                try:
+                    index.update_file(path)
+                except Exception:
+                    continue
+            index.prune(target_dir, paths)
+            groups = index.clone_groups(target_dir)
+        if not groups:
+            print("No clone groups found in the index.")
+        else:
+            print(f"Found {len(groups)} clone groups in the index:")
+            for g in groups:
+                print(f"--- {len(g['locations'])} copies ---")
+                print(f"Found in: {', '.join(format_location(loc) for loc in g['locations'])}")
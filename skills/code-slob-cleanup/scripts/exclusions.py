@@ -84,8 +84,15 @@ def is_excluded(file_path, func_name, func_start, func_end, config, root_dir, in
             return True
             
     # Check excludeFunctions
-    exclude_funcs = config.get("excludeFunctions", [])
-    for pattern in exclude_funcs:
+    return _matches_function(rel_path, func_name, config.get("excludeFunctions", []))
+
+def is_entry_point(file_path, func_name, config, root_dir):
+    """Checks whether a function matches the entryPoints patterns used by the dead code analysis."""
+    rel_path = os.path.relpath(file_path, root_dir)
+    return _matches_function(rel_path, func_name, config.get("entryPoints", []))
+
+def _matches_function(rel_path, func_name, patterns):
+    for pattern in patterns:
         if ":" in pattern:
             path_pat, func_pat = pattern.split(":", 1)
             if fnmatch.fnmatch(rel_path, path_pat) and fnmatch.fnmatch(func_name, func_pat):
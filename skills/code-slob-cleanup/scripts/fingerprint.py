@@ -0,0 +1,16 @@
+import hashlib
+from pathlib import Path
+
+def fingerprint_sources(modules, fmt: int) -> str:
+    """
+    Hashes the source of the given scripts (file names in this directory) and a cache format
+    number, so that any change to the code producing cached results invalidates them.
+    """
+    digest = hashlib.sha256(f"format-{fmt}".encode("utf-8"))
+    scripts_dir = Path(__file__).resolve().parent
+    for name in modules:
+        try:
+            digest.update((scripts_dir / name).read_bytes())
+        except OSError:
+            digest.update(name.encode("utf-8"))
+    return digest.hexdigest()
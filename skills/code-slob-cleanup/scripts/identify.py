@@ -9,250 +9,581 @@ import sys
 import json
 import argparse
 import ast
+import bisect
+import fnmatch
+import hashlib
+import heapq
 import re
+import subprocess
+from contextlib import redirect_stdout
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 
 # Ensure we can import local modules
 sys.path.append(str(Path(__file__).parent))
 
-import metrics
-import semantic
+import analysis
 import exclusions
 import duplication
+import perf_smells
+import profiles
+from scan_cache import ScanCache
+from clone_index import CloneIndex, content_hash
+from symbol_table import SymbolTable
+from call_graph import CallGraph, collect_references, declared_entry_points
 
 class CrossReferenceAnalyzer:
-    def __init__(self, target_dir):
+    """
+    Finds the public names each project file exposes that other project files use.
+    With a SymbolTable, files are written to that persistent table instead and the
+    cross-references are read back from it, so unchanged files need not be re-scanned.
+    With a built CallGraph, references it resolves (method calls, getattr, re-exports, star-import
+    chains) are counted as well.
+    """
+    def __init__(self, target_dir, symbols=None, call_graph=None):
         self.target_dir = target_dir
         self.definitions = defaultdict(set)
-        self.files_content = {}
+        self.import_refs = {}
         self.used_outside = defaultdict(set)
+        self.symbols = symbols
+        self.call_graph = call_graph
+        self._stored_hashes = symbols.content_hashes() if symbols else {}
         
-    def add_file(self, file_path, content, func_metrics):
+    def add_file(self, file_path, content, func_metrics, import_refs=None, content_hash=None):
         # Track all public entities (classes, functions, methods) defined in the file
         public_names = {m["name"] for m in func_metrics if not m["is_private"]}
         self.definitions[file_path] = public_names
-        self.files_content[file_path] = content
+
+        # Import edges are normally collected by the single-parse analysis pass;
+        # fall back to parsing the content when they were not provided.
+        if import_refs is None:
+            try:
+                import_refs = analysis.collect_import_refs(ast.parse(content))
+            except Exception:
+                return
+        if self.symbols:
+            rel = file_path.relative_to(self.target_dir).as_posix()
+            if content_hash is None or self._stored_hashes.get(rel) != content_hash:
+                self.symbols.set_file(file_path, content_hash, func_metrics, import_refs)
+            return
+        self.import_refs[file_path] = import_refs
         
     def analyze(self):
+        """
+        Resolves every file's import edges against a module index built once up front,
+        so the pass is linear in the number of imports and accessed attributes.
+        """
+        if self.call_graph is not None:
+            for file_path, names in self.call_graph.used_outside().items():
+                self.used_outside[file_path].update(names)
+        if self.symbols:
+            for file_path, names in self.symbols.used_outside().items():
+                self.used_outside[file_path].update(names)
+            return
+
         # Map potential module paths to their file paths
-        module_to_file = {}
-        for fpath in self.definitions.keys():
-            rel = fpath.relative_to(self.target_dir)
-            parts = list(rel.with_suffix("").parts)
-            if parts and parts[-1] == "__init__":
-                parts.pop()
-            if not parts:
-                continue
-            
-            # Allow multiple module resolution paths based on potential python paths
-            for i in range(len(parts)):
-                mod_name = ".".join(parts[i:])
-                module_to_file[mod_name] = fpath
-                
-        # Parse all files to discover cross-references
-        for fpath, content in self.files_content.items():
-            try:
-                tree = ast.parse(content)
-            except Exception:
+        module_to_file = analysis.build_module_index(
+            (fpath, fpath.relative_to(self.target_dir)) for fpath in self.definitions.keys()
+        )
+
+        # Resolve each file's import edges to discover cross-references
+        for fpath, refs in self.import_refs.items():
+            rel_path = fpath.relative_to(self.target_dir)
+            for target_file, name in analysis.resolve_import_refs(fpath, rel_path, refs, module_to_file):
+                definitions = self.definitions[target_file]
+                if name == "*":
+                    self.used_outside[target_file].update(definitions)
+                elif name in definitions:
+                    self.used_outside[target_file].add(name)
+
+# Directories to exclude
+EXCLUDE_DIRS = {".git", "venv", ".venv", "__pycache__", "tests", ".pytest_cache", ".gemini", ".code-slob-tmp"}
+
+# Files whose top-level code and definitions are run by the test runner
+TEST_FILE_PATTERNS = ["test_*.py", "*_test.py", "conftest.py"]
+
+# Added to the score of definitions that no entry point can reach
+DEAD_CODE_PENALTY = 200
+
+def iter_python_files(target_dir: Path):
+    """Yields every .py file under target_dir in os.walk order, skipping excluded directories."""
+    for root, dirs, files in os.walk(target_dir):
+        # Modify dirs in-place to skip excluded directories
+        dirs[:] = [d for d in dirs if d not in EXCLUDE_DIRS and not d.startswith(".")]
+
+        for file in files:
+            if file.endswith(".py"):
+                yield Path(root) / file
+
+def iter_test_files(target_dir: Path):
+    """Yields every test file under target_dir, including those in the test directories iter_python_files skips."""
+    skipped = EXCLUDE_DIRS - {"tests"}
+    for root, dirs, files in os.walk(target_dir):
+        dirs[:] = [d for d in dirs if d not in skipped and not d.startswith(".")]
+
+        for file in files:
+            if any(fnmatch.fnmatch(file, pattern) for pattern in TEST_FILE_PATTERNS):
+                yield Path(root) / file
+
+def dead_code_roots(graph, target_dir, config, file_data):
+    """
+    Returns the call graph entry points for --dead-code: `main` functions, modules with a
+    `__main__` block (and __main__.py files), declared console scripts and entry points,
+    test files, functions matching the entryPoints config patterns and excluded functions,
+    which are kept on purpose and so may keep other code alive.
+    """
+    roots = []
+    for key, (rel, facts) in graph.files.items():
+        is_test = any(fnmatch.fnmatch(rel.name, pattern) for pattern in TEST_FILE_PATTERNS)
+        if is_test or facts["main_block"] or rel.name == "__main__.py":
+            roots.append((key, ""))
+        for qualname, _, _, _ in facts["defs"]:
+            if is_test or qualname == "main":
+                roots.append((key, qualname))
+    for module, attr in declared_entry_points(target_dir):
+        roots.extend(graph.resolve_entry_point(module, attr))
+    for data in file_data:
+        file_path = data["file_path"]
+        for m in data["func_metrics"]:
+            if (exclusions.is_entry_point(str(file_path), m["name"], config, str(target_dir))
+                    or exclusions.is_excluded(str(file_path), m["name"], m["line"], m["end_line"], config, str(target_dir), data["inline_excl"])):
+                node = graph.def_lines.get((file_path, m["line"]))
+                if node is not None:
+                    roots.append(node)
+    return roots
+
+def git_changed_files(target_dir: Path, since: str):
+    """
+    Returns the absolute paths of files that differ from the given git revision in the working tree,
+    plus untracked files, for the repository containing target_dir.
+    """
+    def git(*args, cwd):
+        return subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, check=True).stdout
+
+    top = Path(git("rev-parse", "--show-toplevel", cwd=target_dir).strip())
+    output = git("diff", "--name-only", since, "--", cwd=top) + git("ls-files", "--others", "--exclude-standard", cwd=top)
+    return [(top / line).resolve() for line in output.splitlines() if line.strip()]
+
+def read_changed_files(list_path: str):
+    """Reads changed file paths (one per line, relative to the working directory) from a file or '-' for stdin."""
+    if list_path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        lines = Path(list_path).read_text(encoding="utf-8").splitlines()
+    return [Path(line.strip()).resolve() for line in lines if line.strip()]
+
+def analyze_file(file_path: Path, use_globals=False, use_duplicates=False, use_imports=False, use_similarity=False,
+                 fragment_lines=None, use_calls=False, use_perf=False, cache=None):
+    """
+    Runs the Pass 1 analysis for a single file and returns a compact record.
+    The record only holds what later passes need, so it is cheap to ship back from a worker process.
+    When a ScanCache is given, unchanged files are served from it instead of being re-analyzed.
+    """
+    content = file_path.read_text(encoding="utf-8")
+
+    if cache:
+        cache_key = cache.key(file_path, content)
+        record = cache.load(cache_key, file_path)
+        if record is not None:
+            return record
+
+    record = {
+        "file_path": file_path,
+        "inline_excl": exclusions.get_inline_exclusions(str(file_path)),
+        **analysis.analyze_source(str(file_path), content, use_globals=use_globals,
+                                  use_duplicates=use_duplicates, use_imports=use_imports,
+                                  use_similarity=use_similarity, fragment_lines=fragment_lines,
+                                  use_calls=use_calls, use_perf=use_perf)
+    }
+    # Lets the clone index and symbol table skip files they already hold
+    record["content_hash"] = content_hash(content)
+    if cache:
+        cache.store(cache_key, record)
+    return record
+
+def _analyze_file_task(file_path, **options):
+    # Worker entry point: errors are returned instead of raised so they are reported in walk order
+    try:
+        return analyze_file(file_path, **options), None
+    except Exception as e:
+        return None, e
+
+def collect_file_data(paths, jobs=1, **options):
+    """
+    Runs Pass 1 over paths, serially or fanned out across a process pool when jobs > 1.
+    Results are yielded in the same order as paths so both modes produce identical reports.
+    """
+    task = partial(_analyze_file_task, **options)
+    if jobs and jobs > 1 and len(paths) > 1:
+        chunksize = max(1, len(paths) // (jobs * 8))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = executor.map(task, paths, chunksize=chunksize)
+            for file_path, (record, error) in zip(paths, results):
+                if error is not None:
+                    print(f"Error processing {file_path}: {error}", file=sys.stderr)
+                    continue
+                yield record
+    else:
+        for file_path in paths:
+            record, error = task(file_path)
+            if error is not None:
+                print(f"Error processing {file_path}: {error}", file=sys.stderr)
                 continue
-                
-            imported_modules = set()
-            
-            for node in ast.walk(tree):
-                if isinstance(node, ast.ImportFrom):
-                    mod_name = node.module
-                    if node.level > 0:
-                        # Handle relative imports
-                        rel_parts = list(fpath.relative_to(self.target_dir).parts)[:-1]
-                        for _ in range(node.level - 1):
-                            if rel_parts: rel_parts.pop()
-                        if mod_name:
-                            full_mod = ".".join(rel_parts + mod_name.split("."))
-                        else:
-                            full_mod = ".".join(rel_parts)
-                    else:
-                        full_mod = mod_name
-                    
-                    target_file = module_to_file.get(full_mod)
-                    if target_file and target_file != fpath:
-                        imported_modules.add(target_file)
-                        for alias in node.names:
-                            if alias.name == "*":
-                                self.used_outside[target_file].update(self.definitions[target_file])
-                            elif alias.name in self.definitions[target_file]:
-                                self.used_outside[target_file].add(alias.name)
-                                
-                elif isinstance(node, ast.Import):
-                    for alias in node.names:
-                        target_file = module_to_file.get(alias.name)
-                        if target_file and target_file != fpath:
-                            import_alias = alias.asname or alias.name.split('.')[-1]
-                            for subnode in ast.walk(tree):
-                                if isinstance(subnode, ast.Attribute) and isinstance(subnode.value, ast.Name):
-                                    if subnode.value.id == import_alias:
-                                        if subnode.attr in self.definitions[target_file]:
-                                            self.used_outside[target_file].add(subnode.attr)
-
-            # For ast.ImportFrom, we already handled it by adding the names directly to self.used_outside
-            # So we don't need a fallback rough text search anymore, making it more accurate and preventing cross-contamination of duplicate names.
-
-def scan_directory(target_dir: Path, use_globals=False, use_complexity=False, use_lloc=False, use_pub_priv=False, use_duplicates=False):
+            yield record
+
+def _smells_by_block(func_metrics, smells):
+    """Assigns each [kind, line] smell to the innermost block containing its line, keyed by block index."""
+    blocks = sorted(range(len(func_metrics)), key=lambda i: func_metrics[i]["line"])
+    starts = [func_metrics[i]["line"] for i in blocks]
+    by_block = defaultdict(list)
+    for kind, line in smells:
+        # Nested blocks start later, so the innermost match is the last started one still open
+        for pos in range(bisect.bisect_right(starts, line) - 1, -1, -1):
+            idx = blocks[pos]
+            if func_metrics[idx]["end_line"] >= line:
+                by_block[idx].append({"kind": kind, "line": line})
+                break
+    return by_block
+
+def _file_candidates(data, target_dir, config, analyzer, use_globals=False, use_complexity=False, use_lloc=False,
+                     use_pub_priv=False, use_duplicates=False, dead_code=None, use_perf=False, profile=None):
+    """
+    Builds the slob candidates of a single Pass 1 record.
+    Returns (candidate, block metrics) pairs; the file-level globals candidate has no block metrics.
+    dead_code holds the definition lines of this file that --dead-code found unreachable.
+    With a ProfileIndex, profiled blocks carry their profile stats and a hotness-weighted score.
+    """
+    candidates = []
+    file_path = data["file_path"]
+    func_metrics = data["func_metrics"]
+    semantic_info = data["semantic_info"]
+    global_vars = data["global_vars"]
+    inline_excl = data["inline_excl"]
+    if use_perf:
+        smells_by_block = _smells_by_block(func_metrics, data["perf_smells"])
+        smell_scores = {**perf_smells.SMELL_SCORES, **config.get("perfSmellScores", {})}
+    block_profiles = profile.block_stats(file_path, func_metrics) if profile else {}
+
+    # Add file-level slob candidate for globals if any
+    if use_globals and global_vars:
+         candidates.append(({
+            "file": str(file_path.relative_to(target_dir)),
+            "function": "Global Scope",
+            "line": global_vars[0]["lines"][0] if global_vars else 1,
+            "type": "Global",
+            "is_private": False,
+            "is_public_unused_outside": False,
+            "metrics": {
+                "complexity": 0,
+                "loc": 0,
+                "slob_score": len(global_vars) * 5.0,
+                "semantic_penalty": len(global_vars) * 5.0,
+                "total_score": round(len(global_vars) * 5.0, 2)
+            },
+            "semantic_info": {
+                "relevance": 1.0,
+                "global_vars_count": len(global_vars),
+                "global_vars": global_vars
+            },
+            "high_severity": (len(global_vars) * 5.0) > 100
+        }, None))
+
+    for idx, m in enumerate(func_metrics):
+        if exclusions.is_excluded(str(file_path), m["name"], m["line"], m["end_line"], config, str(target_dir), inline_excl):
+            continue
+
+        # Check if it's a public entity that is never used outside its defining file
+        is_public_unused_outside = False
+        if use_pub_priv:
+            is_dunder = m["name"].startswith('__') and m["name"].endswith('__')
+
+            # Note: "main" is a common entrypoint, so we don't force it to be private.
+            if not m["is_private"] and not is_dunder and m["name"] != "main":
+                if analyzer and m["name"] not in analyzer.used_outside.get(file_path, set()):
+                    is_public_unused_outside = True
+
+        # Determine overall slob severity
+        total_score = 0
+        if use_complexity:
+            total_score += (m["complexity"] ** 2)
+        if use_lloc:
+            total_score += (m["loc"] / 5.0)
+        # Global penalty is now handled at file level, so we don't add it to every function here
+        # to avoid double counting and redundant output.
+
+        is_high_severity = False
+        if use_complexity and m["complexity"] > 10:
+            is_high_severity = True
+        if use_lloc and m["loc"] > 50:
+            is_high_severity = True
+        if total_score > 100:
+            is_high_severity = True
+        if use_pub_priv and is_public_unused_outside:
+            is_high_severity = True
+            # Add a large penalty so it's prioritized for cleanup
+            total_score += 150 
+        is_dead_code = dead_code is not None and m["line"] in dead_code
+        if is_dead_code:
+            is_high_severity = True
+            total_score += DEAD_CODE_PENALTY
+        if use_perf:
+            smells = [smell for smell in smells_by_block.get(idx, []) if smell_scores.get(smell["kind"], 0) > 0]
+            if smells:
+                is_high_severity = True
+                total_score += sum(smell_scores[smell["kind"]] for smell in smells)
+
+        block_profile = block_profiles.get(idx)
+        if block_profile:
+            total_score = profiles.weighted_score(total_score, block_profile["hotness"])
+
+        if not is_high_severity and total_score <= 0 and not use_duplicates:
+            # If no identifiers are active or found, skip this candidate
+            continue
+
+        candidates.append(({
+            "file": str(file_path.relative_to(target_dir)),
+            "function": m["name"],
+            "line": m["line"],
+            "type": m["type"],
+            "is_private": m["is_private"],
+            "is_public_unused_outside": is_public_unused_outside,
+            "raw_code": m["raw_code"],
+            "metrics": {
+                "complexity": m["complexity"] if use_complexity else 0,
+                "loc": m["loc"] if use_lloc else 0,
+                "slob_score": total_score,
+                "semantic_penalty": 0, # Globals handled at file level
+                "total_score": round(total_score, 2)
+            },
+            "semantic_info": {
+                "relevance": semantic_info["relevance_score"],
+                "global_vars_count": 0,
+                "global_vars": []
+            },
+            "high_severity": is_high_severity
+        }, m))
+        if "code_hash" in m:
+            candidates[-1][0]["code_hash"] = m["code_hash"]
+        if dead_code is not None:
+            candidates[-1][0]["is_dead_code"] = is_dead_code
+        if use_perf:
+            candidates[-1][0]["perf_smells"] = smells
+        if block_profile:
+            candidates[-1][0]["profile"] = block_profile
+
+    return candidates
+
+def scan_directory(target_dir: Path, use_globals=False, use_complexity=False, use_lloc=False, use_pub_priv=False, use_duplicates=False, jobs=1, cache_dir=None, similarity=None, fragment_lines=None,
+                   clone_index=None, changed_files=None, emit=None, load_raw_code=True, symbols=None, use_call_graph=False,
+                   use_dead_code=False, use_perf_smells=False, profile=None):
+    """
+    Scans target_dir and returns (files_scanned, slob_candidates, duplicate_fragments).
+    duplicate_fragments is only populated when fragment_lines is set.
+    With use_duplicates and a clone_index path, the scanned files are written to that persistent
+    index and blocks are also reported as duplicates of indexed code outside this scan.
+    With changed_files, only candidates from those files are reported. Cross-references and
+    duplicate groups are still resolved against the whole tree, whose unchanged files are
+    served from the cache when cache_dir is set.
+    With use_pub_priv and a symbols path, definitions and import edges are kept in that persistent
+    SymbolTable; in changed-files mode the unchanged files are then not scanned for cross-references.
+    With use_pub_priv and use_call_graph, usages are also resolved through the whole-program CallGraph.
+    With use_dead_code, definitions the CallGraph cannot reach from any entry point (see
+    dead_code_roots) are flagged; test files skipped by the scan still count as entry points.
+    With use_perf_smells, blocks containing performance anti-patterns (see perf_smells.py) are
+    flagged and scored per occurrence.
+    With profile (merged pstats.Stats), candidate scores are weighted by the CPU share of their block.
+    With emit, each candidate is passed to emit as soon as it is final instead of being returned,
+    and raw code is re-read from disk at that point (or left as None without load_raw_code).
+    """
     slob_candidates = []
-    files_scanned = 0
 
     # Load configuration
     config = exclusions.load_config(target_dir)
 
-    # Directories to exclude
-    exclude_dirs = {".git", "venv", ".venv", "__pycache__", "tests", ".pytest_cache", ".gemini", ".code-slob-tmp"}
-
     # --- Pass 1: Collect Data ---
-    file_data = []
-    analyzer = CrossReferenceAnalyzer(target_dir) if use_pub_priv else None
-
-    for root, dirs, files in os.walk(target_dir):
-        # Modify dirs in-place to skip excluded directories
-        dirs[:] = [d for d in dirs if d not in exclude_dirs and not d.startswith(".")]
+    paths = list(iter_python_files(target_dir))
+    files_total = len(paths)
+    profile_index = profiles.ProfileIndex(profile, paths, target_dir) if profile else None
+    symbol_table = SymbolTable(symbols, target_dir) if use_pub_priv and symbols else None
+    report_files = None
+    if changed_files is not None:
+        changed = set(changed_files)
+        changed_paths = [p for p in paths if p in changed]
+        report_files = {str(p.relative_to(target_dir)) for p in changed_paths}
+        # Without cross-file identifiers the rest of the tree is not needed at all
+        if not (use_pub_priv or use_duplicates or fragment_lines or use_dead_code):
+            paths = changed_paths
+        elif symbol_table and not symbol_table.is_empty() and not (use_duplicates or fragment_lines or use_call_graph or use_dead_code):
+            # Cross-references of unchanged files are already in the symbol table
+            for path in changed:
+                if not path.exists() and target_dir in path.parents:
+                    symbol_table.remove_file(path)
+            paths = changed_paths
+        elif not cache_dir:
+            print("Note: without --cache-dir, unchanged files are re-analyzed to resolve cross-file results.", file=sys.stderr)
+        files_scanned = len(changed_paths)
+    else:
+        files_scanned = len(paths)
+    use_calls = bool(use_pub_priv and use_call_graph) or use_dead_code
+    graph = CallGraph() if use_calls else None
+    analyzer = CrossReferenceAnalyzer(target_dir, symbol_table, graph if use_call_graph else None) if use_pub_priv else None
+    dead_code = {} if use_dead_code else None
+    # Near-duplicate detection builds on the exact clone hashes
+    use_similarity = bool(use_duplicates and similarity)
+    cache_flags = {"globals": use_globals, "duplicates": use_duplicates, "imports": use_pub_priv, "similarity": use_similarity,
+                   "fragments": fragment_lines, "calls": use_calls, "perf": use_perf_smells}
+    cache = ScanCache(cache_dir, cache_flags) if cache_dir else None
+
+    index = CloneIndex(clone_index) if use_duplicates and clone_index else None
+    # Files whose indexed content hash still matches are not rewritten
+    indexed_hashes = index.content_hashes(target_dir) if index else {}
+    # Candidates depend on other files only through duplicate groups; everything else can be
+    # emitted file by file once cross-references are resolved
+    streaming = emit is not None
+    deferred = not streaming or use_duplicates
+    read_lines = lru_cache(maxsize=8)(lambda path: path.read_text(encoding="utf-8").splitlines())
+
+    def finish(cand, span):
+        if span is not None and cand.get("raw_code", "") is None and load_raw_code:
+            file_path, line, end_line = span
+            cand["raw_code"] = "\n".join(read_lines(file_path)[line - 1:end_line])
+        if report_files is None or cand["file"] in report_files:
+            emit(cand)
+
+    # MinHash signatures and source spans by candidate index; kept out of the candidates so they don't bloat the report
+    minhashes = {}
+    spans = {}
+    fragments_by_file = {}
+
+    def process(data):
+        file_path = data["file_path"]
+        if fragment_lines:
+            inline_excl = data["inline_excl"]
+            fragments_by_file[file_path] = [
+                f for f in data["fragments"]
+                if not exclusions.is_excluded(str(file_path), "", f["line"], f["end_line"], config, str(target_dir), inline_excl)
+            ]
+        for cand, m in _file_candidates(data, target_dir, config, analyzer, use_globals=use_globals,
+                                        use_complexity=use_complexity, use_lloc=use_lloc,
+                                        use_pub_priv=use_pub_priv, use_duplicates=use_duplicates,
+                                        dead_code=dead_code.get(file_path, {}) if use_dead_code else None,
+                                        use_perf=use_perf_smells, profile=profile_index):
+            span = (file_path, m["line"], m["end_line"]) if m is not None else None
+            if not deferred:
+                finish(cand, span)
+                continue
+            slob_candidates.append(cand)
+            if span is not None:
+                spans[len(slob_candidates) - 1] = span
+            if m is not None and m.get("minhash") is not None:
+                minhashes[len(slob_candidates) - 1] = m["minhash"]
 
-        for file in files:
-            if file.endswith(".py"):
-                files_scanned += 1
-                file_path = Path(root) / file
+    file_data = []
+    for record in collect_file_data(paths, jobs=jobs, use_globals=use_globals, use_duplicates=use_duplicates,
+                                    use_imports=use_pub_priv, use_similarity=use_similarity,
+                                    fragment_lines=fragment_lines, use_calls=use_calls, use_perf=use_perf_smells, cache=cache):
+        if analyzer:
+            analyzer.add_file(record["file_path"], None, record["func_metrics"], record.pop("import_refs"),
+                              record["content_hash"])
+        if graph:
+            graph.add_file(record["file_path"], record["file_path"].relative_to(target_dir), record.pop("call_refs"))
+        if index and indexed_hashes.get(index.path_key(record["file_path"])) != record["content_hash"]:
+            blocks = [(m["name"], m["line"], m["end_line"], m["code_hash"]) for m in record["func_metrics"]]
+            index.set_blocks(record["file_path"], blocks, record["content_hash"])
+        if streaming:
+            # Only the source span is kept; the code itself is re-read when the candidate is emitted
+            for m in record["func_metrics"]:
+                m["raw_code"] = None
+        if analyzer or graph:
+            # Cross-references are only known once every file has been added
+            file_data.append(record)
+        else:
+            process(record)
 
-                try:
-                    content = file_path.read_text(encoding="utf-8")
-
-                    inline_excl = exclusions.get_inline_exclusions(str(file_path))
-                    func_metrics = metrics.get_function_metrics(content)
-
-                    if analyzer:
-                        analyzer.add_file(file_path, content, func_metrics)
-
-                    semantic_score = semantic.get_semantic_slob_score(str(file_path), content)
-                    semantic_info = semantic.evaluate_semantic_relevance(str(file_path), content)
-                    global_vars = semantic.detect_global_variables(content) if use_globals else []
-
-                    file_data.append({
-                        "file_path": file_path,
-                        "content": content,
-                        "inline_excl": inline_excl,
-                        "func_metrics": func_metrics,
-                        "semantic_score": semantic_score,
-                        "semantic_info": semantic_info,
-                        "global_vars": global_vars
-                    })
-                except Exception as e:
-                    print(f"Error processing {file_path}: {e}", file=sys.stderr)
+    if index:
+        index.prune(target_dir, paths)
+    if cache:
+        cache.prune(full_scan=len(paths) == files_total)
 
     # --- Analyze Cross-References ---
+    if graph:
+        if use_dead_code:
+            scanned = set(paths)
+            for test_path in iter_test_files(target_dir):
+                if test_path in scanned:
+                    continue
+                try:
+                    facts = collect_references(ast.parse(test_path.read_text(encoding="utf-8")))
+                except (OSError, ValueError, SyntaxError):
+                    continue
+                graph.add_file(test_path, test_path.relative_to(target_dir), facts, external=True)
+        graph.build()
+        if use_dead_code:
+            dead_code.update(graph.unreachable(dead_code_roots(graph, target_dir, config, file_data)))
     if analyzer:
+        if symbol_table and changed_files is None:
+            symbol_table.prune(paths)
         analyzer.analyze()
+    if symbol_table:
+        symbol_table.close()
 
     # --- Pass 2: Determine Slob Candidates ---
-    for data in file_data:
-        file_path = data["file_path"]
-        func_metrics = data["func_metrics"]
-        semantic_score = data["semantic_score"]
-        semantic_info = data["semantic_info"]
-        global_vars = data["global_vars"]
-        inline_excl = data["inline_excl"]
-
-        # Add file-level slob candidate for globals if any
-        if use_globals and global_vars:
-             slob_candidates.append({
-                "file": str(file_path.relative_to(target_dir)),
-                "function": "Global Scope",
-                "line": global_vars[0]["lines"][0] if global_vars else 1,
-                "type": "Global",
-                "is_private": False,
-                "is_public_unused_outside": False,
-                "metrics": {
-                    "complexity": 0,
-                    "loc": 0,
-                    "slob_score": len(global_vars) * 5.0,
-                    "semantic_penalty": len(global_vars) * 5.0,
-                    "total_score": round(len(global_vars) * 5.0, 2)
-                },
-                "semantic_info": {
-                    "relevance": 1.0,
-                    "global_vars_count": len(global_vars),
-                    "global_vars": global_vars
-                },
-                "high_severity": (len(global_vars) * 5.0) > 100
-            })
-
-        for m in func_metrics:
-            if exclusions.is_excluded(str(file_path), m["name"], m["line"], m["end_line"], config, str(target_dir), inline_excl):
-                continue
-
-            # Check if it's a public entity that is never used outside its defining file
-            is_public_unused_outside = False
-            if use_pub_priv:
-                is_dunder = m["name"].startswith('__') and m["name"].endswith('__')
-
-                # Note: "main" is a common entrypoint, so we don't force it to be private.
-                if not m["is_private"] and not is_dunder and m["name"] != "main":
-                    if analyzer and m["name"] not in analyzer.used_outside.get(file_path, set()):
-                        is_public_unused_outside = True
-
-            # Determine overall slob severity
-            total_score = 0
-            if use_complexity:
-                total_score += (m["complexity"] ** 2)
-            if use_lloc:
-                total_score += (m["loc"] / 5.0)
-            # Global penalty is now handled at file level, so we don't add it to every function here
-            # to avoid double counting and redundant output.
-
-            is_high_severity = False
-            if use_complexity and m["complexity"] > 10:
-                is_high_severity = True
-            if use_lloc and m["loc"] > 50:
-                is_high_severity = True
-            if total_score > 100:
-                is_high_severity = True
-            if use_pub_priv and is_public_unused_outside:
-                is_high_severity = True
-                # Add a large penalty so it's prioritized for cleanup
-                total_score += 150 
-
-            if not is_high_severity and total_score <= 0 and not use_duplicates:
-                # If no identifiers are active or found, skip this candidate
-                continue
-
-            slob_candidates.append({
-                "file": str(file_path.relative_to(target_dir)),
-                "function": m["name"],
-                "line": m["line"],
-                "type": m["type"],
-                "is_private": m["is_private"],
-                "is_public_unused_outside": is_public_unused_outside,
-                "raw_code": m["raw_code"],
-                "metrics": {
-                    "complexity": m["complexity"] if use_complexity else 0,
-                    "loc": m["loc"] if use_lloc else 0,
-                    "slob_score": total_score,
-                    "semantic_penalty": 0, # Globals handled at file level
-                    "total_score": round(total_score, 2)
-                },
-                "semantic_info": {
-                    "relevance": semantic_info["relevance_score"],
-                    "global_vars_count": 0,
-                    "global_vars": []
-                },
-                "high_severity": is_high_severity
-            })
+    for record in file_data:
+        process(record)
+    file_data = None
 
     if use_duplicates:
         slob_candidates = duplication.find_duplicates(slob_candidates)
+        if index:
+            # Copies inside this scan are already grouped; add the ones only the index knows about
+            scanned = {index.path_key(p) for p in paths}
+            for cand in slob_candidates:
+                if "code_hash" not in cand:
+                    continue
+                external = [loc for loc in index.lookup(cand["code_hash"]) if loc["path"] not in scanned]
+                if external:
+                    cand["is_duplicate"] = True
+                    cand["duplicate_locations"] += [f"{loc['path']}::{loc['name']} (Line {loc['line']})" for loc in external]
+            index.close()
         # Update scores for duplicates
         for cand in slob_candidates:
             if cand.get("is_duplicate"):
                 cand["metrics"]["total_score"] += 100
                 cand["high_severity"] = True
 
-    return files_scanned, slob_candidates
+        if use_similarity:
+            slob_candidates = duplication.find_near_duplicates(
+                slob_candidates, similarity, minhashes, {idx: span[1:] for idx, span in spans.items()}
+            )
+            for cand in slob_candidates:
+                if cand.get("is_near_duplicate"):
+                    cand["metrics"]["total_score"] += 50
+                    cand["high_severity"] = True
+
+    duplicate_fragments = []
+    if fragment_lines:
+        source_lines = lru_cache(maxsize=None)(lambda path: path.read_text(encoding="utf-8").splitlines())
+        duplicate_fragments = duplication.find_duplicate_fragments(fragments_by_file, source_lines)
+        for group in duplicate_fragments:
+            for loc in group["locations"]:
+                loc["file"] = str(loc["file"].relative_to(target_dir))
+
+    if report_files is not None:
+        duplicate_fragments = [
+            g for g in duplicate_fragments if any(loc["file"] in report_files for loc in g["locations"])
+        ]
+    if streaming:
+        for idx, cand in enumerate(slob_candidates):
+            # Drop each candidate once emitted so raw code never accumulates
+            slob_candidates[idx] = None
+            finish(cand, spans.get(idx))
+        slob_candidates = []
+    elif report_files is not None:
+        slob_candidates = [c for c in slob_candidates if c["file"] in report_files]
+
+    return files_scanned, slob_candidates, duplicate_fragments
 
 def get_slob_classification(score):
     if score < 100:
@@ -262,16 +593,104 @@ def get_slob_classification(score):
     else:
         return "High Slob"
 
+def store_raw_code(cand, omit=False, raw_code_dir=None):
+    """
+    Removes raw_code from a candidate before it is written out, either dropping it or saving it
+    under raw_code_dir (named by content hash) and recording the path as raw_code_file.
+    """
+    if not omit and raw_code_dir is None:
+        return cand
+    raw_code = cand.pop("raw_code", None)
+    if raw_code is not None and raw_code_dir is not None:
+        raw_path = raw_code_dir / f"{hashlib.sha256(raw_code.encode('utf-8')).hexdigest()[:16]}.py"
+        if not raw_path.exists():
+            raw_path.write_text(raw_code, encoding="utf-8")
+        cand["raw_code_file"] = str(raw_path)
+    return cand
+
+class TopK:
+    """
+    Bounded min-heap of the n highest-scoring items. Ties keep insertion order,
+    so the result matches a stable descending sort truncated to n items.
+    """
+    def __init__(self, n):
+        self.n = n
+        self.heap = []
+        self.seen = 0
+
+    def push(self, score, item):
+        entry = (score, -self.seen, item)
+        self.seen += 1
+        if len(self.heap) < self.n:
+            heapq.heappush(self.heap, entry)
+        elif self.n > 0:
+            heapq.heappushpop(self.heap, entry)
+
+    def items(self):
+        return [(score, item) for score, _, item in sorted(self.heap, key=lambda e: (-e[0], -e[1]))]
+
+class TopFiles:
+    """
+    Keeps the n files with the highest total slob score and their candidates.
+    Expects candidates grouped by file, as scan_directory produces them, so only the
+    current file and the n best files so far are held in memory.
+    """
+    def __init__(self, n):
+        self.top = TopK(n)
+        self.file = None
+        self.cands = []
+        self.total = 0.0
+
+    def add(self, cand):
+        if cand["file"] != self.file:
+            self._flush()
+            self.file = cand["file"]
+        self.cands.append(cand)
+        self.total += cand["metrics"]["total_score"]
+
+    def _flush(self):
+        if self.file is not None:
+            self.top.push(self.total, (self.file, self.cands))
+        self.file, self.cands, self.total = None, [], 0.0
+
+    def items(self):
+        """Returns (file, total score, candidates) for the kept files, best first."""
+        self._flush()
+        return [(file_path, total, cands) for total, (file_path, cands) in self.top.items()]
+
 def main():
     parser = argparse.ArgumentParser(description="Scan directory for Code Slob.")
     parser.add_argument("target_dir", type=str, help="Directory to scan")
     parser.add_argument("--output", type=str, help="Output report file (optional JSON)")
+    parser.add_argument("--format", choices=["json", "jsonl"], default="json",
+                        help="Report format; jsonl streams one candidate per line as soon as it is final (to --output or stdout)")
+    parser.add_argument("--omit-raw-code", action="store_true", help="Leave the source of each candidate out of the report")
+    parser.add_argument("--raw-code-dir", type=str, help="Write the source of each candidate to this directory instead of embedding it in the report")
     parser.add_argument("--global-variables", action="store_true", help="Detect global variables")
     parser.add_argument("--complexity", action="store_true", help="Analyze cyclomatic complexity")
     parser.add_argument("--lloc", action="store_true", help="Analyze logical lines of code")
     parser.add_argument("--public-private", action="store_true", help="Analyze public/private usage")
     parser.add_argument("--duplicates", action="store_true", help="Analyze code duplication")
+    parser.add_argument("--similarity", type=float, help="With --duplicates, also flag near-duplicates with at least this Jaccard similarity (e.g. 0.8)")
+    parser.add_argument("--clone-index", type=str, help="With --duplicates, update this persistent clone index and report clones of indexed code from other trees")
+    parser.add_argument("--call-graph", action="store_true",
+                        help="With --public-private, also count method calls, getattr, package re-exports and star-import chains as usages")
+    parser.add_argument("--dead-code", action="store_true",
+                        help="Flag functions and classes unreachable from entry points (main, __main__ blocks, console scripts, tests)")
+    parser.add_argument("--perf-smells", action="store_true",
+                        help="Flag performance anti-patterns (list membership or string += in loops, pop(0), sorting in loops, ...)")
+    parser.add_argument("--profile", type=str, nargs="+",
+                        help="Weight scores by CPU time from these cProfile/pstats dumps (merged; non-project frames are ignored)")
+    parser.add_argument("--symbols", type=str, help="With --public-private, keep definitions and import edges in this persistent symbol table (see symbol_table.py)")
+    parser.add_argument("--fragments", action="store_true", help="Report duplicated statement blocks inside functions")
+    parser.add_argument("--min-fragment-lines", type=int, default=duplication.MIN_FRAGMENT_LINES,
+                        help=f"With --fragments, minimum fragment size in lines (default: {duplication.MIN_FRAGMENT_LINES})")
+    parser.add_argument("--since", type=str, help="Only report slob in files changed since this git revision (e.g. origin/main)")
+    parser.add_argument("--changed-files", type=str, help="Only report slob in the files listed in this file, one per line ('-' for stdin)")
     parser.add_argument("--file-count", type=int, help="Display top N files with highest total slob score")
+    parser.add_argument("--top", type=int, help="Display only the K highest-scoring candidates")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of worker processes for the per-file analysis pass")
+    parser.add_argument("--cache-dir", type=str, help="Reuse per-file analysis results stored in this directory across runs")
 
     args = parser.parse_args()
     target_dir = Path(args.target_dir).resolve()
@@ -280,69 +699,172 @@ def main():
         print(f"Error: Target directory {target_dir} does not exist.", file=sys.stderr)
         sys.exit(1)
 
-    files_scanned, slob_candidates = scan_directory(
-        target_dir, 
+    changed_files = None
+    if args.since:
+        try:
+            changed_files = git_changed_files(target_dir, args.since)
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"Error: could not list files changed since {args.since}: {getattr(e, 'stderr', None) or e}", file=sys.stderr)
+            sys.exit(1)
+    if args.changed_files:
+        changed_files = (changed_files or []) + read_changed_files(args.changed_files)
+
+    if args.duplicates and args.similarity:
+        # MinHash signatures need NumPy; plain scans do not
+        try:
+            import numpy
+        except ImportError:
+            print("Error: --similarity needs numpy (e.g. uv run --with numpy scripts/identify.py ...)", file=sys.stderr)
+            sys.exit(1)
+
+    profile = None
+    if args.profile:
+        try:
+            profile = profiles.load_profiles(args.profile)
+        except (OSError, TypeError, ValueError, EOFError) as e:
+            print(f"Error: could not load profile data: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    raw_code_dir = Path(args.raw_code_dir).resolve() if args.raw_code_dir else None
+    if raw_code_dir:
+        raw_code_dir.mkdir(parents=True, exist_ok=True)
+
+    scan_options = dict(
         use_globals=args.global_variables,
         use_complexity=args.complexity,
         use_lloc=args.lloc,
         use_pub_priv=args.public_private,
-        use_duplicates=args.duplicates
+        use_duplicates=args.duplicates,
+        jobs=args.jobs,
+        cache_dir=Path(args.cache_dir).resolve() if args.cache_dir else None,
+        similarity=args.similarity,
+        fragment_lines=args.min_fragment_lines if args.fragments else None,
+        clone_index=Path(args.clone_index).resolve() if args.clone_index else None,
+        changed_files=changed_files,
+        symbols=Path(args.symbols).resolve() if args.symbols else None,
+        use_call_graph=args.call_graph,
+        use_dead_code=args.dead_code,
+        use_perf_smells=args.perf_smells,
+        profile=profile
     )
 
-    # Print summary
-    print(f"--- Identification Summary ---")
-    print(f"Files Scanned: {files_scanned}")
-    print(f"Functions/Classes Found: {len(slob_candidates)}")
-    print(f"Slob Candidates: {len([c for c in slob_candidates if c['high_severity']])}")
-    print("------------------------------")
-
-    if args.file_count:
-        # Group by file and sum scores
-        file_groups = defaultdict(list)
-        file_scores = defaultdict(float)
+    # Console-only listings do not need every candidate (or its source) kept until the end
+    collect_all = args.format == "json" and (args.output or not (args.file_count or args.top))
+    top_files = TopFiles(args.file_count) if args.file_count else None
+    top = TopK(args.top) if args.top and not args.file_count else None
+
+    if collect_all:
+        files_scanned, slob_candidates, duplicate_fragments = scan_directory(target_dir, **scan_options)
+        num_candidates = len(slob_candidates)
+        num_slob = len([c for c in slob_candidates if c['high_severity']])
         for cand in slob_candidates:
-            file_groups[cand["file"]].append(cand)
-            file_scores[cand["file"]] += cand["metrics"]["total_score"]
-
-        # Sort files by total score descending
-        sorted_files = sorted(file_scores.items(), key=lambda x: x[1], reverse=True)
-        top_files = sorted_files[:args.file_count]
-
-        for file_path, total_score in top_files:
-            print(f"\n--- {file_path} (Total Slob Score: {round(total_score, 2)}) ---")
-            # Sort candidates in file by score
-            cands = sorted(file_groups[file_path], key=lambda x: x["metrics"]["total_score"], reverse=True)
-            for cand in cands:
-                print_candidate(cand)
+            if top_files:
+                top_files.add(cand)
+            elif top and is_reported(cand):
+                top.push(cand["metrics"]["total_score"], cand)
+        log = sys.stdout
     else:
-        # Sort by score descending
-        slob_candidates.sort(key=lambda x: x["metrics"]["total_score"], reverse=True)
-        for cand in slob_candidates:
-            print_candidate(cand)
+        totals = {"candidates": 0, "slob_candidates": 0}
+        out = None
+        if args.format == "jsonl":
+            out = open(args.output, "w") if args.output else sys.stdout
+
+        def emit(cand):
+            totals["candidates"] += 1
+            totals["slob_candidates"] += bool(cand["high_severity"])
+            if out:
+                out.write(json.dumps(store_raw_code(cand, args.omit_raw_code, raw_code_dir)) + "\n")
+                out.flush()
+            cand.pop("raw_code", None)
+            if top_files:
+                top_files.add(cand)
+            elif top and is_reported(cand):
+                top.push(cand["metrics"]["total_score"], cand)
+
+        files_scanned, _, duplicate_fragments = scan_directory(
+            target_dir, emit=emit, load_raw_code=out is not None and not args.omit_raw_code, **scan_options
+        )
+        num_candidates, num_slob = totals["candidates"], totals["slob_candidates"]
+        if out:
+            for group in duplicate_fragments:
+                out.write(json.dumps({"duplicate_fragment": group}) + "\n")
+            summary = {"files_scanned": files_scanned, **totals, "duplicate_fragments": len(duplicate_fragments)}
+            out.write(json.dumps({"summary": summary}) + "\n")
+            if out is not sys.stdout:
+                out.close()
+        # Keep stdout clean when it carries the stream itself
+        log = sys.stderr if out is sys.stdout else sys.stdout
+
+    with redirect_stdout(log):
+        # Print summary
+        print(f"--- Identification Summary ---")
+        print(f"Files Scanned: {files_scanned}")
+        print(f"Functions/Classes Found: {num_candidates}")
+        print(f"Slob Candidates: {num_slob}")
+        print("------------------------------")
+
+        if top_files:
+            for file_path, total_score, cands in top_files.items():
+                print(f"\n--- {file_path} (Total Slob Score: {round(total_score, 2)}) ---")
+                # Sort candidates in file by score
+                cands = sorted(cands, key=lambda x: x["metrics"]["total_score"], reverse=True)
+                for cand in cands:
+                    print_candidate(cand)
+        elif top:
+            for _, cand in top.items():
+                print_candidate(cand)
+        elif collect_all:
+            # Sort by score descending
+            slob_candidates.sort(key=lambda x: x["metrics"]["total_score"], reverse=True)
+            for cand in slob_candidates:
+                print_candidate(cand)
 
-    if args.output:
+        if args.fragments:
+            print(f"\n--- Duplicated Fragments: {len(duplicate_fragments)} ---")
+            for group in duplicate_fragments:
+                print_fragment_group(group)
+
+    if args.output and collect_all:
         report = {
             "files_scanned": files_scanned,
-            "slob_candidates": slob_candidates
+            "slob_candidates": [store_raw_code(c, args.omit_raw_code, raw_code_dir) for c in slob_candidates]
         }
+        if args.fragments:
+            report["duplicate_fragments"] = duplicate_fragments
         report_path = Path(args.output)
         with open(report_path, "w") as f:
             json.dump(report, f, indent=2)
         print(f"\nFull report written to {report_path}")
+    elif args.output:
+        print(f"\nFull report written to {args.output}")
 
-def print_candidate(cand):
+def print_fragment_group(group):
+    print(f"{'[DUPLICATE FRAGMENT]'.ljust(20)} {group['lines']} lines, {len(group['locations'])} copies")
+    for loc in group["locations"]:
+        print(f"  - {loc['file']} (Lines {loc['line']}-{loc['end_line']})")
+
+def is_reported(cand):
     # Show if high severity OR if it contains global variables (since the user specifically asked for them)
-    if cand["high_severity"] or (cand.get("semantic_info", {}).get("global_vars")):
+    return bool(cand["high_severity"] or (cand.get("semantic_info", {}).get("global_vars")))
+
+def print_candidate(cand):
+    if is_reported(cand):
         score = cand["metrics"]["total_score"]
         classification = get_slob_classification(score)
 
         label = "[SLOB]"
         if cand["type"] == "Global":
             label = "[GLOBALS]"
+        elif cand.get("is_dead_code"):
+            label = "[DEAD CODE]"
         elif cand.get("is_public_unused_outside"):
             label = "[SHOULD BE PRIVATE]"
         elif cand.get("is_duplicate"):
             label = "[DUPLICATE]"
+        elif cand.get("is_near_duplicate"):
+            label = "[NEAR DUPLICATE]"
+        elif cand.get("perf_smells"):
+            label = "[PERF SMELL]"
         else:
             if cand["type"] == "Class":
                 label = "[PUBLIC CLASS]" if not cand["is_private"] else "[PRIVATE CLASS]"
@@ -365,6 +887,9 @@ def print_candidate(cand):
         metrics_str = ", ".join(metrics_parts)
         print(f"         Total Score: {score} ({classification}) ({metrics_str})")
 
+        if cand.get("is_dead_code"):
+            print(f"         Reason: {cand['type']} is not reachable from any entry point and can likely be removed.")
+
         if cand.get("is_public_unused_outside"):
             print(f"         Reason: Public {cand['type'].lower()} is not used outside this file and should be private.")
         
@@ -373,6 +898,21 @@ def print_candidate(cand):
             for loc in cand.get("duplicate_locations", []):
                 print(f"         - {loc}")
 
+        if cand.get("is_near_duplicate"):
+            print(f"         Similar code found in:")
+            for loc in cand.get("near_duplicate_locations", []):
+                print(f"         - {loc}")
+
+        if cand.get("profile"):
+            prof = cand["profile"]
+            print(f"         Profile: {prof['hotness'] * 100:.1f}% of CPU time, {prof['calls']} calls, "
+                  f"{prof['self_time']:.3f}s self, {prof['cumulative_time']:.3f}s cumulative")
+
+        if cand.get("perf_smells"):
+            print(f"         Performance smells:")
+            for smell in cand["perf_smells"]:
+                print(f"         - Line {smell['line']}: {perf_smells.SMELL_DESCRIPTIONS[smell['kind']]}")
+
         if cand["semantic_info"]["global_vars"]:
             print(f"         Globals Found: {len(cand['semantic_info']['global_vars'])}")
             for g in cand["semantic_info"]["global_vars"]:
@@ -4,10 +4,20 @@
 # ]
 # ///
 
+import io
+import sys
+import time
+import tokenize
+from pathlib import Path
+
 import radon.complexity as cc
 import radon.raw as raw
 import radon.metrics as met
 
+# Tokens that never contribute to a logical line
+_SKIPPED_TOKENS = {tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE, tokenize.INDENT,
+                   tokenize.DEDENT, tokenize.ENDMARKER, tokenize.ENCODING}
+
 def calculate_complexity(code: str) -> int:
     """
     Calculates the average Cyclomatic Complexity of the code.
@@ -32,6 +42,102 @@ def calculate_loc(code: str) -> int:
     except Exception:
         return len(code.splitlines())
 
+def _count_logical(tokens) -> int:
+    """
+    Counts the logical lines in one statement's significant tokens using radon's rules:
+    each ';'-separated part counts 1, or 2 when it contains a ':' that is not its last token
+    (e.g. `if x: return 0`).
+    """
+    count = 0
+    part = []
+    # Mirror radon, which only sees the ENDMARKER in the statement's final part
+    for token in tokens + [(tokenize.ENDMARKER, "")]:
+        if token == (tokenize.OP, ";"):
+            count += _count_logical_part(part, ends_statement=False)
+            part = []
+        else:
+            part.append(token)
+    return count + _count_logical_part(part, ends_statement=True)
+
+def _count_logical_part(part, ends_statement) -> int:
+    for pos in range(len(part) - 1, -1, -1):
+        if part[pos] == (tokenize.OP, ":"):
+            return 2 - (pos == len(part) - 2)
+    if ends_statement:
+        # Only the ENDMARKER left means there is no code in this part
+        return 1 if len(part) > 1 else 0
+    return 1 if part else 0
+
+def get_logical_lines(code: str):
+    """
+    Tokenizes the code once and returns (start_line, end_line, lloc) for every logical line,
+    counted the same way radon.raw.analyze counts them.
+    """
+    logical_lines = []
+    current = []
+    start_line = None
+    for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+        if tok.type == tokenize.NEWLINE:
+            if current:
+                logical_lines.append((start_line, tok.start[0], _count_logical(current)))
+            current = []
+            start_line = None
+        elif tok.type not in _SKIPPED_TOKENS:
+            if start_line is None:
+                start_line = tok.start[0]
+            current.append((tok.type, tok.string))
+    if current:
+        # Source without a trailing NEWLINE token still ends its last statement
+        logical_lines.append((start_line, tok.end[0], _count_logical(current)))
+    return logical_lines
+
+class LineLLOC:
+    """
+    Logical line counts of a whole file, attributable to any line range in O(1).
+    Built from a single tokenize pass instead of re-tokenizing each block's source.
+    """
+    def __init__(self, code: str):
+        self.num_lines = len(code.splitlines())
+        size = self.num_lines + 2
+        self.prefix = [0] * size
+        # For each line, the (start, end) of the last logical line starting at or before it
+        self.last_logical = [None] * size
+
+        logical_lines = get_logical_lines(code)
+        counts = [0] * size
+        starts = {}
+        for start, end, lloc in logical_lines:
+            counts[start] += lloc
+            starts[start] = (start, end)
+
+        last = None
+        for line in range(1, size):
+            self.prefix[line] = self.prefix[line - 1] + counts[line]
+            last = starts.get(line, last)
+            self.last_logical[line] = last
+
+    def block_lloc(self, start: int, end: int) -> int:
+        """
+        Returns what calculate_loc would report for lines start..end (1-indexed, inclusive).
+        """
+        end = min(end, self.num_lines)
+        if end < start:
+            return 0
+        last = self.last_logical[end]
+        if last and last[0] >= start and last[1] > end:
+            # The slice cuts a statement in half; radon fails on it and calculate_loc falls back to the line count
+            return end - start + 1
+        return self.prefix[end] - self.prefix[start - 1]
+
+def calculate_loc_native(code: str) -> int:
+    """
+    Drop-in alternative to calculate_loc that counts LLOC from a single tokenize pass.
+    """
+    try:
+        return LineLLOC(code).block_lloc(1, len(code.splitlines()))
+    except Exception:
+        return calculate_loc(code)
+
 def calculate_halstead(code: str) -> float:
     """
     Calculates Halstead volume/effort.
@@ -58,13 +164,18 @@ def calculate_slob_score(code: str, complexity: int = None, lloc: int = None) ->
     score = (complexity ** 2) + (lloc / 5.0)
     return round(score, 2)
 
-def get_function_metrics(code: str):
+def get_function_metrics(code: str, tree=None):
     """
     Extracts metrics for individual functions and classes in the code.
+    An already parsed AST of the code can be passed to skip re-parsing.
     """
     try:
-        blocks = cc.cc_visit(code)
+        blocks = cc.cc_visit_ast(tree) if tree is not None else cc.cc_visit(code)
         lines = code.splitlines()
+        try:
+            line_lloc = LineLLOC(code)
+        except Exception:
+            line_lloc = None
         
         results = []
         for block in blocks:
@@ -75,7 +186,7 @@ def get_function_metrics(code: str):
             end = getattr(block, 'endline', len(lines))
             block_code = "\n".join(lines[start:end])
             
-            lloc = calculate_loc(block_code)
+            lloc = line_lloc.block_lloc(block.lineno, end) if line_lloc else calculate_loc(block_code)
             complexity = block.complexity
             score = calculate_slob_score(block_code, complexity=complexity, lloc=lloc)
             
@@ -103,3 +214,58 @@ def get_function_metrics(code: str):
         return results
     except Exception:
         return []
+
+def _benchmark_lloc(target_dir: Path):
+    """
+    Compares calculate_loc on every block slice against the single-pass LineLLOC attribution,
+    reporting mismatches and the time spent by each approach.
+    """
+    radon_time = native_time = 0.0
+    blocks_checked = 0
+    mismatches = []
+    for file_path in sorted(target_dir.rglob("*.py")):
+        try:
+            code = file_path.read_text(encoding="utf-8")
+            blocks = cc.cc_visit(code)
+        except Exception:
+            continue
+        lines = code.splitlines()
+        spans = [(block.lineno, getattr(block, 'endline', len(lines))) for block in blocks]
+
+        start_time = time.perf_counter()
+        expected = [calculate_loc("\n".join(lines[start - 1:end])) for start, end in spans]
+        radon_time += time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        line_lloc = LineLLOC(code)
+        actual = [line_lloc.block_lloc(start, end) for start, end in spans]
+        native_time += time.perf_counter() - start_time
+
+        blocks_checked += len(spans)
+        for (start, end), exp, act in zip(spans, expected, actual):
+            if exp != act:
+                mismatches.append(f"{file_path}:{start}-{end} radon={exp} native={act}")
+
+    print(f"Blocks checked: {blocks_checked}")
+    print(f"Mismatches: {len(mismatches)}")
+    for mismatch in mismatches[:20]:
+        print(f"  {mismatch}")
+    print(f"radon.raw per block: {radon_time:.3f}s")
+    print(f"LineLLOC per file:   {native_time:.3f}s")
+    if native_time > 0:
+        print(f"Speedup: {radon_time / native_time:.1f}x")
+    return not mismatches
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the single-pass LLOC calculator against radon.raw for parity and speed.")
+    parser.add_argument("target_dir", type=str, help="Directory of Python files to benchmark on")
+    args = parser.parse_args()
+
+    target_dir = Path(args.target_dir)
+    if not target_dir.exists():
+        print(f"Error: {target_dir} does not exist.")
+        sys.exit(1)
+
+    sys.exit(0 if _benchmark_lloc(target_dir) else 1)
@@ -11,172 +11,308 @@ import os
 import sys
 
 import subprocess
-import json
+import tempfile
 import time
 import re
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 
-def run_command(cmd, cwd):
-    result = subprocess.run(cmd, capture_output=True, text=True, cwd=cwd)
-    return result.returncode, result.stdout, result.stderr
+import verify
+import benchmark
+from common import load_job_config, emit_result, parse_result_line, read_results, RESULTS_ENV_VAR
+from result_cache import ResultCache, unit_of, is_transient
+from worker_pool import WorkerPool, capture_output
 
-def parse_verify_output(output):
-    """Parses the cleaned verify.py output."""
-    results = {}
-    lines = output.splitlines()
-    current_fail = None
-    
-    for line in lines:
-        status = None
-        raw = ""
-        
-        if line.startswith("[PASS] "):
-            status = "PASS"
-            raw = line[7:].strip()
-        elif line.startswith("[SKIP] "):
-            status = "SKIP"
-            raw = line[7:].strip()
-        elif line.startswith("[FAIL] "):
+# A refactor whose fitted complexity exponent grows by more than this fails its job (--scaling)
+SCALING_TOLERANCE = 0.3
+# A refactor whose peak memory exceeds the original's by this factor fails its job (--memory-ratio),
+# unless the difference stays under MEMORY_FLOOR_KIB
+MEMORY_REGRESSION_RATIO = 2.0
+MEMORY_FLOOR_KIB = 64
+# Set for an orchestrator started inside a module group's environment (see run_module_group):
+# the comma-separated modules that environment provides
+MODULES_ENV_VAR = "CODE_SLOB_MODULES"
+
+def job_modules(config):
+    """Returns the extra modules a job's type_hints.json asks for ("modules"), as strings."""
+    modules = config.get("modules", [])
+    return [str(m) for m in modules] if isinstance(modules, list) else []
+
+def normalize_modules(modules):
+    """
+    Returns extra modules as a sorted tuple without blanks or duplicates, with the project name
+    each requirement starts with normalized the way pip compares them (case, '-', '_' and '.'),
+    so jobs asking for the same packages end up in the same environment.
+    """
+    normalized = set()
+    for module in modules:
+        module = module.strip()
+        match = re.match(r"[A-Za-z0-9][A-Za-z0-9._-]*", module)
+        if match:
+            module = re.sub(r"[-_.]+", "-", match.group(0)).lower() + module[match.end():]
+        if module:
+            normalized.add(module)
+    return tuple(sorted(normalized))
+
+def build_job_result(job_dir, passed, records, memory_ratio=MEMORY_REGRESSION_RATIO):
+    """
+    Combines the result records verify.py and benchmark.py emitted for a job (see
+    common.emit_result) into a job result. passed is verify_files' return value.
+    """
+    functions = {}
+    # Job status is FAIL if any function failed (AssertionError)
+    # If a function SKIPPED, the job can still PASS (but those functions won't show as PASS)
+    status = "PASS" if passed else "FAIL"
+
+    for record in records:
+        if record.get("tool") != "verify":
+            continue
+        func = {"name": record["name"], "status": record["status"], "logs": record.get("error") or "",
+                "duration": f"{record['duration']:.4f}s"}
+        if record.get("counterexample"):
+            func["counterexample"] = record["counterexample"]
+        if record.get("cached"):
+            func["cached"] = True
+        if func["status"] == "FAIL":
             status = "FAIL"
-            raw = line[7:].strip()
-        elif current_fail:
-            current_fail["logs"].append(line)
+        functions[func["name"]] = func
+
+    for record in records:
+        if record.get("tool") != "benchmark" or record.get("status") != "OK" or record["name"] not in functions:
             continue
-            
-        if status:
-            # Extract duration using regex
-            duration = None
-            # Match (1.2345s) or (0.0000s)
-            match = re.search(r"\(([\d\.]+)s\)", raw)
-            name = raw
-            
-            if match:
-                duration = match.group(1) + "s"
-                # Remove duration from name, keeping clean spacing
-                name = raw.replace(match.group(0), "").strip()
-                # Normalize spaces (replace double spaces with single)
-                name = re.sub(r'\s+', ' ', name)
-            
-            # If name is empty (unlikely), revert to raw
-            if not name:
-                name = raw
+        func = functions[record["name"]]
+        stats = record["speedup"]
+        if stats is None:
+            func["speedup"] = "N/A"
+        else:
+            func.update({"speedup": f"{stats['speedup']:.2f}x", "ci": benchmark.format_confidence_interval(stats),
+                         "p_value": stats["p_value"], "verdict": stats["verdict"]})
+        func["timings"] = record["timings"]
 
-            res = {"name": name, "status": status, "logs": "" if status != "FAIL" else [], "duration": duration}
-            results[name] = res
-            
-            if status == "FAIL":
-                current_fail = res
-            else:
-                current_fail = None
-            
-    for name, res in results.items():
-        if isinstance(res["logs"], list):
-            res["logs"] = "\n".join(res["logs"])
-            
-    return results
+        orig_peak, ref_peak = record["memory"]["orig"]["peak"] / 1024, record["memory"]["ref"]["peak"] / 1024
+        func["memory"] = f"orig {orig_peak:.1f} KiB peak, ref {ref_peak:.1f} KiB peak"
+        if ref_peak > orig_peak * memory_ratio and ref_peak - orig_peak > MEMORY_FLOOR_KIB and func["status"] != "FAIL":
+            func["status"] = "FAIL"
+            func["logs"] = f"Memory regression: peak grew from {orig_peak:.1f} KiB to {ref_peak:.1f} KiB (limit {memory_ratio:g}x)"
+            status = "FAIL"
 
-def parse_benchmark_output(output):
-    """Parses the structured benchmark.py output."""
-    speedups = {}
-    for line in output.splitlines():
-        if line.startswith("[SPEEDUP] "):
-            try:
-                parts = line[10:].split(": ")
-                name = parts[0].strip()
-                val = parts[1].strip()
-                speedups[name] = val
-            except:
-                continue
-        elif line.startswith("[SKIP] "):
-             # Benchmarking also skips
-             continue
-    return speedups
-
-def process_job(job_dir, verification_root, scripts_dir):
-    """Processes a single job directory."""
+        if "scaling" in record:
+            orig_exp, ref_exp = record["scaling"]["orig"], record["scaling"]["ref"]
+            func["scaling"] = f"orig ~n^{orig_exp:.1f}, ref ~n^{ref_exp:.1f}"
+            if ref_exp > orig_exp + SCALING_TOLERANCE and func["status"] != "FAIL":
+                # Equivalent but asymptotically slower: the refactor must not be applied
+                func["status"] = "FAIL"
+                func["logs"] = f"Scaling regression: complexity exponent grew from {orig_exp:.1f} to {ref_exp:.1f}"
+                status = "FAIL"
+    
+    return {
+        "job_name": job_dir.name,
+        "status": status,
+        "functions": list(functions.values())
+    }
+
+def run_job(job_dir, memory_ratio=MEMORY_REGRESSION_RATIO, cache_dir=None, refresh=False):
+    """
+    Processes a single job directory inside a worker pool process, where the verification and
+    benchmark libraries are already imported. Verification runs before benchmarking so the
+    timings are not disturbed by the fuzzers. The result comes from the records both emit to a
+    per-job result file; their printed output (and anything the job's code prints) is discarded.
+
+    With a cache_dir, functions and classes whose records are cached for the current code,
+    type hints and settings (see result_cache.ResultCache) are not run again, and their results
+    are marked as cached. With refresh, cached records are ignored and replaced.
+    """
     orig_file = job_dir / "original.py"
     ref_file = job_dir / "refactored.py"
-    
+
     if not (orig_file.exists() and ref_file.exists()):
         return None
 
-    # Load extra modules from type_hints.json if available
-    extra_modules = []
-    type_hints_path = job_dir / "type_hints.json"
-    if type_hints_path.exists():
+    config = load_job_config(job_dir)
+    cache = ResultCache(cache_dir) if cache_dir else None
+    keys = cache.job_keys(job_dir) if cache else {}
+    cached_records = []
+    cached_units = set()
+    for unit, key in keys.items():
+        unit_records = None if refresh else cache.load(key)
+        if unit_records is not None:
+            cached_units.add(unit)
+            cached_records.extend(dict(record, cached=True) for record in unit_records)
+
+    # The tools still run when every unit is cached: functions defined outside the top level
+    # (under an `if`, by assignment) have no unit of their own and are verified every time
+    saved_results = os.environ.get(RESULTS_ENV_VAR)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ[RESULTS_ENV_VAR] = results_path = os.path.join(tmp, "results.jsonl")
         try:
-            with open(type_hints_path, 'r') as f:
-                config = json.load(f)
-                modules = config.get("modules", [])
-                if isinstance(modules, list):
-                    extra_modules = [str(m) for m in modules]
-        except Exception:
-            pass
-
-    # 1. Verification & 2. Benchmark (Parallel)
-    verify_cmd = ["uv", "run"]
-    bench_cmd = ["uv", "run"]
-    
-    if extra_modules:
-        modules_str = ",".join(extra_modules)
-        verify_cmd.extend(["--with", modules_str])
-        bench_cmd.extend(["--with", modules_str])
-        
-    verify_cmd.extend([str(scripts_dir / "verify.py"), str(orig_file), str(ref_file)])
-    bench_cmd.extend([str(scripts_dir / "benchmark.py"), str(orig_file), str(ref_file)])
+            _, passed = capture_output(partial(verify.verify_files, skip=cached_units), str(orig_file), str(ref_file), config)
+            capture_output(partial(benchmark.benchmark_files, skip=cached_units), str(orig_file), str(ref_file), config)
+        finally:
+            if saved_results is None:
+                del os.environ[RESULTS_ENV_VAR]
+            else:
+                os.environ[RESULTS_ENV_VAR] = saved_results
+        records = read_results(results_path)
 
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        future_verify = executor.submit(run_command, verify_cmd, verification_root)
-        future_bench = executor.submit(run_command, bench_cmd, verification_root)
-        
-        ret, out, err = future_verify.result()
-        ret_b, out_b, err_b = future_bench.result()
-    
-    functions = parse_verify_output(out + err)
-    speedups = parse_benchmark_output(out_b + err_b)
-    
-    for name, speedup in speedups.items():
-        if name in functions:
-            functions[name]["speedup"] = speedup
-    
-    # Job status is FAIL if any function failed (AssertionError)
-    # If a function SKIPPED, the job can still PASS (but those functions won't show as PASS)
-    status = "PASS" if ret == 0 else "FAIL"
-    
+    for unit, key in keys.items():
+        unit_records = [record for record in records if unit_of(record.get("name", "")) == unit]
+        # Units that produced nothing (e.g. the modules failed to load) or were cut short are run again next time
+        if unit not in cached_units and unit_records and not any(map(is_transient, unit_records)):
+            cache.store(key, unit_records)
+    return build_job_result(job_dir, passed, records + cached_records, memory_ratio)
+
+def worker_error_result(job_dir, error):
+    """The result of a job whose worker raised or died, reported as one failed entry."""
     return {
         "job_name": job_dir.name,
-        "status": status,
-        "functions": list(functions.values())
+        "status": "FAIL",
+        "functions": [{"name": job_dir.name, "status": "FAIL", "logs": error, "duration": None}]
     }
 
+def follow_results(path, process, poll_interval=0.1):
+    """
+    Yields the records appended to a result file (see common.emit_result) as they arrive while
+    process runs, then the rest once it has exited. A line is only parsed once it is complete.
+    """
+    with open(path) as results:
+        pending = ""
+        while True:
+            exited = process.poll() is not None
+            chunk = results.read()
+            *lines, pending = (pending + chunk).split("\n")
+            for line in lines:
+                record = parse_result_line(line)
+                if record is not None:
+                    yield record
+            if exited:
+                return
+            if not chunk:
+                time.sleep(poll_interval)
+
+def run_module_group(modules, job_dirs, scripts_dir, verification_root, workers=None, memory_ratio=MEMORY_REGRESSION_RATIO,
+                     cache_dir=None, refresh=False):
+    """
+    Runs a group of jobs that need the same extra modules in a single `uv run --with`
+    environment, so uv resolves those modules once per group rather than twice per job. The
+    orchestrator started inside it runs the whole group on its own worker pool and appends each
+    job result to a result file (--results), which is yielded from as results arrive. Jobs it
+    does not report on because the environment failed come back as failures.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        results_path = Path(tmp) / "results.jsonl"
+        results_path.touch()
+        cmd = ["uv", "run", "--with", ",".join(modules), str(scripts_dir / "orchestrator.py"), str(job_dirs[0].parent),
+               "--results", str(results_path), "--memory-ratio", str(memory_ratio)]
+        if workers is not None:
+            cmd.extend(["--workers", str(workers)])
+        if cache_dir is not None:
+            cmd.extend(["--cache-dir", str(cache_dir)])
+        if refresh:
+            cmd.append("--no-cache")
+        cmd.extend(["--only"] + [job.name for job in job_dirs])
+
+        reported = set()
+        with open(Path(tmp) / "stderr.log", "w+") as stderr:
+            process = subprocess.Popen(cmd, cwd=verification_root, env={**os.environ, MODULES_ENV_VAR: ",".join(modules)},
+                                       stdout=subprocess.DEVNULL, stderr=stderr)
+            try:
+                for res in follow_results(results_path, process):
+                    if "job_name" in res:
+                        reported.add(res["job_name"])
+                        yield res
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                ret = process.wait()
+            stderr.seek(0)
+            err = stderr.read().strip()
+
+    error = f"Environment with {', '.join(modules)} failed (exit code {ret})"
+    if err:
+        error += "\n" + err
+    for job in job_dirs:
+        # Jobs without both files have no result (see run_job)
+        if job.name not in reported and (job / "original.py").exists() and (job / "refactored.py").exists():
+            yield worker_error_result(job, error)
+
 def main():
     parser = argparse.ArgumentParser(description="Verifier Skill Orchestrator")
     parser.add_argument("target_dir", help="Directory containing job subfolders")
+    parser.add_argument("--scaling", action="store_true", help="Also fit how run time grows with input size and fail jobs whose refactor scales worse")
+    parser.add_argument("--memory-ratio", type=float, default=MEMORY_REGRESSION_RATIO, help="Fail jobs whose refactored peak memory exceeds the original's by this factor")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: half the CPUs; 0 runs jobs in this process)")
+    parser.add_argument("--only", nargs="+", metavar="JOB", help="Only run these job subfolders")
+    parser.add_argument("--results", metavar="PATH", help="Also append each job result to PATH as a JSON line as soon as it completes")
+    parser.add_argument("--cache-dir", metavar="DIR", help="Result cache location (default: .cache inside target_dir)")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached results and verify and benchmark every function again")
     args = parser.parse_args()
 
+    if args.scaling:
+        # Inherited by the worker processes and module group environments
+        os.environ["BENCHMARK_SCALING"] = "1"
+
     input_dir = Path(args.target_dir).resolve()
     if not input_dir.exists(): sys.exit(1)
 
     scripts_dir = Path(__file__).resolve().parent
     verification_root = scripts_dir.parent
 
-    jobs = [d for d in input_dir.iterdir() if d.is_dir()]
-    
+    cache_dir = Path(args.cache_dir).resolve() if args.cache_dir else input_dir / ".cache"
+
+    # Hidden folders (such as the default cache) are not jobs
+    jobs = sorted(d for d in input_dir.iterdir()
+                  if d.is_dir() and not d.name.startswith(".") and (args.only is None or d.name in args.only))
+
+    # Jobs are grouped by the extra modules they need. Those this environment already provides
+    # (none, or the ones it was started with by run_module_group) share the worker pool; every
+    # other group gets one environment of its own.
+    provided = set(normalize_modules(os.environ.get(MODULES_ENV_VAR, "").split(",")))
+    groups = {}
+    for job in jobs:
+        modules = normalize_modules(job_modules(load_job_config(job)))
+        groups.setdefault(() if set(modules) <= provided else modules, []).append(job)
+    pool_jobs = groups.pop((), [])
+
     results = []
-    # Since child processes (verify.py/benchmark.py) now run in parallel internally,
+
+    def collect(res):
+        results.append(res)
+        if args.results:
+            emit_result(res, args.results)
+
+    def run_group(modules, group_jobs):
+        for res in run_module_group(modules, group_jobs, scripts_dir, verification_root, args.workers, args.memory_ratio,
+                                    cache_dir, args.no_cache):
+            collect(res)
+
+    # Since child processes (verify/benchmark workers) run in parallel internally,
     # we reduce the job-level parallelism to avoid oversubscribing the system.
     max_workers = max(1, (os.cpu_count() or 4) // 2)
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(process_job, job, verification_root, scripts_dir): job for job in jobs}
+    pool_size = min(max_workers if args.workers is None else args.workers, len(pool_jobs))
+    # Each running job verifies its functions in parallel too: split the CPUs between the pool's
+    # workers and the module group environments (inherited by both; an explicit setting wins)
+    os.environ.setdefault(verify.PROCESSES_ENV_VAR, str(max(1, (os.cpu_count() or 4) // (max(1, pool_size) + len(groups)))))
+    # The pool forks its workers, so it has to start before any thread does
+    with WorkerPool(run_job, pool_size) as pool, ThreadPoolExecutor(max_workers=max(1, len(groups))) as executor:
+        # Group results are collected from the threads as they arrive
+        futures = [executor.submit(run_group, modules, group_jobs) for modules, group_jobs in groups.items()]
+        for job in pool_jobs:
+            pool.submit(job, job, args.memory_ratio, cache_dir, args.no_cache)
+        for job, res, error in pool.results():
+            if error:
+                res = worker_error_result(job, error)
+            if res: collect(res)
         for future in as_completed(futures):
-            res = future.result()
-            if res: results.append(res)
+            future.result()
     
     # Calculate Statistics
     all_speedups = []
+    verdicts = {}
     for res in results:
         for func in res['functions']:
+            if 'verdict' in func:
+                verdicts[func['verdict']] = verdicts.get(func['verdict'], 0) + 1
             if 'speedup' in func and func['speedup'] != "N/A":
                 try:
                     val = float(func['speedup'].rstrip('x'))
@@ -192,6 +328,8 @@ def main():
         print(f"Average Speedup: {avg_s:.2f}x")
         print(f"Best Speedup:    {best_s:.2f}x")
         print(f"Worst Speedup:   {worst_s:.2f}x")
+        if verdicts:
+            print("Verdicts:        " + ", ".join(f"{verdicts[v]} {v}" for v in ("faster", "slower", "inconclusive") if v in verdicts))
         print("----------------------------------\n")
     
     any_failed = False
@@ -204,8 +342,17 @@ def main():
             extras = []
             if "duration" in func and func['duration']:
                 extras.append(f"{func['duration']}")
+            if func.get("cached"):
+                extras.append("cached")
             if "speedup" in func:
-                extras.append(f"Speedup: {func['speedup']}")
+                speedup = func['speedup']
+                if "verdict" in func:
+                    speedup += f" [{func['ci']}, p={func['p_value']:.3f}, {func['verdict']}]"
+                extras.append(f"Speedup: {speedup}")
+            if "memory" in func:
+                extras.append(f"Memory: {func['memory']}")
+            if "scaling" in func:
+                extras.append(f"Scaling: {func['scaling']}")
             
             extra_str = f" ({', '.join(extras)})" if extras else ""
             
@@ -216,7 +363,8 @@ def main():
                 for line in func['logs'].splitlines():
                     print(f"      {line}")
             elif func['status'] == "SKIP":
-                print(f"  [SKIP] {func['name']}{extra_str}")
+                reason = f": {func['logs']}" if func['logs'] else ""
+                print(f"  [SKIP] {func['name']}{extra_str}{reason}")
             else:
                 print(f"  [PASS] {func['name']}{extra_str}")
                 
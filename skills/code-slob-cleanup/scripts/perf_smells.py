@@ -0,0 +1,273 @@
+import ast
+from typing import List
+
+# Default score of each smell occurrence; override per smell with "perfSmellScores" in
+# code-slob-cleanup.json (0 disables a smell)
+SMELL_SCORES = {
+    "list_membership_in_loop": 20,
+    "string_concat_in_loop": 15,
+    "list_front_operation": 15,
+    "repeated_len_in_loop": 5,
+    "repeated_attribute_lookup_in_loop": 5,
+    "nested_loop_same_collection": 25,
+    "sort_in_loop": 20,
+    "regex_compile_in_function": 10
+}
+
+SMELL_DESCRIPTIONS = {
+    "list_membership_in_loop": "`in` test against a list inside a loop (O(n) per lookup; use a set)",
+    "string_concat_in_loop": "string built with += inside a loop (use ''.join)",
+    "list_front_operation": "pop(0)/insert(0, ...) shifts the whole list (use collections.deque)",
+    "repeated_len_in_loop": "len() of the same object recomputed within one loop",
+    "repeated_attribute_lookup_in_loop": "same dotted lookup repeated within one loop (bind it to a local)",
+    "nested_loop_same_collection": "nested loop over the same collection (quadratic)",
+    "sort_in_loop": "sorting inside a loop",
+    "regex_compile_in_function": "regex compiled on every call (compile it once at module level)"
+}
+
+# Repetitions within one loop before a lookup is reported
+_REPEATED_LEN = 2
+_REPEATED_ATTRIBUTE = 3
+
+_FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+
+def _is_list_value(node) -> bool:
+    if isinstance(node, (ast.List, ast.ListComp)):
+        return True
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "list"
+
+def _is_str_value(node) -> bool:
+    if isinstance(node, ast.Constant):
+        return isinstance(node.value, str)
+    if isinstance(node, ast.JoinedStr):
+        return True
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "str"
+
+def _is_iterator_value(node) -> bool:
+    if isinstance(node, ast.GeneratorExp):
+        return True
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "iter"
+
+# Constructors of containers whose pop(0)/insert(0, ...) are cheap or mean something else
+_NON_LIST_CONSTRUCTORS = {"dict", "set", "frozenset", "deque", "defaultdict", "OrderedDict", "Counter"}
+
+def _is_non_list_value(node) -> bool:
+    if isinstance(node, (ast.Dict, ast.DictComp, ast.Set, ast.SetComp)):
+        return True
+    if not isinstance(node, ast.Call):
+        return False
+    func = node.func
+    name = func.id if isinstance(func, ast.Name) else func.attr if isinstance(func, ast.Attribute) else None
+    return name in _NON_LIST_CONSTRUCTORS
+
+def _local_types(func):
+    """
+    Returns the names of func that are only ever assigned lists, strings, iterators and
+    dicts/sets/deques respectively, looking at func's own body (nested functions are skipped).
+    """
+    values = {}
+    stack = list(func.body) if isinstance(func.body, list) else [func.body]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, _FUNCTION_NODES + (ast.ClassDef,)):
+            continue
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    values.setdefault(target.id, []).append(node.value)
+        elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name) and node.value is not None:
+            values.setdefault(node.target.id, []).append(node.value)
+        elif isinstance(node, (ast.For, ast.AsyncFor, ast.With, ast.AsyncWith)):
+            # Loop and context targets can hold anything
+            for target in ([node.target] if isinstance(node, (ast.For, ast.AsyncFor)) else
+                           [item.optional_vars for item in node.items if item.optional_vars is not None]):
+                for name in ast.walk(target):
+                    if isinstance(name, ast.Name):
+                        values.setdefault(name.id, []).append(None)
+        stack.extend(ast.iter_child_nodes(node))
+    lists = {name for name, vals in values.items() if all(v is not None and _is_list_value(v) for v in vals)}
+    strings = {name for name, vals in values.items() if all(v is not None and _is_str_value(v) for v in vals)}
+    iterators = {name for name, vals in values.items() if all(v is not None and _is_iterator_value(v) for v in vals)}
+    non_lists = {name for name, vals in values.items() if all(v is not None and _is_non_list_value(v) for v in vals)}
+    return lists, strings, iterators, non_lists
+
+def _dotted_name(node):
+    """Returns 'a.b.c' for a pure attribute chain on a name, or None."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+class _LoopFrame:
+    def __init__(self, collection):
+        self.collection = collection
+        # key -> [count, first line]
+        self.lens = {}
+        self.attributes = {}
+
+class _PerfSmellVisitor(ast.NodeVisitor):
+    def __init__(self):
+        self.smells = []
+        self.loops = []
+        self.functions = []
+
+    def _add(self, kind, line):
+        self.smells.append([kind, line])
+
+    # --- scopes and loops ---
+
+    def visit_FunctionDef(self, node):
+        # A function defined in a loop only runs when called, so loops do not carry over
+        saved_loops, self.loops = self.loops, []
+        self.functions.append(_local_types(node))
+        self.generic_visit(node)
+        self.functions.pop()
+        self.loops = saved_loops
+
+    visit_AsyncFunctionDef = visit_Lambda = visit_FunctionDef
+
+    def _run_loop(self, frame, nodes):
+        self.loops.append(frame)
+        for node in nodes:
+            self.visit(node)
+        self.loops.pop()
+        self._report_repeats(frame)
+
+    def _report_repeats(self, frame):
+        for count, line in frame.lens.values():
+            if count >= _REPEATED_LEN:
+                self._add("repeated_len_in_loop", line)
+        for count, line in frame.attributes.values():
+            if count >= _REPEATED_ATTRIBUTE:
+                self._add("repeated_attribute_lookup_in_loop", line)
+
+    def _enter_collection(self, iterable, line):
+        collection = _dotted_name(iterable)
+        # Nested loops sharing one iterator consume it together, which is linear
+        if self.functions and collection in self.functions[-1][2]:
+            collection = None
+        if collection is not None and any(frame.collection == collection for frame in self.loops):
+            self._add("nested_loop_same_collection", line)
+        return _LoopFrame(collection)
+
+    def visit_For(self, node):
+        # The iterable is evaluated once, before the loop starts
+        self.visit(node.iter)
+        frame = self._enter_collection(node.iter, node.lineno)
+        self._run_loop(frame, [node.target] + node.body)
+        for child in node.orelse:
+            self.visit(child)
+
+    visit_AsyncFor = visit_For
+
+    def visit_While(self, node):
+        self._run_loop(_LoopFrame(None), [node.test] + node.body)
+        for child in node.orelse:
+            self.visit(child)
+
+    def _visit_comprehension(self, node, elements):
+        generators = node.generators
+        self.visit(generators[0].iter)
+        frames = []
+        for i, comp in enumerate(generators):
+            if i > 0:
+                self.visit(comp.iter)
+            frame = self._enter_collection(comp.iter, node.lineno)
+            self.loops.append(frame)
+            frames.append(frame)
+            self.visit(comp.target)
+            for cond in comp.ifs:
+                self.visit(cond)
+        for element in elements:
+            self.visit(element)
+        for frame in reversed(frames):
+            self.loops.pop()
+            self._report_repeats(frame)
+
+    def visit_ListComp(self, node):
+        self._visit_comprehension(node, [node.elt])
+
+    visit_SetComp = visit_GeneratorExp = visit_ListComp
+
+    def visit_DictComp(self, node):
+        self._visit_comprehension(node, [node.key, node.value])
+
+    # --- smells ---
+
+    def visit_Compare(self, node):
+        if self.loops and self.functions:
+            lists = self.functions[-1][0]
+            for op, comparator in zip(node.ops, node.comparators):
+                if isinstance(op, (ast.In, ast.NotIn)) and isinstance(comparator, ast.Name) and comparator.id in lists:
+                    self._add("list_membership_in_loop", node.lineno)
+        self.generic_visit(node)
+
+    def visit_AugAssign(self, node):
+        if (self.loops and self.functions and isinstance(node.op, ast.Add) and isinstance(node.target, ast.Name)
+                and node.target.id in self.functions[-1][1]):
+            self._add("string_concat_in_loop", node.lineno)
+        self.generic_visit(node)
+
+    def visit_Assign(self, node):
+        # `s = s + ...` is the same smell as `s += ...`
+        value = node.value
+        if (self.loops and self.functions and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)
+                and isinstance(value, ast.BinOp) and isinstance(value.op, ast.Add) and isinstance(value.left, ast.Name)
+                and value.left.id == node.targets[0].id and value.left.id in self.functions[-1][1]):
+            self._add("string_concat_in_loop", node.lineno)
+        self.generic_visit(node)
+
+    def _is_non_list(self, node) -> bool:
+        """Whether node is a dict, set or deque: a literal, a constructor call or a local only assigned those."""
+        if _is_non_list_value(node):
+            return True
+        return isinstance(node, ast.Name) and bool(self.functions) and node.id in self.functions[-1][3]
+
+    def visit_Call(self, node):
+        func = node.func
+        if isinstance(func, ast.Attribute):
+            first_is_zero = bool(node.args) and isinstance(node.args[0], ast.Constant) and node.args[0].value == 0
+            front = (func.attr == "pop" and len(node.args) == 1) or (func.attr == "insert" and len(node.args) == 2)
+            if front and first_is_zero and not self._is_non_list(func.value):
+                self._add("list_front_operation", node.lineno)
+            elif (func.attr == "sort" and self.loops and not node.args and not self._is_non_list(func.value)
+                  and all(kw.arg in ("key", "reverse") for kw in node.keywords)):
+                # Only calls shaped like list.sort(key=..., reverse=...)
+                self._add("sort_in_loop", node.lineno)
+            elif (func.attr == "compile" and isinstance(func.value, ast.Name) and func.value.id == "re"
+                  and (self.loops or self.functions) and node.args and isinstance(node.args[0], ast.Constant)
+                  and isinstance(node.args[0].value, (str, bytes))):
+                # Only literal patterns can move to module level; one built at runtime has to be compiled here
+                self._add("regex_compile_in_function", node.lineno)
+        elif isinstance(func, ast.Name):
+            if func.id == "sorted" and self.loops:
+                self._add("sort_in_loop", node.lineno)
+            elif func.id == "len" and self.loops and len(node.args) == 1:
+                key = _dotted_name(node.args[0])
+                if key is not None:
+                    entry = self.loops[-1].lens.setdefault(key, [0, node.lineno])
+                    entry[0] += 1
+        self.generic_visit(node)
+
+    def visit_Attribute(self, node):
+        dotted = _dotted_name(node)
+        if dotted is None:
+            self.generic_visit(node)
+            return
+        # Only chains with at least two lookups (e.g. `self.items.append`, `os.path.join`) are worth hoisting
+        if self.loops and isinstance(node.ctx, ast.Load) and dotted.count(".") >= 2:
+            entry = self.loops[-1].attributes.setdefault(dotted, [0, node.lineno])
+            entry[0] += 1
+
+def detect_perf_smells(tree: ast.AST) -> List[list]:
+    """
+    Finds performance anti-patterns in a parsed module and returns [kind, line] pairs sorted
+    by line, where kind is a key of SMELL_SCORES.
+    """
+    visitor = _PerfSmellVisitor()
+    visitor.visit(tree)
+    return sorted(visitor.smells, key=lambda smell: (smell[1], smell[0]))
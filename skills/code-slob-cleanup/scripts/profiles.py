@@ -0,0 +1,103 @@
+import pstats
+from collections import defaultdict
+from pathlib import Path
+
+# Score multiplier per unit of CPU share: a block taking 10% of the profiled time doubles its score
+HOTNESS_WEIGHT = 10.0
+
+def load_profiles(profile_paths) -> pstats.Stats:
+    """Loads and merges pstats dumps (e.g. from several workers) into one Stats object."""
+    stats = pstats.Stats(str(profile_paths[0]))
+    for path in profile_paths[1:]:
+        stats.add(str(path))
+    return stats
+
+class ProfileIndex:
+    """
+    Merged cProfile/pstats data (see load_profiles), joined onto project blocks.
+
+    Profiled file names are matched to project files by their longest common path suffix, so
+    dumps taken on other machines or install locations still line up; frames that match no
+    project file (stdlib, site-packages, builtins) are dropped. The self time those frames
+    spend when called directly from a project function is credited to that caller, so a
+    function looping over `list.index` still shows up as hot.
+    """
+    def __init__(self, stats: pstats.Stats, project_files, target_dir):
+        self.total_time = stats.total_tt
+
+        self._suffixes = {}
+        basenames = defaultdict(list)
+        for file_path in project_files:
+            parts = file_path.relative_to(target_dir).parts
+            for i in range(len(parts) - 1):
+                self._suffixes[parts[i:]] = file_path
+            basenames[parts[-1]].append(file_path)
+        # A bare file name is only trusted when it is unique in the project
+        for name, files in basenames.items():
+            if len(files) == 1:
+                self._suffixes[(name,)] = files[0]
+        self._matched = {}
+
+        # (project file, function name) -> [(first line, calls, self time, cumulative time)]
+        entries = defaultdict(list)
+        folded = defaultdict(float)
+        for (filename, line, func_name), (_, calls, self_time, cumulative, callers) in stats.stats.items():
+            project_file = self._project_file(filename)
+            if project_file is not None:
+                entries[(project_file, func_name)].append([line, calls, self_time, cumulative])
+                continue
+            for caller, caller_stats in callers.items():
+                caller_file = self._project_file(caller[0])
+                # cProfile stores (primitive calls, calls, self time, cumulative time) spent under each
+                # caller; the pure-Python profile module only a call count, so there is no time to fold
+                if caller_file is not None and isinstance(caller_stats, tuple):
+                    folded[(caller_file, caller[1], caller[2])] += caller_stats[2]
+        for (project_file, line, func_name), extra in folded.items():
+            for entry in entries.get((project_file, func_name), []):
+                if entry[0] == line:
+                    entry.append(extra)
+        self._entries = {key: sorted(values) for key, values in entries.items()}
+
+    def _project_file(self, filename):
+        if filename in self._matched:
+            return self._matched[filename]
+        parts = Path(filename).parts if filename.endswith(".py") else ()
+        match = None
+        for i in range(len(parts)):
+            match = self._suffixes.get(parts[i:])
+            if match is not None:
+                break
+        self._matched[filename] = match
+        return match
+
+    def block_stats(self, file_path, func_metrics):
+        """
+        Returns {block index: profile stats} for the profiled blocks of one file. A profiled code
+        object starts at its first decorator, so it belongs to the first block with its name
+        whose definition line is at or after that line.
+        """
+        result = {}
+        by_name = defaultdict(list)
+        for idx, m in enumerate(func_metrics):
+            by_name[m["name"]].append(idx)
+        for name, indices in by_name.items():
+            indices.sort(key=lambda i: func_metrics[i]["line"])
+            for line, calls, self_time, cumulative, *folded in self._entries.get((file_path, name), []):
+                idx = next((i for i in indices if func_metrics[i]["line"] >= line), None)
+                if idx is None:
+                    continue
+                stats = result.setdefault(idx, {"calls": 0, "self_time": 0.0, "cumulative_time": 0.0, "hotness": 0.0})
+                stats["calls"] += calls
+                stats["self_time"] += self_time
+                stats["cumulative_time"] += cumulative
+                if self.total_time > 0:
+                    stats["hotness"] += (self_time + sum(folded)) / self.total_time
+        for stats in result.values():
+            stats["self_time"] = round(stats["self_time"], 6)
+            stats["cumulative_time"] = round(stats["cumulative_time"], 6)
+            stats["hotness"] = round(stats["hotness"], 4)
+        return result
+
+def weighted_score(score: float, hotness: float) -> float:
+    """Scales a slob score by how much of the profiled CPU time its block takes."""
+    return round(score * (1 + HOTNESS_WEIGHT * hotness), 2)
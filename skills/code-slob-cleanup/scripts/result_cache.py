@@ -0,0 +1,147 @@
+import ast
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+import hypothesis
+
+from fingerprint import fingerprint_sources
+
+# Bump when the layout of cached entries changes
+CACHE_FORMAT = 1
+
+# Modules whose code determines the verification and benchmark results
+RESULT_MODULES = ["verify.py", "benchmark.py", "common.py", "result_cache.py", "fingerprint.py"]
+
+# Environment settings that change what verify.py and benchmark.py measure
+SETTINGS_ENV_VARS = ["HYPOTHESIS_MAX_EXAMPLES", "BENCHMARK_RUNS", "BENCHMARK_ORDER", "BENCHMARK_SCALING"]
+
+def split_units(source: str):
+    """
+    Splits a module into its verification units: top-level classes and public functions, keyed
+    by name, each with its source (decorators included) and the names it references. Everything
+    else (imports, constants, private helpers) is the shared context, returned as
+    (context source, names the context references). Returns None for unparsable source.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+    lines = source.splitlines()
+    units = {}
+    unit_lines = set()
+    for node in tree.body:
+        is_unit = isinstance(node, ast.ClassDef) or (
+            isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and not node.name.startswith("_"))
+        if not is_unit:
+            continue
+        start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+        # A name defined twice is one unit: the later definition wins at runtime
+        unit_source, refs = units.get(node.name, ("", set()))
+        units[node.name] = (unit_source + "\n".join(lines[start - 1:node.end_lineno]) + "\n", refs | _referenced_names(node))
+        unit_lines.update(range(start, node.end_lineno + 1))
+    context_nodes = [node for node in tree.body if node.lineno not in unit_lines]
+    context = "\n".join(line for number, line in enumerate(lines, 1) if number not in unit_lines)
+    return units, (context, set().union(*map(_referenced_names, context_nodes)))
+
+def _referenced_names(node) -> set:
+    names = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name):
+            names.add(child.id)
+        elif isinstance(child, ast.Attribute):
+            names.add(child.attr)
+    return names
+
+def unit_of(display_name: str) -> str:
+    """Returns the unit a result record belongs to: 'path/to/file.py:Cls.method' -> 'Cls'."""
+    return display_name.rsplit(":", 1)[-1].split(".")[0]
+
+def is_transient(record) -> bool:
+    """Whether a result record reports a problem of the run (timeout, crashed worker) rather than of the code."""
+    reason = record.get("error") if record.get("tool") == "verify" else record.get("reason")
+    return record.get("status") == "SKIP" and bool(reason) and (
+        reason == "Timeout" or reason.startswith(("Worker exited", "Worker Error")))
+
+class ResultCache:
+    """
+    On-disk cache of the result records verify.py and benchmark.py emit for a job, per unit (a
+    top-level function or class, see split_units).
+
+    A unit's key covers the whole original.py, the job's type_hints.json, the tool version and
+    settings, and from refactored.py the shared context plus the source of the unit and of
+    every unit it (or the context) references by name. Fixing one function therefore leaves
+    the entries of the job's other functions valid. Each entry is a small JSON file, so worker
+    processes can read and write the cache concurrently.
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.version = fingerprint_sources(RESULT_MODULES, CACHE_FORMAT)
+        self.settings = {
+            "python": sys.version,
+            "hypothesis": hypothesis.__version__,
+            "env": {var: os.environ.get(var) for var in SETTINGS_ENV_VARS},
+        }
+
+    def job_keys(self, job_dir):
+        """Returns {unit name: key} for the units of job_dir's refactored.py ({} if it cannot be parsed)."""
+        job_dir = Path(job_dir)
+        try:
+            original = (job_dir / "original.py").read_bytes()
+            split = split_units((job_dir / "refactored.py").read_text(encoding="utf-8"))
+        except (OSError, UnicodeDecodeError):
+            return {}
+        if split is None:
+            return {}
+        try:
+            type_hints = (job_dir / "type_hints.json").read_bytes()
+        except OSError:
+            type_hints = b""
+        units, (context, context_refs) = split
+
+        base = hashlib.sha256()
+        for part in (self.version.encode("utf-8"), json.dumps(self.settings, sort_keys=True).encode("utf-8"),
+                     original, type_hints, context.encode("utf-8")):
+            base.update(len(part).to_bytes(8, "big"))
+            base.update(part)
+
+        keys = {}
+        for name in units:
+            # The unit and everything it can reach through names, starting from what the context uses
+            closure = {name} | (context_refs & units.keys())
+            stack = list(closure)
+            while stack:
+                for ref in units[stack.pop()][1] & units.keys():
+                    if ref not in closure:
+                        closure.add(ref)
+                        stack.append(ref)
+            digest = base.copy()
+            digest.update(json.dumps([name] + [[unit, units[unit][0]] for unit in sorted(closure)]).encode("utf-8"))
+            keys[name] = digest.hexdigest()
+        return keys
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def load(self, key: str):
+        """Returns the cached records for key, or None on a miss or unreadable entry."""
+        try:
+            with open(self._entry_path(key), "r", encoding="utf-8") as f:
+                records = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return records if isinstance(records, list) else None
+
+    def store(self, key: str, records):
+        entry_path = self._entry_path(key)
+        try:
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file first so concurrent readers never see a partial entry
+            tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(records, f)
+            os.replace(tmp_path, entry_path)
+        except OSError:
+            pass
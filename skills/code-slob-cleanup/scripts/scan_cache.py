@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+from pathlib import Path
+
+from fingerprint import fingerprint_sources
+
+# Bump when the layout of cached records changes
+CACHE_FORMAT = 2
+
+# Modules whose code determines the contents of a per-file record
+ANALYSIS_MODULES = ["identify.py", "analysis.py", "metrics.py", "semantic.py", "duplication.py", "exclusions.py",
+                    "call_graph.py", "perf_smells.py"]
+
+def get_tool_version(modules=None, fmt=CACHE_FORMAT) -> str:
+    """
+    Fingerprints the analysis code (see fingerprint.fingerprint_sources) and the radon version its
+    metrics come from, so that any change to the scanner invalidates old entries.
+    """
+    digest = hashlib.sha256(fingerprint_sources(modules or ANALYSIS_MODULES, fmt).encode("utf-8"))
+    try:
+        import radon
+        digest.update(str(getattr(radon, "__version__", "")).encode("utf-8"))
+    except ImportError:
+        pass
+    return digest.hexdigest()
+
+def _encode_record(record):
+    encoded = dict(record)
+    encoded["file_path"] = str(record["file_path"])
+    inline_excl = dict(record["inline_excl"])
+    inline_excl["ignored_functions"] = sorted(inline_excl["ignored_functions"])
+    inline_excl["ignored_lines"] = sorted(inline_excl["ignored_lines"])
+    inline_excl["ignored_blocks"] = [list(b) for b in inline_excl["ignored_blocks"]]
+    encoded["inline_excl"] = inline_excl
+    return encoded
+
+def _decode_record(encoded, file_path):
+    record = dict(encoded)
+    record["file_path"] = file_path
+    inline_excl = dict(encoded["inline_excl"])
+    inline_excl["ignored_functions"] = set(inline_excl["ignored_functions"])
+    inline_excl["ignored_lines"] = set(inline_excl["ignored_lines"])
+    inline_excl["ignored_blocks"] = [tuple(b) for b in inline_excl["ignored_blocks"]]
+    record["inline_excl"] = inline_excl
+    return record
+
+class ScanCache:
+    """
+    On-disk cache of identify.py per-file records.
+
+    Entries are keyed on the file content hash, the file name (semantic relevance depends on it),
+    the scanner's tool version and the flags that change what a record contains. Each entry is a
+    small JSON file, so worker processes can read and write the cache concurrently.
+
+    Entries live in one directory per tool version and flag set, and a hit refreshes the entry's
+    modification time; prune() uses both to drop what later scans can no longer hit.
+    """
+    def __init__(self, cache_dir, flags=None):
+        self.cache_dir = Path(cache_dir)
+        self.flags = dict(sorted((flags or {}).items()))
+        self.version = get_tool_version()
+        namespace = hashlib.sha256(json.dumps([self.version, self.flags]).encode("utf-8")).hexdigest()[:16]
+        self.entries_dir = self.cache_dir / namespace
+        self.started = time.time()
+
+    def key(self, file_path, content: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(self.version.encode("utf-8"))
+        digest.update(json.dumps(self.flags).encode("utf-8"))
+        digest.update(Path(file_path).name.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(content.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.entries_dir / key[:2] / f"{key}.json"
+
+    def load(self, key: str, file_path):
+        """Returns the cached record for key, or None on a miss or unreadable entry."""
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, "r", encoding="utf-8") as f:
+                record = _decode_record(json.load(f), file_path)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        try:
+            # Marks the entry as used by this scan (see prune)
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return record
+
+    def store(self, key: str, record):
+        entry_path = self._entry_path(key)
+        try:
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file first so concurrent readers never see a partial entry
+            tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(_encode_record(record), f)
+            os.replace(tmp_path, entry_path)
+        except OSError:
+            pass
+
+    def prune(self, full_scan: bool):
+        """
+        Removes entries later scans cannot hit: every directory written by another tool version
+        and, after a scan that looked up every file of the tree (full_scan), the entries of this
+        version and flag set that the scan neither loaded nor stored, i.e. those of edited or
+        deleted files. Entries of other flag sets under the current version are kept.
+        """
+        try:
+            subdirs = [d for d in self.cache_dir.iterdir() if d.is_dir() and d != self.entries_dir]
+        except OSError:
+            return
+        for subdir in subdirs:
+            try:
+                stale = (subdir / "version").read_text(encoding="utf-8") != self.version
+            except OSError:
+                stale = True
+            if stale:
+                shutil.rmtree(subdir, ignore_errors=True)
+        try:
+            self.entries_dir.mkdir(parents=True, exist_ok=True)
+            (self.entries_dir / "version").write_text(self.version, encoding="utf-8")
+        except OSError:
+            return
+        if not full_scan:
+            return
+        # Allows for file systems that store modification times with a coarse resolution
+        cutoff = self.started - 2
+        for entry_path in self.entries_dir.glob("*/*"):
+            try:
+                if entry_path.stat().st_mtime < cutoff:
+                    entry_path.unlink()
+            except OSError:
+                pass
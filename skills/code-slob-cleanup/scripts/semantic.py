@@ -2,13 +2,175 @@ import ast
 import os
 from typing import List, Dict, Any
 
-def detect_global_variables(code: str) -> List[Dict[str, Any]]:
+class _Scope:
+    def __init__(self, kind: str, parent=None):
+        self.kind = kind
+        self.parent = parent
+        self.bound = set()
+        self.declared_global = set()
+        # (name, line, is_load) for every name occurrence in this scope
+        self.occurrences = []
+
+    def resolves_globally(self, name: str) -> bool:
+        """Checks whether name, used in this scope, refers to the module-level binding."""
+        if self.kind == "module" or name in self.declared_global:
+            return True
+        if name in self.bound:
+            return False
+        scope = self.parent
+        while scope.kind != "module":
+            # Class bodies are not visible from the functions nested in them
+            if scope.kind != "class":
+                if name in scope.declared_global:
+                    return True
+                if name in scope.bound:
+                    return False
+            scope = scope.parent
+        return True
+
+class _ScopeVisitor(ast.NodeVisitor):
+    """
+    Records the names bound and used in every scope (module, class, function, lambda and
+    comprehension), following Python's binding rules, so a name can later be resolved to
+    either the module-level binding or a local (possibly shadowing) one.
+    """
+    def __init__(self):
+        self.module = _Scope("module")
+        self.scopes = [self.module]
+        self.current = self.module
+
+    def _bind(self, name: str):
+        self.current.bound.add(name)
+
+    def _enter(self, kind: str):
+        scope = _Scope(kind, self.current)
+        self.scopes.append(scope)
+        self.current = scope
+        return scope
+
+    def _visit_in(self, scope, nodes):
+        outer, self.current = self.current, scope
+        for node in nodes:
+            self.visit(node)
+        self.current = outer
+
+    def visit_Name(self, node):
+        if not isinstance(node.ctx, ast.Load):
+            self._bind(node.id)
+        self.current.occurrences.append((node.id, node.lineno, isinstance(node.ctx, ast.Load)))
+
+    def visit_Global(self, node):
+        self.current.declared_global.update(node.names)
+
+    def visit_Nonlocal(self, node):
+        # Bound in an enclosing function, so never the module-level name
+        self.current.bound.update(node.names)
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self._bind(alias.asname or alias.name.split(".")[0])
+
+    visit_ImportFrom = visit_Import
+
+    def visit_ExceptHandler(self, node):
+        if node.name:
+            self._bind(node.name)
+        self.generic_visit(node)
+
+    def visit_MatchAs(self, node):
+        if node.name:
+            self._bind(node.name)
+        self.generic_visit(node)
+
+    def visit_MatchStar(self, node):
+        if node.name:
+            self._bind(node.name)
+
+    def visit_MatchMapping(self, node):
+        if node.rest:
+            self._bind(node.rest)
+        self.generic_visit(node)
+
+    def visit_NamedExpr(self, node):
+        # Walrus targets bind in the nearest enclosing non-comprehension scope
+        scope = self.current
+        while scope.kind == "comprehension":
+            scope = scope.parent
+        scope.bound.add(node.target.id)
+        scope.occurrences.append((node.target.id, node.target.lineno, False))
+        self.visit(node.value)
+
+    def _visit_arguments(self, args: ast.arguments, scope):
+        # Defaults and annotations are evaluated in the enclosing scope
+        all_args = args.posonlyargs + args.args + args.kwonlyargs + [a for a in (args.vararg, args.kwarg) if a]
+        for node in args.defaults + [d for d in args.kw_defaults if d is not None]:
+            self.visit(node)
+        for arg in all_args:
+            if arg.annotation is not None:
+                self.visit(arg.annotation)
+            scope.bound.add(arg.arg)
+
+    def visit_FunctionDef(self, node):
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        if node.returns is not None:
+            self.visit(node.returns)
+        self._bind(node.name)
+        scope = _Scope("function", self.current)
+        self.scopes.append(scope)
+        self._visit_arguments(node.args, scope)
+        self._visit_in(scope, node.body)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Lambda(self, node):
+        scope = _Scope("function", self.current)
+        self.scopes.append(scope)
+        self._visit_arguments(node.args, scope)
+        self._visit_in(scope, [node.body])
+
+    def visit_ClassDef(self, node):
+        for child in node.decorator_list + node.bases + [kw.value for kw in node.keywords]:
+            self.visit(child)
+        self._bind(node.name)
+        scope = _Scope("class", self.current)
+        self.scopes.append(scope)
+        self._visit_in(scope, node.body)
+
+    def _visit_comprehension(self, node, elements):
+        # The first iterable is evaluated in the enclosing scope
+        generators = node.generators
+        self.visit(generators[0].iter)
+        scope = _Scope("comprehension", self.current)
+        self.scopes.append(scope)
+        parts = []
+        for i, comp in enumerate(generators):
+            parts.append(comp.target)
+            if i > 0:
+                parts.append(comp.iter)
+            parts.extend(comp.ifs)
+        self._visit_in(scope, parts + elements)
+
+    def visit_ListComp(self, node):
+        self._visit_comprehension(node, [node.elt])
+
+    visit_SetComp = visit_GeneratorExp = visit_ListComp
+
+    def visit_DictComp(self, node):
+        self._visit_comprehension(node, [node.key, node.value])
+
+def detect_global_variables(code: str, tree: ast.AST = None) -> List[Dict[str, Any]]:
     """
     Detects top-level variable assignments that aren't constants (all caps).
     Returns a list of dictionaries with 'name', 'lines' (definitions), and 'usages'.
+    Usages are the lines that read or write the module-level binding: module-level code, and
+    functions or classes that use the name without binding it locally (or that declare it
+    `global`). Locals and parameters that shadow a global are not counted.
+    An already parsed tree for the code can be passed to skip re-parsing.
     """
     try:
-        tree = ast.parse(code)
+        if tree is None:
+            tree = ast.parse(code)
         globals_by_name = {}
         
         # Pass 1: Find top-level definitions
@@ -24,46 +186,42 @@ def detect_global_variables(code: str) -> List[Dict[str, Any]]:
             
             for name in names:
                 if name not in globals_by_name:
-                    globals_by_name[name] = {"name": name, "lines": [], "usages": []}
-                if node.lineno not in globals_by_name[name]["lines"]:
-                    globals_by_name[name]["lines"].append(node.lineno)
+                    globals_by_name[name] = {"name": name, "lines": set(), "usages": set()}
+                globals_by_name[name]["lines"].add(node.lineno)
 
         if not globals_by_name:
             return []
 
-        # Pass 2: Find all usages
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Name) and node.id in globals_by_name:
-                if isinstance(node.ctx, ast.Load):
-                    if node.lineno not in globals_by_name[node.id]["usages"]:
-                        globals_by_name[node.id]["usages"].append(node.lineno)
-                elif isinstance(node.ctx, ast.Store):
-                    # If it's a store not at top-level, it's either a local shadow or a global re-assignment
-                    # For simplicity, we only consider top-level assignments as 'definitions'
-                    # and other stores as 'usages' (re-assignments) if we want, 
-                    # but the user asked for "defined" and "used".
-                    # Let's check if this store is already in 'lines'.
-                    if node.lineno not in globals_by_name[node.id]["lines"] and node.lineno not in globals_by_name[node.id]["usages"]:
-                         globals_by_name[node.id]["usages"].append(node.lineno)
-        
-        # Clean up: remove definitions from usages (in case some Load happened on same line as Store, though unlikely)
+        # Pass 2: Find the usages that resolve to the module-level binding
+        visitor = _ScopeVisitor()
+        visitor.visit(tree)
+        for scope in visitor.scopes:
+            for name, line, is_load in scope.occurrences:
+                g = globals_by_name.get(name)
+                if g is None or not scope.resolves_globally(name):
+                    continue
+                # Reads always count; writes count unless they are the top-level definitions themselves
+                if is_load or line not in g["lines"]:
+                    g["usages"].add(line)
+
+        # Remove definitions from usages (e.g. `x = x + 1` at module level)
         for g in globals_by_name.values():
-            g["usages"] = [u for u in g["usages"] if u not in g["lines"]]
-            g["lines"].sort()
-            g["usages"].sort()
+            g["usages"] = sorted(g["usages"] - g["lines"])
+            g["lines"] = sorted(g["lines"])
 
         return list(globals_by_name.values())
     except Exception:
         return []
 
-def analyze_class_structure(code: str) -> Dict[str, Any]:
+def analyze_class_structure(code: str, tree: ast.AST = None) -> Dict[str, Any]:
     """
     Analyzes class usage, looking for:
     - Public vs Private classes.
     - Ratio of private classes.
     """
     try:
-        tree = ast.parse(code)
+        if tree is None:
+            tree = ast.parse(code)
         classes = [node for node in tree.body if isinstance(node, ast.ClassDef)]
         
         public_classes = [c.name for c in classes if not c.name.startswith('_')]
@@ -78,7 +236,7 @@ def analyze_class_structure(code: str) -> Dict[str, Any]:
     except Exception:
         return {"total_classes": 0, "public_classes": [], "private_classes": [], "private_ratio": 0}
 
-def evaluate_semantic_relevance(file_path: str, code: str) -> Dict[str, Any]:
+def evaluate_semantic_relevance(file_path: str, code: str, tree: ast.AST = None) -> Dict[str, Any]:
     """
     Heuristic to check if classes/functions match the filename.
     If there are many classes and they don't seem related to the file name, it's slob.
@@ -87,7 +245,8 @@ def evaluate_semantic_relevance(file_path: str, code: str) -> Dict[str, Any]:
     file_parts = set(file_name.split("_"))
     
     try:
-        tree = ast.parse(code)
+        if tree is None:
+            tree = ast.parse(code)
         classes = [node.name for node in tree.body if isinstance(node, ast.ClassDef)]
         functions = [node.name for node in tree.body if isinstance(node, ast.FunctionDef)]
         
@@ -111,13 +270,17 @@ def evaluate_semantic_relevance(file_path: str, code: str) -> Dict[str, Any]:
     except Exception:
         return {"relevance_score": 1.0, "irrelevant_classes": [], "is_potentially_misplaced": False}
 
-def get_semantic_slob_score(file_path: str, code: str) -> float:
+def get_semantic_slob_score(file_path: str, code: str, globals_list=None, class_info=None, relevance=None) -> float:
     """
     Calculates a semantic 'slob' penalty.
+    Results of the individual analyses can be passed in when the caller already computed them.
     """
-    globals_list = detect_global_variables(code)
-    class_info = analyze_class_structure(code)
-    relevance = evaluate_semantic_relevance(file_path, code)
+    if globals_list is None:
+        globals_list = detect_global_variables(code)
+    if class_info is None:
+        class_info = analyze_class_structure(code)
+    if relevance is None:
+        relevance = evaluate_semantic_relevance(file_path, code)
     
     penalty = 0.0
     
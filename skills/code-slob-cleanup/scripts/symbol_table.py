@@ -0,0 +1,308 @@
+# /// script
+# dependencies = [
+#     "radon",
+# ]
+# ///
+
+import ast
+import sys
+import json
+import sqlite3
+import hashlib
+import argparse
+from pathlib import Path
+
+# Ensure we can import local modules
+sys.path.append(str(Path(__file__).parent))
+
+import analysis
+import metrics
+from scan_cache import get_tool_version
+
+# Bump when the schema or the meaning of stored rows changes
+SYMBOLS_FORMAT = 1
+
+# Modules that decide which definitions and import edges are extracted from a file
+SYMBOL_MODULES = ["symbol_table.py", "analysis.py", "metrics.py"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, content_hash TEXT, resolved INTEGER NOT NULL DEFAULT 0);
+CREATE TABLE IF NOT EXISTS definitions (
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    end_line INTEGER NOT NULL,
+    is_private INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS import_froms (path TEXT NOT NULL, module TEXT, level INTEGER NOT NULL, name TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS imports (path TEXT NOT NULL, name TEXT NOT NULL, alias TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS attr_refs (path TEXT NOT NULL, alias TEXT NOT NULL, attr TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS refs (src TEXT NOT NULL, dst TEXT NOT NULL, name TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS definitions_path ON definitions (path);
+CREATE INDEX IF NOT EXISTS definitions_name ON definitions (name);
+CREATE INDEX IF NOT EXISTS import_froms_path ON import_froms (path);
+CREATE INDEX IF NOT EXISTS imports_path ON imports (path);
+CREATE INDEX IF NOT EXISTS attr_refs_path ON attr_refs (path);
+CREATE INDEX IF NOT EXISTS refs_src ON refs (src);
+CREATE INDEX IF NOT EXISTS refs_dst ON refs (dst, name);
+"""
+
+_PER_FILE_TABLES = ["definitions", "import_froms", "imports", "attr_refs"]
+
+def extract_symbols(code: str):
+    """
+    Parses a file once and returns (func_metrics, import_refs): the blocks it defines and
+    its import edges, in the same shape identify.py's analysis pass produces them.
+    """
+    try:
+        tree = ast.parse(code)
+    except Exception:
+        return [], {"import_froms": [], "imports": [], "attr_refs": {}}
+    return metrics.get_function_metrics(code, tree=tree), analysis.collect_import_refs(tree)
+
+class SymbolTable:
+    """
+    Persistent SQLite symbol table and import graph for one project tree.
+
+    Stores each file's definitions and raw import edges (paths relative to root), plus the
+    edges resolved to project files. Files are replaced as a unit and only their own edges are
+    re-resolved, unless files were added or removed, which changes the module index and
+    re-resolves every file from the stored edges. No file is parsed on load.
+    """
+    def __init__(self, db_path, root):
+        self.root = Path(root).resolve()
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.executescript(_SCHEMA)
+        version = get_tool_version(SYMBOL_MODULES, SYMBOLS_FORMAT)
+        stored = dict(self.conn.execute("SELECT key, value FROM meta").fetchall())
+        if stored.get("version") != version or stored.get("root") != str(self.root):
+            with self.conn:
+                for table in ["files", "refs"] + _PER_FILE_TABLES:
+                    self.conn.execute(f"DELETE FROM {table}")
+                self.conn.execute("DELETE FROM meta")
+                self.conn.executemany("INSERT INTO meta VALUES (?, ?)", [("version", version), ("root", str(self.root))])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def _rel(self, file_path) -> str:
+        return Path(file_path).resolve().relative_to(self.root).as_posix()
+
+    def is_empty(self) -> bool:
+        return self.conn.execute("SELECT 1 FROM files LIMIT 1").fetchone() is None
+
+    def content_hashes(self):
+        """Returns {relative path: content hash} for every stored file."""
+        return dict(self.conn.execute("SELECT path, content_hash FROM files").fetchall())
+
+    def set_file(self, file_path, digest, func_metrics, import_refs):
+        """Replaces everything stored for file_path with the given analysis results."""
+        rel = self._rel(file_path)
+        self._delete_rows(rel)
+        self.conn.executemany(
+            "INSERT INTO definitions VALUES (?, ?, ?, ?, ?, ?)",
+            [(rel, m["name"], m["type"], m["line"], m["end_line"], int(m["is_private"])) for m in func_metrics]
+        )
+        self.conn.executemany(
+            "INSERT INTO import_froms VALUES (?, ?, ?, ?)",
+            [(rel, imp["module"], imp["level"], name) for imp in import_refs["import_froms"] for name in imp["names"]]
+        )
+        self.conn.executemany(
+            "INSERT INTO imports VALUES (?, ?, ?)",
+            [(rel, imp["name"], imp["alias"]) for imp in import_refs["imports"]]
+        )
+        self.conn.executemany(
+            "INSERT INTO attr_refs VALUES (?, ?, ?)",
+            [(rel, alias, attr) for alias, attrs in import_refs["attr_refs"].items() for attr in attrs]
+        )
+        self.conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, 0)", (rel, digest))
+
+    def update_file(self, file_path) -> bool:
+        """
+        Re-extracts file_path if its content changed since it was stored; a missing file is removed.
+        Returns True when the table changed.
+        """
+        path = Path(file_path)
+        try:
+            code = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return self.remove_file(path)
+        digest = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        row = self.conn.execute("SELECT content_hash FROM files WHERE path = ?", (self._rel(path),)).fetchone()
+        if row is not None and row[0] == digest:
+            return False
+        func_metrics, import_refs = extract_symbols(code)
+        self.set_file(path, digest, func_metrics, import_refs)
+        return True
+
+    def _delete_rows(self, rel):
+        for table in _PER_FILE_TABLES:
+            self.conn.execute(f"DELETE FROM {table} WHERE path = ?", (rel,))
+        self.conn.execute("DELETE FROM refs WHERE src = ?", (rel,))
+
+    def remove_file(self, file_path) -> bool:
+        rel = self._rel(file_path)
+        self._delete_rows(rel)
+        return self.conn.execute("DELETE FROM files WHERE path = ?", (rel,)).rowcount > 0
+
+    def prune(self, keep):
+        """Removes stored files that are not in keep (e.g. deleted since the last scan)."""
+        keep = {self._rel(p) for p in keep}
+        stale = [rel for rel in self.content_hashes() if rel not in keep]
+        for rel in stale:
+            self.remove_file(self.root / rel)
+        return stale
+
+    def _import_refs(self, rel):
+        import_froms = {}
+        for module, level, name in self.conn.execute(
+            "SELECT module, level, name FROM import_froms WHERE path = ? ORDER BY rowid", (rel,)
+        ):
+            import_froms.setdefault((module, level), []).append(name)
+        attr_refs = {}
+        for alias, attr in self.conn.execute("SELECT alias, attr FROM attr_refs WHERE path = ?", (rel,)):
+            attr_refs.setdefault(alias, []).append(attr)
+        return {
+            "import_froms": [{"module": m, "level": l, "names": names} for (m, l), names in import_froms.items()],
+            "imports": [{"name": n, "alias": a} for n, a in self.conn.execute("SELECT name, alias FROM imports WHERE path = ?", (rel,))],
+            "attr_refs": attr_refs
+        }
+
+    def resolve(self):
+        """
+        Brings the resolved edges (refs) up to date. Only files stored since the last call are
+        resolved, unless the set of files changed, in which case every file is.
+        """
+        paths = sorted(self.content_hashes())
+        fingerprint = hashlib.sha256("\n".join(paths).encode("utf-8")).hexdigest()
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'modules'").fetchone()
+        if row is None or row[0] != fingerprint:
+            self.conn.execute("DELETE FROM refs")
+            self.conn.execute("UPDATE files SET resolved = 0")
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('modules', ?)", (fingerprint,))
+
+        pending = [rel for (rel,) in self.conn.execute("SELECT path FROM files WHERE resolved = 0")]
+        if not pending:
+            return
+        module_to_file = analysis.build_module_index((rel, Path(rel)) for rel in paths)
+        for rel in pending:
+            self.conn.execute("DELETE FROM refs WHERE src = ?", (rel,))
+            edges = set(analysis.resolve_import_refs(rel, Path(rel), self._import_refs(rel), module_to_file))
+            self.conn.executemany("INSERT INTO refs VALUES (?, ?, ?)", [(rel, dst, name) for dst, name in edges])
+        self.conn.execute("UPDATE files SET resolved = 1 WHERE resolved = 0")
+        self.conn.commit()
+
+    def used_outside(self):
+        """
+        Returns {absolute file path: public names used by other project files}, matching
+        CrossReferenceAnalyzer.used_outside.
+        """
+        self.resolve()
+        used = {}
+        for dst, name in self.conn.execute(
+            "SELECT DISTINCT r.dst, d.name FROM refs r JOIN definitions d "
+            "ON d.path = r.dst AND (d.name = r.name OR r.name = '*') WHERE d.is_private = 0"
+        ):
+            used.setdefault(self.root / dst, set()).add(name)
+        return used
+
+    def definitions_of(self, name):
+        """Returns where name is defined, as dicts with path (relative to root), type, line and end_line."""
+        return [
+            {"path": path, "type": type_, "line": line, "end_line": end_line}
+            for path, type_, line, end_line in self.conn.execute(
+                "SELECT path, type, line, end_line FROM definitions WHERE name = ? ORDER BY path, line", (name,)
+            )
+        ]
+
+    def users_of(self, name, path=None):
+        """Returns the files that import name (optionally only from the file at path)."""
+        self.resolve()
+        query = "SELECT DISTINCT src FROM refs WHERE (name = ? OR name = '*')"
+        params = [name]
+        if path is not None:
+            query += " AND dst = ?"
+            params.append(self._rel(path))
+        return [src for (src,) in self.conn.execute(query + " ORDER BY src", params)]
+
+    def reexports(self):
+        """
+        Returns {package __init__ path: [(name, source path)]} for names a package's
+        __init__.py imports from other project modules, i.e. its re-exported API.
+        """
+        self.resolve()
+        result = {}
+        for src, dst, name in self.conn.execute(
+            "SELECT src, dst, name FROM refs WHERE src LIKE '%__init__.py' ORDER BY src, name"
+        ):
+            if Path(src).name == "__init__.py":
+                result.setdefault(src, []).append((name, dst))
+        return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain a persistent symbol table and import graph for a project.")
+    parser.add_argument("target_dir", type=str, help="Project root the table describes")
+    parser.add_argument("--db", type=str, help="Path of the SQLite table (default: <target_dir>/.code-slob-symbols.db)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("build", help="Store every Python file under the project root (unchanged files are skipped)")
+    update = subparsers.add_parser("update", help="Re-extract the given files (deleted files are removed)")
+    update.add_argument("paths", nargs="*", help="Changed files; read from stdin, one per line, if omitted")
+    where = subparsers.add_parser("where", help="Show where a function or class is defined and which files import it")
+    where.add_argument("name", type=str)
+    subparsers.add_parser("dump", help="Print the resolved import graph as JSON")
+
+    args = parser.parse_args()
+    target_dir = Path(args.target_dir).resolve()
+    if not target_dir.exists():
+        print(f"Error: {target_dir} does not exist.", file=sys.stderr)
+        sys.exit(1)
+    db_path = Path(args.db) if args.db else target_dir / ".code-slob-symbols.db"
+
+    with SymbolTable(db_path, target_dir) as table:
+        if args.command in ("build", "update"):
+            if args.command == "build":
+                # Imported here so the table module itself stays free of identify.py's CLI
+                from identify import iter_python_files
+                paths = list(iter_python_files(target_dir))
+            else:
+                paths = [Path(p) for p in (args.paths or [line.strip() for line in sys.stdin if line.strip()])]
+            changed = 0
+            for path in paths:
+                if path.suffix != ".py":
+                    continue
+                try:
+                    changed += table.update_file(path)
+                except Exception as e:
+                    print(f"Error processing {path}: {e}", file=sys.stderr)
+            removed = table.prune(paths) if args.command == "build" else []
+            table.resolve()
+            print(f"Stored {len(paths)} files ({changed} updated, {len(removed)} removed).")
+        elif args.command == "where":
+            found = table.definitions_of(args.name)
+            if not found:
+                print(f"No definition of {args.name} found.")
+            for d in found:
+                users = table.users_of(args.name, target_dir / d["path"])
+                print(f"{d['path']}:{d['line']}-{d['end_line']} ({d['type']})")
+                for user in users:
+                    print(f"  imported by {user}")
+        else:
+            graph = {}
+            for src, dst, name in table.conn.execute("SELECT src, dst, name FROM refs ORDER BY src, dst, name"):
+                graph.setdefault(src, {}).setdefault(dst, []).append(name)
+            print(json.dumps({"imports": graph, "reexports": table.reexports()}, indent=2))
+
+if __name__ == "__main__":
+    main()
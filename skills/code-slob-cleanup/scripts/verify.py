@@ -13,6 +13,8 @@ import time
 import multiprocessing
 import string
 import random
+from collections import deque
+from multiprocessing.connection import wait
 from queue import Empty
 from typing import Callable, Dict, Any, Optional
 from pathlib import Path
@@ -31,13 +33,32 @@ import hypothesis
 import hypothesis.strategies as st
 from hypothesis.errors import Unsatisfiable
 
-from common import load_module_from_path, get_common_functions, get_common_classes, infer_strategy, smart_infer_arg_strategies, get_display_name
+from common import load_module_from_path, get_common_functions, get_common_classes, get_common_methods, get_public_functions, infer_strategy, smart_infer_arg_strategies, get_display_name, load_job_config, emit_result
+
+# Seconds one function's verification may run before it is reported as [SKIP] (Timeout)
+VERIFY_TIMEOUT = 120
+# Caps how many functions verify_files checks at once (default: the CPU count). The orchestrator
+# sets it so that its parallel jobs share the CPUs instead of each taking all of them.
+PROCESSES_ENV_VAR = "VERIFY_PROCESSES"
 
 @dataclass
 class VerifyResult:
     status: str  # "PASS", "FAIL", "SKIP"
     duration: float
     error: Optional[str] = None
+    # The input the two versions disagree on, for a FAIL found by comparing results
+    counterexample: Optional[str] = None
+
+class Mismatch(AssertionError):
+    """Raised by check_result_equivalence for an input on which the two versions disagree."""
+    def __init__(self, counterexample: str, detail: str):
+        super().__init__(f"Mismatch for {counterexample}: {detail}")
+        self.counterexample = counterexample
+
+def emit_verify_result(display_name: str, status: str, duration: float, error: Optional[str] = None, counterexample: Optional[str] = None):
+    """Appends one function's verification outcome to the result file (see common.emit_result)."""
+    emit_result({"tool": "verify", "name": display_name, "status": status, "duration": round(duration, 4),
+                 "error": error, "counterexample": counterexample})
 
 def is_explicit_raise(exc: Exception) -> bool:
     """Checks if an exception was explicitly raised with a 'raise' statement."""
@@ -109,7 +130,7 @@ def run_hypothesis_verification(orig_func: Callable, ref_func: Callable, config:
         raw_tb = traceback.format_exc()
         cleaned_tb = clean_traceback(raw_tb)
         error_msg = cleaned_tb if cleaned_tb else str(e)
-        return VerifyResult("FAIL", duration, error_msg)
+        return VerifyResult("FAIL", duration, error_msg, getattr(e, "counterexample", None))
 
     except Unsatisfiable as e:
         duration = time.time() - start_time
@@ -176,23 +197,23 @@ def check_result_equivalence(orig_res, orig_exc, ref_res, ref_exc, args_context)
                 # If the original exception was explicitly raised (intentional), types must match.
                 # If it was an unexpected/unhandled error, allow differing types — both crashed, that's fine.
                 if is_explicit_raise(orig_exc):
-                    raise AssertionError(f"Mismatch for {args_context}: Original raised {orig_name} (explicit), Refactored raised {ref_name}")
+                    raise Mismatch(args_context, f"Original raised {orig_name} (explicit), Refactored raised {ref_name}")
                 return  # PASS - both threw unexpected errors, types don't need to match
         else:
             # Original raised, Refactored didn't. 
             # OK if it was an unhandled error (implicit raise), 
             # FAIL if it was a caught error (explicit raise).
             if is_explicit_raise(orig_exc):
-                raise AssertionError(f"Mismatch for {args_context}: Original raised {orig_name} (explicit), Refactored returned {ref_res}")
+                raise Mismatch(args_context, f"Original raised {orig_name} (explicit), Refactored returned {ref_res}")
             else:
                 return # PASS - fixed an unhandled (implicit) error
     else:
         # Original didn't raise
         if ref_exc:
-            raise AssertionError(f"Mismatch for {args_context}: Original returned {orig_res}, Refactored raised {type(ref_exc).__name__}")
+            raise Mismatch(args_context, f"Original returned {orig_res}, Refactored raised {type(ref_exc).__name__}")
         
         if not objects_are_equal(orig_res, ref_res):
-             raise AssertionError(f"Mismatch for {args_context}: Original={orig_res}, Refactored={ref_res}")
+             raise Mismatch(args_context, f"Original={orig_res}, Refactored={ref_res}")
 
 class NaiveRandomFuzzer:
     """
@@ -270,13 +291,13 @@ def run_naive_fuzzing(orig_func: Callable, ref_func: Callable) -> VerifyResult:
         return VerifyResult("PASS", duration)
     except AssertionError as e:
         duration = time.time() - start_time
-        return VerifyResult("FAIL", duration, str(e))
+        return VerifyResult("FAIL", duration, str(e), getattr(e, "counterexample", None))
     except Exception as e:
         duration = time.time() - start_time
         return VerifyResult("SKIP", duration, f"Error: {e}")
 
 def combine_results(name: str, hyp_res: VerifyResult, naive_res: VerifyResult, config: Dict[str, Any] = None):
-    """Combines results from both fuzzers and prints the output."""
+    """Combines results from both fuzzers, prints the output and emits the result record."""
     total_duration = hyp_res.duration + naive_res.duration
     display_name = get_display_name(name, config)
     
@@ -285,20 +306,17 @@ def combine_results(name: str, hyp_res: VerifyResult, naive_res: VerifyResult, c
     # Pass if one passes (and other passes/skips).
     # Skip if both skip.
     
-    if hyp_res.status == "FAIL":
-        print(f"[FAIL] {display_name} ({total_duration:.4f}s)")
-        if hyp_res.error:
-             print(hyp_res.error)
-        return "FAILURE"
-    
-    if naive_res.status == "FAIL":
-        print(f"[FAIL] {display_name} ({total_duration:.4f}s)")
-        if naive_res.error:
-             print(naive_res.error)
-        return "FAILURE"
+    for res in (hyp_res, naive_res):
+        if res.status == "FAIL":
+            print(f"[FAIL] {display_name} ({total_duration:.4f}s)")
+            if res.error:
+                print(res.error)
+            emit_verify_result(display_name, "FAIL", total_duration, res.error, res.counterexample)
+            return "FAILURE"
     
     if hyp_res.status == "PASS" or naive_res.status == "PASS":
         print(f"[PASS] {display_name} ({total_duration:.4f}s)")
+        emit_verify_result(display_name, "PASS", total_duration)
         return "SUCCESS"
     
     # Both skipped
@@ -310,6 +328,7 @@ def combine_results(name: str, hyp_res: VerifyResult, naive_res: VerifyResult, c
     
     reason_str = "; ".join(reasons) if reasons else "Both fuzzers skipped"
     print(f"[SKIP] {display_name} ({total_duration:.4f}s) ({reason_str})")
+    emit_verify_result(display_name, "SKIP", total_duration, reason_str)
     return "SKIPPED"
 
 def worker_verify_function(orig_path, ref_path, func_name, config, result_queue):
@@ -331,6 +350,7 @@ def worker_verify_function(orig_path, ref_path, func_name, config, result_queue)
         # Fallback if loading fails or something unexpected
         display_name = get_display_name(func_name, config)
         print(f"[SKIP] {display_name} (0.0000s) (Worker Error: {e})")
+        emit_verify_result(display_name, "SKIP", 0.0, f"Worker Error: {e}")
         result_queue.put("SKIPPED")
 
 def worker_verify_class_method(orig_path, ref_path, cls_name, method_name, config, result_queue):
@@ -409,7 +429,7 @@ def worker_verify_class_method(orig_path, ref_path, cls_name, method_name, confi
         except AssertionError as e:
             raw_tb = traceback.format_exc()
             cleaned_tb = clean_traceback(raw_tb)
-            hyp_res = VerifyResult("FAIL", time.time() - start_time, cleaned_tb if cleaned_tb else str(e))
+            hyp_res = VerifyResult("FAIL", time.time() - start_time, cleaned_tb if cleaned_tb else str(e), getattr(e, "counterexample", None))
         except Unsatisfiable:
              hyp_res = VerifyResult("SKIP", time.time() - start_time, "Unable to generate valid inputs")
         except Exception as e:
@@ -454,5 +474,79 @@ def worker_verify_class_method(orig_path, ref_path, cls_name, method_name, confi
     except Exception as e:
         display_name = get_display_name(full_name, config)
         print(f"[SKIP] {display_name} (0.0000s) (Worker Error: {e})")
+        emit_verify_result(display_name, "SKIP", 0.0, f"Worker Error: {e}")
         result_queue.put("SKIPPED")
 
+def verify_files(orig_path, ref_path, config: Dict[str, Any] = None, timeout: float = VERIFY_TIMEOUT, skip=(),
+                 processes: int = None) -> bool:
+    """
+    Verifies every function and class method the two files have in common, each in its own
+    process so that a hanging or crashing function cannot take the others down. At most
+    processes functions (default: VERIFY_PROCESSES or the CPU count) run at once, and each gets
+    timeout seconds from its own start. Prints one result line and emits one result record per
+    function, and returns False when any of them failed. Functions and classes named in skip
+    are left out (e.g. their results are cached).
+    """
+    try:
+        orig_mod = load_module_from_path(orig_path, "original_mod")
+        ref_mod = load_module_from_path(ref_path, "refactored_mod")
+    except Exception as e:
+        print(f"[FAIL] {Path(ref_path).name} (0.0000s)")
+        print(f"Could not load modules: {e}")
+        emit_verify_result(Path(ref_path).name, "FAIL", 0.0, f"Could not load modules: {e}")
+        return False
+
+    targets = deque((worker_verify_function, (func_name,), func_name)
+                    for func_name in get_public_functions(orig_mod, ref_mod) if func_name not in skip)
+    for cls_name in sorted(set(get_common_classes(orig_mod, ref_mod)) - set(skip)):
+        for method_name in get_common_methods(getattr(orig_mod, cls_name), getattr(ref_mod, cls_name)):
+            targets.append((worker_verify_class_method, (cls_name, method_name), f"{cls_name}.{method_name}"))
+
+    if processes is None:
+        processes = int(os.getenv(PROCESSES_ENV_VAR) or 0) or os.cpu_count() or 1
+    passed = True
+    # (process, result queue, full name, start time) of the functions being verified
+    running = []
+    while targets or running:
+        while targets and len(running) < max(1, processes):
+            worker, names, full_name = targets.popleft()
+            result_queue = multiprocessing.Queue()
+            process = multiprocessing.Process(target=worker, args=(orig_path, ref_path, *names, config, result_queue))
+            process.start()
+            running.append((process, result_queue, full_name, time.time()))
+
+        wait([entry[0].sentinel for entry in running], max(0.0, min(entry[3] for entry in running) + timeout - time.time()))
+        still_running = []
+        for process, result_queue, full_name, started in running:
+            display_name = get_display_name(full_name, config)
+            if process.is_alive():
+                if time.time() - started < timeout:
+                    still_running.append((process, result_queue, full_name, started))
+                    continue
+                process.terminate()
+                process.join()
+                print(f"[SKIP] {display_name} ({timeout:.4f}s) (Timeout)")
+                emit_verify_result(display_name, "SKIP", timeout, "Timeout")
+                continue
+            process.join()
+            try:
+                status = result_queue.get(timeout=1)
+            except Empty:
+                print(f"[SKIP] {display_name} (0.0000s) (Worker exited with code {process.exitcode})")
+                emit_verify_result(display_name, "SKIP", 0.0, f"Worker exited with code {process.exitcode}")
+                continue
+            if status == "FAILURE":
+                passed = False
+        running = still_running
+    return passed
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: verify.py <original.py> <refactored.py>")
+        sys.exit(2)
+    orig_path, ref_path = sys.argv[1], sys.argv[2]
+    config = load_job_config(Path(orig_path).parent)
+    sys.exit(0 if verify_files(orig_path, ref_path, config) else 1)
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
@@ -0,0 +1,138 @@
+import multiprocessing
+import os
+import sys
+import tempfile
+from collections import deque
+from multiprocessing.connection import wait
+
+def capture_output(func, *args):
+    """
+    Calls func(*args) with file descriptors 1 and 2 redirected to a temporary file and returns
+    (captured text, return value). Redirecting the descriptors rather than just sys.stdout also
+    captures what child processes started by func print.
+    """
+    with tempfile.TemporaryFile(mode="w+") as capture:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        saved_streams = sys.stdout, sys.stderr
+        saved_fds = [os.dup(1), os.dup(2)]
+        os.dup2(capture.fileno(), 1)
+        os.dup2(capture.fileno(), 2)
+        sys.stdout = sys.stderr = open(1, "w", buffering=1, closefd=False)
+        try:
+            result = func(*args)
+        finally:
+            sys.stdout.flush()
+            sys.stdout, sys.stderr = saved_streams
+            for fd, saved_fd in zip((1, 2), saved_fds):
+                os.dup2(saved_fd, fd)
+                os.close(saved_fd)
+        capture.seek(0)
+        return capture.read(), result
+
+def _call(handler, args):
+    try:
+        return handler(*args), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+def _worker_loop(handler, conn):
+    """Runs in a worker process: handles (key, args) jobs from conn until it gets None or the pipe closes."""
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        key, args = job
+        conn.send((key, *_call(handler, args)))
+
+class _Worker:
+    def __init__(self, handler):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_worker_loop, args=(handler, child_conn))
+        self.process.start()
+        child_conn.close()
+        # (key, args) of the job being handled, None when idle
+        self.job = None
+
+class WorkerPool:
+    """
+    Long-lived worker processes that run handler(*args) for every submitted job, so whatever the
+    handler's module imports is loaded once per worker instead of once per job. Jobs wait in a
+    queue and each goes to the next idle worker over its pipe; results() yields them back as
+    they complete. A worker that dies mid-job is replaced and its job reported with an error.
+    With size 0 the jobs run in the calling process instead (e.g. under a debugger).
+    """
+    def __init__(self, handler, size: int):
+        self.handler = handler
+        self._backlog = deque()
+        self._workers = [_Worker(handler) for _ in range(size)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, key, *args):
+        """Queues handler(*args); key identifies the job in results() and must be picklable."""
+        self._backlog.append((key, args))
+
+    def _dispatch(self):
+        for i, worker in enumerate(self._workers):
+            if not self._backlog:
+                return
+            if worker.job is not None:
+                continue
+            if not worker.process.is_alive():
+                worker = self._workers[i] = _Worker(self.handler)
+            worker.job = self._backlog.popleft()
+            worker.conn.send(worker.job)
+
+    def results(self):
+        """Yields (key, result, error) for every submitted job in completion order; error is None on success."""
+        if not self._workers:
+            while self._backlog:
+                key, args = self._backlog.popleft()
+                yield (key, *_call(self.handler, args))
+            return
+
+        while self._backlog or any(worker.job is not None for worker in self._workers):
+            self._dispatch()
+            busy = [worker for worker in self._workers if worker.job is not None]
+            wait([worker.conn for worker in busy] + [worker.process.sentinel for worker in busy])
+            for i, worker in enumerate(self._workers):
+                if worker.job is None:
+                    continue
+                if worker.conn.poll():
+                    try:
+                        message = worker.conn.recv()
+                    except EOFError:
+                        message = None
+                    if message is not None:
+                        worker.job = None
+                        yield message
+                        continue
+                if not worker.process.is_alive():
+                    worker.process.join()
+                    key = worker.job[0]
+                    worker.conn.close()
+                    self._workers[i] = _Worker(self.handler)
+                    yield key, None, f"Worker exited with code {worker.process.exitcode}"
+
+    def close(self, timeout: float = 5):
+        """Stops the workers once they finish their current job, terminating those still busy after timeout seconds."""
+        for worker in self._workers:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in self._workers:
+            worker.process.join(timeout=timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
+            worker.conn.close()
+        self._workers = []
@@ -26,12 +26,14 @@ SCRIPTS_DIR = (
 TESTS_DIR = Path(__file__).resolve().parent
 
 
-VERIFICATION_SCRIPTS = ["orchestrator.py", "verify.py", "common.py", "benchmark.py"]
+VERIFICATION_SCRIPTS = ["orchestrator.py", "verify.py", "common.py", "benchmark.py", "worker_pool.py", "result_cache.py", "fingerprint.py"]
 
 # Non-verification scripts in the same directory to omit from coverage
 OMIT_SCRIPTS = [
-    "clean_untested.py", "duplication.py", "exclusions.py",
-    "identify.py", "metrics.py", "semantic.py",
+    "analysis.py", "call_graph.py", "clean_untested.py", "clone_index.py",
+    "duplication.py", "exclusions.py", "identify.py", "metrics.py",
+    "perf_smells.py", "profiles.py", "scan_cache.py", "semantic.py",
+    "symbol_table.py",
 ]
 
 
@@ -1,5 +1,8 @@
 """Unit tests for benchmark.py — 100% branch coverage."""
+import multiprocessing
+import queue
 import time
+import numpy as np
 import pytest
 from unittest.mock import patch, MagicMock
 from pathlib import Path
@@ -8,10 +11,29 @@ import benchmark
 from benchmark import (
     generate_benchmark_inputs,
     measure_execution_time,
+    calibrate_batch_size,
+    measure_interleaved,
     run_with_timeout,
     worker_benchmark_func,
     worker_benchmark_class_method,
+    scale_input,
+    is_scalable,
+    fit_complexity_exponent,
+    measure_scaling,
+    report_scaling,
+    run_scaling,
+    _scaling_worker,
+    trim_outliers,
+    speedup_statistics,
+    format_speedup,
+    measure_memory,
+    report_memory,
+    benchmark_files,
+    compare_timings,
+    format_statistics,
+    emit_benchmark_result,
 )
+from common import read_results, RESULTS_ENV_VAR
 
 FIXTURES = Path(__file__).parent / "fixtures"
 SCRIPTS_DIR = Path(__file__).resolve().parents[2] / "skills" / "code-slob-cleanup" / "scripts"
@@ -79,8 +101,304 @@ def test_measure_execution_time_env_runs(monkeypatch):
     def f(x: int):
         return x
 
-    times = measure_execution_time(f, [(1,)], num_runs=50)
-    assert len(times) == 2
+    assert len(measure_execution_time(f, [(1,)])) == 2
+    # An explicit run count (e.g. SCALING_RUNS) wins over the environment
+    assert len(measure_execution_time(f, [(1,)], num_runs=3)) == 3
+
+
+# ---------------------------------------------------------------------------
+# calibrate_batch_size / measure_interleaved
+# ---------------------------------------------------------------------------
+
+def test_calibrate_batch_size_grows_for_fast_functions():
+    def f(x):
+        return x
+
+    assert calibrate_batch_size(f, [(1,)], min_time=1e-3) > 1
+    assert calibrate_batch_size(time.sleep, [(0.002,)], min_time=1e-3) == 1
+
+
+def test_calibrate_batch_size_capped(monkeypatch):
+    monkeypatch.setattr(benchmark, "MAX_BATCH_SIZE", 4)
+    assert calibrate_batch_size(lambda: None, [()], min_time=10.0) == 4
+
+
+def _recording_pair(calls):
+    def orig(x):
+        calls.append("A")
+
+    def ref(x):
+        calls.append("B")
+
+    return orig, ref
+
+
+def test_measure_interleaved_abba(monkeypatch):
+    monkeypatch.setattr(benchmark, "calibrate_batch_size", lambda func, inputs: 1)
+    calls = []
+    orig, ref = _recording_pair(calls)
+    orig_times, ref_times = measure_interleaved(orig, ref, [(1,)], num_runs=4)
+    assert len(orig_times) == len(ref_times) == 4
+    # 5 warmup passes each, then AB BA AB BA
+    assert "".join(calls[10:]) == "ABBAABBA"
+
+
+def test_measure_interleaved_random_order(monkeypatch):
+    monkeypatch.setattr(benchmark, "calibrate_batch_size", lambda func, inputs: 1)
+    monkeypatch.setenv("BENCHMARK_ORDER", "random")
+    calls = []
+    orig, ref = _recording_pair(calls)
+    measure_interleaved(orig, ref, [(1,)], num_runs=20)
+    pairs = ["".join(calls[i:i + 2]) for i in range(10, len(calls), 2)]
+    assert set(pairs) == {"AB", "BA"}
+
+
+def test_measure_interleaved_large_speed_ratio():
+    """A much faster refactor must not make every sample of the original run its batch size."""
+    calls = []
+
+    def slow(x):
+        calls.append(x)
+        time.sleep(0.002)
+
+    orig_times, ref_times = measure_interleaved(slow, abs, [(-1,)], num_runs=4)
+    assert len(orig_times) == len(ref_times) == 4
+    # 5 warmup calls, one calibration call, then one call per sample
+    assert len(calls) == 5 + 1 + 4
+    assert min(orig_times) > 1000 * min(ref_times)
+
+
+def test_measure_interleaved_env_runs(monkeypatch):
+    monkeypatch.setenv("BENCHMARK_RUNS", "3")
+    orig_times, ref_times = measure_interleaved(abs, abs, [(-1,)])
+    assert len(orig_times) == len(ref_times) == 3
+    assert len(measure_interleaved(abs, abs, [(-1,)], num_runs=2)[0]) == 2
+
+
+# ---------------------------------------------------------------------------
+# speedup statistics
+# ---------------------------------------------------------------------------
+
+def test_trim_outliers_drops_spikes():
+    times = [1.0, 1.1, 0.9, 1.0, 1.05, 50.0]
+    assert 50.0 not in trim_outliers(times)
+    assert len(trim_outliers(times)) == 5
+
+
+def test_speedup_statistics_verdicts():
+    rng = np.random.default_rng(1)
+    slow = rng.normal(1.0, 0.05, 50)
+    fast = rng.normal(0.8, 0.05, 50)
+    same = rng.normal(1.0, 0.05, 50)
+
+    faster = speedup_statistics(slow, fast)
+    assert faster["verdict"] == "faster"
+    assert faster["ci_low"] < faster["speedup"] < faster["ci_high"]
+    assert faster["p_value"] < 0.05
+    assert speedup_statistics(fast, slow)["verdict"] == "slower"
+    assert speedup_statistics(slow, same)["verdict"] == "inconclusive"
+
+
+def test_speedup_statistics_deterministic():
+    a, b = [1.0, 1.2, 1.1, 0.9], [0.5, 0.6, 0.55, 0.52]
+    assert speedup_statistics(a, b) == speedup_statistics(a, b)
+
+
+def test_format_speedup():
+    text = format_speedup([2.0, 2.1, 1.9, 2.0] * 5, [1.0, 1.05, 0.95, 1.0] * 5)
+    assert text.startswith("2.00x (95% CI ")
+    assert text.endswith(", faster)")
+    assert format_speedup([1.0], [0.0, 0.0, 0.0, 1.0]) == "N/A"
+
+
+def test_compare_timings():
+    stats = compare_timings([2.0, 2.1, 1.9, 2.0] * 5, [1.0, 1.05, 0.95, 1.0] * 5)
+    assert stats["verdict"] == "faster"
+    assert format_statistics(stats).startswith("2.00x (95% CI ")
+    assert compare_timings([1.0], [0.0, 0.0]) is None
+    assert format_statistics(None) == "N/A"
+
+
+def test_emit_benchmark_result(tmp_path, monkeypatch):
+    path = tmp_path / "results.jsonl"
+    monkeypatch.setenv(RESULTS_ENV_VAR, str(path))
+    memory = ({"peak": 10, "allocated": 20, "retained": 0}, {"peak": 5, "allocated": 5, "retained": 0})
+    emit_benchmark_result("f", None, [np.float64(2.0)], [1.0], memory)
+    emit_benchmark_result("g", {"speedup": 2.0}, [2.0], [1.0], memory, scaling=(2.0, 1.0))
+    f, g = read_results(path)
+    assert f == {"tool": "benchmark", "name": "f", "status": "OK", "speedup": None,
+                 "timings": {"orig": [2.0], "ref": [1.0]}, "memory": {"orig": memory[0], "ref": memory[1]}}
+    assert g["scaling"] == {"orig": 2.0, "ref": 1.0}
+
+
+# ---------------------------------------------------------------------------
+# memory
+# ---------------------------------------------------------------------------
+
+def _allocate(n):
+    return len([i for i in range(n)])
+
+
+def test_measure_memory_peak_and_allocated():
+    mem = measure_memory(_allocate, [(10000,), (100,)])
+    assert mem["peak"] > 10000 * 8
+    assert mem["allocated"] >= mem["peak"]
+    assert mem["retained"] < mem["peak"]
+
+
+def test_measure_memory_counts_retained_and_survives_errors():
+    cache = []
+
+    def leaky(x):
+        cache.append([0] * 1000)
+        if x:
+            raise ValueError("boom")
+
+    mem = measure_memory(leaky, [(0,), (1,)])
+    assert mem["retained"] >= 2 * 1000 * 8
+
+
+def test_measure_memory_keeps_existing_tracing():
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        measure_memory(_allocate, [(10,)])
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_report_memory(capsys):
+    orig, ref = report_memory("f", _allocate, abs, [(10000,)])
+    assert orig["peak"] > ref["peak"] == 0
+    out = capsys.readouterr().out
+    assert out.startswith("[MEMORY] f: orig ")
+    assert "KiB peak, ref 0.0 KiB peak (allocated " in out
+
+
+# ---------------------------------------------------------------------------
+# scaling
+# ---------------------------------------------------------------------------
+
+def test_scale_input_containers():
+    args = ([1, 2], ("a", "b"), {"k": 1}, "xy", {1.5}, [None])
+    lst, tup, dct, text, st_, objs = scale_input(args, 10)
+    assert len(lst) == 10 and all(isinstance(x, int) for x in lst)
+    assert isinstance(tup, tuple) and len(tup) == 10 and all(isinstance(x, str) for x in tup)
+    assert len(dct) == 10 and all(k.startswith("k") for k in dct)
+    assert len(text) == 10 and set(text) <= {"x", "y"}
+    assert st_ == {1.5}
+    assert objs == [None] * 10
+
+
+def test_scale_input_empty_and_int_keys():
+    lst, dct, text = scale_input(([], {1: "a"}, ""), 8)
+    assert len(lst) == 8
+    assert list(dct) == list(range(8))
+    assert len(text) == 8
+
+
+def test_scale_input_counts_only_without_containers():
+    assert scale_input((3, True, -1), 64) == (64, True, -1)
+    assert scale_input(([1], 3), 4)[1] == 3
+
+
+def test_scale_input_deterministic():
+    assert scale_input(([1, 2],), 50) == scale_input(([1, 2],), 50)
+
+
+def test_is_scalable():
+    assert is_scalable(([1],))
+    assert is_scalable((5,))
+    assert not is_scalable((-5, True, 1.5, None))
+
+
+def test_fit_complexity_exponent():
+    sizes = [16, 32, 64, 128]
+    assert fit_complexity_exponent(sizes, [n * 1e-6 for n in sizes]) == pytest.approx(1.0)
+    assert fit_complexity_exponent(sizes, [n * n * 1e-9 for n in sizes]) == pytest.approx(2.0)
+
+
+def test_measure_scaling_stops_on_error():
+    def f(xs):
+        if len(xs) > 32:
+            raise ValueError("too big")
+        return sum(xs)
+
+    timings = measure_scaling(f, ([1, 2],), sizes=[16, 32, 64, 128])
+    assert list(timings) == [16, 32]
+
+
+def test_measure_scaling_stops_over_budget(monkeypatch):
+    monkeypatch.setattr(benchmark, "SCALING_TIME_BUDGET", -1.0)
+    timings = measure_scaling(len, ([1],), sizes=[16, 32])
+    assert list(timings) == [16]
+
+
+def test_report_scaling_exponents(capsys):
+    def quadratic(xs):
+        return [x for x in xs for _ in xs]
+
+    exponents = report_scaling("f", quadratic, len, [(-1,), ([1, 2],)])
+    out = capsys.readouterr().out
+    assert out.startswith("[SCALING] f: orig ~n^")
+    orig_exp = float(out.split("orig ~n^")[1].split(",")[0])
+    ref_exp = float(out.split("ref ~n^")[1])
+    assert orig_exp > ref_exp
+    assert exponents[0] > exponents[1]
+
+
+def test_report_scaling_no_sized_arguments(capsys):
+    assert report_scaling("f", abs, abs, [(-1,)]) is None
+    assert "[SKIP] f (Scaling: no sized arguments)" in capsys.readouterr().out
+
+
+def test_report_scaling_too_few_sizes(capsys):
+    with patch("benchmark.measure_scaling", return_value={16: 1e-6}):
+        report_scaling("f", len, len, [([1],)])
+    assert "only 1 input sizes" in capsys.readouterr().out
+
+
+def test_run_scaling_returns_exponents():
+    assert run_scaling("f", len, len, [([1, 2],)]) is not None
+
+
+def test_run_scaling_timeout(capfd):
+    def slow(xs):
+        time.sleep(5)
+
+    with patch("benchmark.report_scaling", lambda *args: slow(args)):
+        assert run_scaling("f", len, len, [([1],)], timeout=0.3) is None
+    assert "[SKIP] f (Scaling: Timeout)" in capfd.readouterr().out
+
+
+def test_run_scaling_without_fork(monkeypatch):
+    """Platforms without fork (Windows) use the default start method."""
+    contexts = []
+    get_context = multiprocessing.get_context
+    monkeypatch.setattr(multiprocessing, "get_all_start_methods", lambda: ["spawn"])
+    monkeypatch.setattr(multiprocessing, "get_context", lambda method=None: contexts.append(method) or get_context(method))
+    assert run_scaling("f", len, len, [([1, 2],)]) is not None
+    assert contexts == [None]
+
+
+def test_run_scaling_unpicklable_functions(monkeypatch, capsys):
+    """With spawn, functions that cannot be pickled skip scaling instead of the whole record."""
+    get_context = multiprocessing.get_context
+    monkeypatch.setattr(multiprocessing, "get_context", lambda method=None: get_context("spawn"))
+    assert run_scaling("f", lambda xs: len(xs), len, [([1, 2],)]) is None
+    assert "[SKIP] f (Scaling: " in capsys.readouterr().out
+
+
+def test_scaling_worker(capsys):
+    """Runs in process here; run_scaling starts it in a child."""
+    result_queue = queue.Queue()
+    with patch("benchmark.report_scaling", return_value=(1.0, 1.0)):
+        _scaling_worker("f", len, len, [([1],)], result_queue)
+    with patch("benchmark.report_scaling", side_effect=ValueError("bad fit")):
+        _scaling_worker("f", len, len, [([1],)], result_queue)
+    assert [result_queue.get(), result_queue.get()] == [(1.0, 1.0), None]
+    assert "[SKIP] f (Scaling: bad fit)" in capsys.readouterr().out
 
 
 # ---------------------------------------------------------------------------
@@ -96,7 +414,9 @@ def test_run_with_timeout_completes(capsys):
     assert "[SKIP]" not in out
 
 
-def test_run_with_timeout_kills(capsys):
+def test_run_with_timeout_kills(capsys, tmp_path, monkeypatch):
+    monkeypatch.setenv(RESULTS_ENV_VAR, str(tmp_path / "results.jsonl"))
+
     def slow_target():
         time.sleep(30)
 
@@ -104,6 +424,8 @@ def test_run_with_timeout_kills(capsys):
     out = capsys.readouterr().out
     assert "[SKIP]" in out
     assert "slow_func" in out
+    assert read_results(tmp_path / "results.jsonl") == [
+        {"tool": "benchmark", "name": "slow_func", "status": "SKIP", "reason": "Timeout"}]
 
 
 # ---------------------------------------------------------------------------
@@ -131,7 +453,7 @@ def test_worker_benchmark_func_no_inputs(capsys):
 def test_worker_benchmark_func_benchmark_fails(capsys):
     orig = str(FIXTURES / "job_pass_simple" / "original.py")
     ref = str(FIXTURES / "job_pass_simple" / "refactored.py")
-    with patch("benchmark.measure_execution_time", side_effect=RuntimeError("bench fail")):
+    with patch("benchmark.measure_interleaved", side_effect=RuntimeError("bench fail")):
         worker_benchmark_func(orig, ref, "add_one", {})
     out = capsys.readouterr().out
     assert "[SKIP]" in out
@@ -139,10 +461,10 @@ def test_worker_benchmark_func_benchmark_fails(capsys):
 
 
 def test_worker_benchmark_func_empty_times(capsys):
-    """When measure_execution_time returns [], job should SKIP."""
+    """When measure_interleaved returns no times, job should SKIP."""
     orig = str(FIXTURES / "job_pass_simple" / "original.py")
     ref = str(FIXTURES / "job_pass_simple" / "refactored.py")
-    with patch("benchmark.measure_execution_time", return_value=[]):
+    with patch("benchmark.measure_interleaved", return_value=([], [])):
         worker_benchmark_func(orig, ref, "add_one", {})
     out = capsys.readouterr().out
     assert "[SKIP]" in out
@@ -154,7 +476,7 @@ def test_worker_benchmark_func_ref_avg_zero(capsys):
     orig = str(FIXTURES / "job_pass_simple" / "original.py")
     ref = str(FIXTURES / "job_pass_simple" / "refactored.py")
     # Return times with mean=0 for refactored
-    with patch("benchmark.measure_execution_time", side_effect=[[0.001], [0.0]]):
+    with patch("benchmark.measure_interleaved", return_value=([0.001], [0.0])):
         worker_benchmark_func(orig, ref, "add_one", {})
     out = capsys.readouterr().out
     assert "N/A" in out
@@ -235,3 +557,87 @@ def test_worker_benchmark_class_method_no_method_inputs(capsys):
         worker_benchmark_class_method(orig, ref, "Counter", "increment", {})
     out = capsys.readouterr().out
     assert "[SKIP]" in out
+
+
+def test_worker_benchmark_func_scaling(capsys, monkeypatch):
+    monkeypatch.setenv("BENCHMARK_SCALING", "1")
+    orig = str(FIXTURES / "job_pass_simple" / "original.py")
+    ref = str(FIXTURES / "job_pass_simple" / "refactored.py")
+    with patch("benchmark.run_scaling") as mock_report:
+        worker_benchmark_func(orig, ref, "add_one", {})
+    mock_report.assert_called_once()
+
+
+def test_worker_benchmark_class_method_scaling(capsys, monkeypatch):
+    monkeypatch.setenv("BENCHMARK_SCALING", "1")
+    orig = str(FIXTURES / "job_pass_class" / "original.py")
+    ref = str(FIXTURES / "job_pass_class" / "refactored.py")
+    with patch("benchmark.run_scaling") as mock_report:
+        worker_benchmark_class_method(orig, ref, "Counter", "increment", {})
+    mock_report.assert_called_once()
+
+
+# ---------------------------------------------------------------------------
+# benchmark_files / main
+# ---------------------------------------------------------------------------
+
+def test_benchmark_files_targets():
+    with patch("benchmark.run_with_timeout") as mock_run:
+        benchmark_files(str(FIXTURES / "job_pass_private" / "original.py"),
+                        str(FIXTURES / "job_pass_private" / "refactored.py"), {}, timeout=5)
+        benchmark_files(str(FIXTURES / "job_pass_class" / "original.py"),
+                        str(FIXTURES / "job_pass_class" / "refactored.py"), {}, timeout=5)
+    names = [call.args[2] for call in mock_run.call_args_list]
+    assert names == ["public_func", "Counter.increment"]
+    assert mock_run.call_args_list[1].args[0] is worker_benchmark_class_method
+    assert mock_run.call_args_list[1].kwargs["timeout"] == 5
+
+
+def test_benchmark_files_scaling_budget(monkeypatch):
+    monkeypatch.setenv("BENCHMARK_SCALING", "1")
+    with patch("benchmark.run_with_timeout") as mock_run:
+        benchmark_files(str(FIXTURES / "job_pass_simple" / "original.py"),
+                        str(FIXTURES / "job_pass_simple" / "refactored.py"), {}, timeout=5)
+    assert mock_run.call_args.kwargs["timeout"] == 5 + benchmark.SCALING_TIMEOUT
+
+
+def test_benchmark_files_skip():
+    with patch("benchmark.run_with_timeout") as mock_run:
+        benchmark_files(str(FIXTURES / "job_pass_private" / "original.py"),
+                        str(FIXTURES / "job_pass_private" / "refactored.py"), {}, skip={"public_func"})
+        benchmark_files(str(FIXTURES / "job_pass_class" / "original.py"),
+                        str(FIXTURES / "job_pass_class" / "refactored.py"), {}, skip={"Counter"})
+    mock_run.assert_not_called()
+
+
+def test_benchmark_files_runs_in_processes(capfd, tmp_path, monkeypatch):
+    monkeypatch.setenv("BENCHMARK_RUNS", "3")
+    monkeypatch.setenv(RESULTS_ENV_VAR, str(tmp_path / "results.jsonl"))
+    benchmark_files(str(FIXTURES / "job_pass_simple" / "original.py"),
+                    str(FIXTURES / "job_pass_simple" / "refactored.py"))
+    assert "[SPEEDUP] add_one" in capfd.readouterr().out
+    record, = read_results(tmp_path / "results.jsonl")
+    assert (record["name"], record["status"]) == ("add_one", "OK")
+    assert len(record["timings"]["orig"]) == 3
+
+
+def test_benchmark_files_load_error(capsys):
+    benchmark_files("/nonexistent/orig.py", "/nonexistent/refactored.py")
+    out = capsys.readouterr().out
+    assert "[SKIP] refactored.py (Worker Error" in out
+
+
+def test_main_usage(monkeypatch, capsys):
+    monkeypatch.setattr("sys.argv", ["benchmark.py"])
+    with pytest.raises(SystemExit) as exc_info:
+        benchmark.main()
+    assert exc_info.value.code == 2
+
+
+def test_main_runs_benchmarks(monkeypatch):
+    orig = str(FIXTURES / "job_pass_type_hints" / "original.py")
+    ref = str(FIXTURES / "job_pass_type_hints" / "refactored.py")
+    monkeypatch.setattr("sys.argv", ["benchmark.py", orig, ref])
+    with patch("benchmark.benchmark_files") as mock_bench:
+        benchmark.main()
+    mock_bench.assert_called_once_with(orig, ref, {"functions": {"multiply": ["int", "int"]}})
@@ -0,0 +1,190 @@
+"""Unit tests for call_graph.py (whole-program references, entry points and reachability)."""
+import ast
+import textwrap
+from pathlib import Path
+
+from call_graph import CallGraph, collect_references, declared_entry_points
+
+
+def _graph(tmp_path, files, external=()):
+    """Builds a CallGraph over {relative path: source}; returns (graph, {relative path: key})."""
+    graph = CallGraph()
+    keys = {}
+    for rel, source in files.items():
+        key = tmp_path / rel
+        keys[rel] = key
+        graph.add_file(key, Path(rel), collect_references(ast.parse(textwrap.dedent(source))), external=rel in external)
+    graph.build()
+    return graph, keys
+
+
+# ---------------------------------------------------------------------------
+# used_outside (--public-private --call-graph)
+# ---------------------------------------------------------------------------
+
+def test_used_outside_through_reexports_and_star_imports(tmp_path):
+    graph, keys = _graph(tmp_path, {
+        "pkg/__init__.py": "from .core import Engine\nfrom .util import *\n",
+        "pkg/core.py": """
+            class Engine:
+                def run(self):
+                    pass
+
+                def stop(self):
+                    pass
+            """,
+        "pkg/util.py": """
+            __all__ = ["tool"]
+
+            def tool():
+                pass
+
+            def hidden():
+                pass
+            """,
+        "app.py": """
+            from pkg import Engine, tool, hidden
+
+            Engine().run()
+            tool()
+            """,
+    })
+    used = graph.used_outside()
+    assert used[keys["pkg/core.py"]] == {"Engine", "run"}
+    # hidden is not in util's __all__, so the star import does not carry it into pkg
+    assert used[keys["pkg/util.py"]] == {"tool"}
+
+
+def test_used_outside_method_calls_and_computed_getattr(tmp_path):
+    graph, keys = _graph(tmp_path, {
+        "visitor.py": """
+            class Visitor:
+                def visit_Name(self, node):
+                    pass
+
+                def visit_Call(self, node):
+                    pass
+
+                def helper(self):
+                    pass
+
+                def local_only(self):
+                    self.helper()
+            """,
+        "walk.py": """
+            def walk(visitor, node):
+                method = "visit_" + type(node).__name__
+                getattr(visitor, method)(node)
+                visitor.helper()
+            """,
+    })
+    assert graph.used_outside()[keys["visitor.py"]] == {"visit_Name", "visit_Call", "helper"}
+
+
+def test_used_outside_ignores_external_files(tmp_path):
+    graph, keys = _graph(tmp_path, {
+        "lib.py": "def api():\n    pass\n",
+        "tests/test_lib.py": "from lib import api\n\ndef test_api():\n    api()\n",
+    }, external={"tests/test_lib.py"})
+    assert keys["lib.py"] not in graph.used_outside()
+
+
+# ---------------------------------------------------------------------------
+# reachability (--dead-code)
+# ---------------------------------------------------------------------------
+
+def test_unreachable_from_main(tmp_path):
+    graph, keys = _graph(tmp_path, {
+        "app.py": """
+            from flask import app
+
+            def main():
+                used()
+                Live()
+
+            def used():
+                pass
+
+            def unused():
+                pass
+
+            @app.route("/")
+            def registered():
+                pass
+
+            class Live:
+                def __init__(self):
+                    pass
+
+                def never_called(self):
+                    pass
+
+            class Dead:
+                def method(self):
+                    pass
+            """,
+    })
+    dead = graph.unreachable([(keys["app.py"], "main")])
+    # Members of an unreachable class are not reported on their own
+    assert dead == {keys["app.py"]: {11: "unused", 22: "Live.never_called", 25: "Dead"}}
+
+
+def test_unreachable_follows_imports_and_cycles(tmp_path):
+    graph, keys = _graph(tmp_path, {
+        "pkg/__init__.py": "from .a import entry\n",
+        "pkg/a.py": "from .b import step\n\ndef entry():\n    step()\n",
+        "pkg/b.py": "from . import a\n\ndef step():\n    a.entry()\n\ndef orphan():\n    pass\n",
+        "cli.py": "import pkg\n\nif __name__ == '__main__':\n    pkg.entry()\n",
+    })
+    dead = graph.unreachable([(keys["cli.py"], "")])
+    assert dead == {keys["pkg/b.py"]: {6: "orphan"}}
+
+
+def test_entry_points_are_roots(tmp_path):
+    (tmp_path / "pyproject.toml").write_text(
+        '[project.scripts]\ntool = "pkg.cli:Commands.run"\n'
+        '[project.entry-points."pkg.plugins"]\nplug = "pkg.cli:plugin"\n'
+    )
+    graph, keys = _graph(tmp_path, {
+        "pkg/__init__.py": "",
+        "pkg/cli.py": """
+            class Commands:
+                def run(self):
+                    pass
+
+                def unused(self):
+                    pass
+
+            def plugin():
+                pass
+
+            def orphan():
+                pass
+            """,
+    })
+    roots = [node for module, attr in declared_entry_points(tmp_path) for node in graph.resolve_entry_point(module, attr)]
+    assert sorted(roots) == [(keys["pkg/cli.py"], "Commands.run"), (keys["pkg/cli.py"], "plugin")]
+    assert graph.resolve_entry_point("missing", "main") == []
+    assert graph.unreachable(roots) == {keys["pkg/cli.py"]: {6: "Commands.unused", 12: "orphan"}}
+
+
+# ---------------------------------------------------------------------------
+# declared_entry_points
+# ---------------------------------------------------------------------------
+
+def test_declared_entry_points_setup_py(tmp_path):
+    (tmp_path / "setup.py").write_text(
+        "from setuptools import setup\n"
+        "SCRIPTS = ['tool = pkg.cli:main']\n"
+        "def helper(x: int) -> dict:\n"
+        "    return {'a': x, 'b': lambda y: y}\n"
+        "setup(\n"
+        "    name='pkg',\n"
+        "    entry_points={\n"
+        "        'console_scripts': SCRIPTS,\n"
+        "        'pkg.plugins': '[pkg.plugins]\\nplug = pkg.plug:Plugin',\n"
+        "    },\n"
+        ")\n"
+    )
+    # Annotations, dict literals and lambdas outside entry_points= are not declarations
+    assert sorted(declared_entry_points(tmp_path)) == [("pkg.cli", "main"), ("pkg.plug", "Plugin")]
@@ -0,0 +1,97 @@
+"""Unit tests for clone_index.py (persistent block hash index shared across trees)."""
+import sqlite3
+
+import clone_index
+from clone_index import CloneIndex
+
+
+CLONE = "def {name}(items):\n    total = 0\n    for item in items:\n        total += item * 2\n    return total\n"
+
+
+def _tree(root, names):
+    root.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        (root / f"{name}.py").write_text(CLONE.format(name=name))
+    return sorted(root.glob("*.py"))
+
+
+def _index_tree(index, root):
+    paths = sorted(root.glob("*.py"))
+    changed = sum(index.update_file(path) for path in paths)
+    index.prune(root, paths)
+    return changed
+
+
+def test_incremental_updates_and_groups(tmp_path):
+    a, b = tmp_path / "a", tmp_path / "b"
+    _tree(a, ["one", "two"])
+    _tree(b, ["three"])
+    with CloneIndex(tmp_path / "clones.db") as index:
+        assert _index_tree(index, a) == 2
+        assert _index_tree(index, b) == 1
+        assert _index_tree(index, a) == 0
+
+        groups = index.clone_groups()
+        assert len(groups) == 1
+        assert [loc["name"] for loc in groups[0]["locations"]] == ["one", "two", "three"]
+        assert index.clone_groups(b) == groups
+        assert index.lookup("missing") == []
+
+        (a / "two.py").write_text("def two():\n    return 2\n")
+        assert index.update_file(a / "two.py")
+        (a / "one.py").unlink()
+        assert index.update_file(a / "one.py")
+        assert not index.remove_file(a / "one.py")
+        assert index.clone_groups() == []
+        # Only groups with a copy under the root are reported
+        (b / "four.py").write_text(CLONE.format(name="four"))
+        _index_tree(index, b)
+        assert index.clone_groups(a) == []
+        assert len(index.clone_groups(b)) == 1
+
+
+def test_version_change_keeps_other_trees(tmp_path, monkeypatch):
+    a, b = tmp_path / "a", tmp_path / "b"
+    _tree(a, ["one"])
+    _tree(b, ["two"])
+    db = tmp_path / "clones.db"
+    with CloneIndex(db) as index:
+        _index_tree(index, a)
+        _index_tree(index, b)
+
+    monkeypatch.setattr(clone_index, "get_tool_version", lambda modules, fmt: "next")
+    with CloneIndex(db) as index:
+        # Rows hashed by the old normalizer stay in place but are not matched against
+        assert index.content_hashes(a) == {}
+        assert index.clone_groups() == []
+        assert _index_tree(index, a) == 1
+        assert index.clone_groups() == []
+        assert _index_tree(index, b) == 1
+        assert len(index.clone_groups()) == 1
+
+    monkeypatch.undo()
+    with CloneIndex(db) as index:
+        assert index.clone_groups() == []
+        assert index.conn.execute("SELECT COUNT(*) FROM files").fetchone() == (2,)
+
+
+def test_migrates_index_without_versions(tmp_path):
+    a = tmp_path / "a"
+    paths = _tree(a, ["one", "two"])
+    db = tmp_path / "clones.db"
+    conn = sqlite3.connect(str(db))
+    conn.executescript(
+        "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+        "CREATE TABLE files (path TEXT PRIMARY KEY, content_hash TEXT);"
+        "CREATE TABLE blocks (hash TEXT NOT NULL, path TEXT NOT NULL, name TEXT NOT NULL,"
+        " line INTEGER NOT NULL, end_line INTEGER NOT NULL);"
+    )
+    conn.executemany("INSERT INTO files VALUES (?, ?)", [(str(p.resolve()), "old") for p in paths])
+    conn.executemany("INSERT INTO blocks VALUES ('h', ?, 'f', 1, 2)", [(str(p.resolve()),) for p in paths])
+    conn.commit()
+    conn.close()
+
+    with CloneIndex(db) as index:
+        assert index.clone_groups() == []
+        assert _index_tree(index, a) == 2
+        assert len(index.clone_groups()) == 1
@@ -16,6 +16,12 @@ from common import (
     load_module_from_path,
     get_common_functions,
     get_common_classes,
+    get_common_methods,
+    get_public_functions,
+    load_job_config,
+    emit_result,
+    parse_result_line,
+    read_results,
     get_display_name,
     _json_type_to_strategy,
     infer_strategy,
@@ -121,6 +127,77 @@ def test_get_common_classes_filters_imported():
     assert get_common_classes(m1, m2) == []
 
 
+# ---------------------------------------------------------------------------
+# get_public_functions / get_common_methods / load_job_config
+# ---------------------------------------------------------------------------
+
+def test_get_public_functions_skips_private():
+    m1 = _make_module("mod1", ["foo", "_helper", "zed"])
+    m2 = _make_module("mod2", ["zed", "_helper", "foo"])
+    assert get_public_functions(m1, m2) == ["foo", "zed"]
+
+
+def test_get_common_methods():
+    class A:
+        def __init__(self): pass
+        def shared(self): pass
+        def _private(self): pass
+        def only_a(self): pass
+        value = 1
+
+    class B:
+        def shared(self): pass
+        def _private(self): pass
+        def only_b(self): pass
+        value = 1
+
+    assert get_common_methods(A, B) == ["shared"]
+
+
+def test_load_job_config(tmp_path):
+    assert load_job_config(tmp_path) == {}
+    (tmp_path / "type_hints.json").write_text('{"modules": ["numpy"]}')
+    assert load_job_config(tmp_path) == {"modules": ["numpy"]}
+    (tmp_path / "type_hints.json").write_text("{not json")
+    assert load_job_config(tmp_path) == {}
+    (tmp_path / "type_hints.json").write_text("[1, 2]")
+    assert load_job_config(tmp_path) == {}
+
+
+# ---------------------------------------------------------------------------
+# emit_result / read_results
+# ---------------------------------------------------------------------------
+
+def test_emit_result_to_env_file(tmp_path, monkeypatch):
+    path = tmp_path / "results.jsonl"
+    monkeypatch.setenv(common.RESULTS_ENV_VAR, str(path))
+    emit_result({"name": "f", "path": Path("x")})
+    emit_result({"name": "g"})
+    assert read_results(path) == [{"name": "f", "path": "x"}, {"name": "g"}]
+
+
+def test_emit_result_explicit_path(tmp_path, monkeypatch):
+    monkeypatch.setenv(common.RESULTS_ENV_VAR, str(tmp_path / "env.jsonl"))
+    emit_result({"name": "f"}, tmp_path / "explicit.jsonl")
+    assert read_results(tmp_path / "explicit.jsonl") == [{"name": "f"}]
+    assert not (tmp_path / "env.jsonl").exists()
+
+
+def test_emit_result_without_file(monkeypatch, tmp_path):
+    monkeypatch.delenv(common.RESULTS_ENV_VAR, raising=False)
+    monkeypatch.chdir(tmp_path)
+    emit_result({"name": "f"})  # no result file configured: nothing is written
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_read_results_skips_partial_lines(tmp_path):
+    path = tmp_path / "results.jsonl"
+    path.write_text('{"name": "f"}\n[1, 2]\n{"name": ')
+    assert read_results(path) == [{"name": "f"}]
+    assert read_results(tmp_path / "missing.jsonl") == []
+    assert parse_result_line("null") is None
+
+
 # ---------------------------------------------------------------------------
 # get_display_name
 # ---------------------------------------------------------------------------
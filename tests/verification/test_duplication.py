@@ -0,0 +1,175 @@
+"""Unit tests for duplication.py (near-duplicate and statement-fragment clone detection)."""
+import ast
+import textwrap
+
+from duplication import (
+    find_duplicate_fragments,
+    find_near_duplicates,
+    get_minhash,
+    hash_fragments,
+    normalize_code,
+)
+
+
+ORIGINAL = '''
+def summarize(records, limit):
+    totals = {}
+    for record in records:
+        key = record["name"].strip().lower()
+        if key not in totals:
+            totals[key] = {"count": 0, "sum": 0.0, "max": None}
+        entry = totals[key]
+        entry["count"] += 1
+        entry["sum"] += record["value"]
+        if entry["max"] is None or record["value"] > entry["max"]:
+            entry["max"] = record["value"]
+    ranked = sorted(totals.items(), key=lambda item: -item[1]["sum"])
+    return [(name, stats["count"], stats["sum"] / stats["count"]) for name, stats in ranked[:limit]]
+'''
+
+# The same logic with other names and one extra statement
+NEAR_COPY = '''
+def aggregate(rows, top):
+    acc = {}
+    for row in rows:
+        label = row["name"].strip().lower()
+        if label not in acc:
+            acc[label] = {"count": 0, "sum": 0.0, "max": None}
+        slot = acc[label]
+        slot["count"] += 1
+        slot["sum"] += row["value"]
+        if slot["max"] is None or row["value"] > slot["max"]:
+            slot["max"] = row["value"]
+        slot["last"] = row["value"]
+    ranked = sorted(acc.items(), key=lambda item: -item[1]["sum"])
+    return [(name, stats["count"], stats["sum"] / stats["count"]) for name, stats in ranked[:top]]
+'''
+
+UNRELATED = '''
+def render(template, context):
+    output = []
+    for line in template.splitlines():
+        for key, value in context.items():
+            line = line.replace("{{" + key + "}}", str(value))
+        output.append(line.rstrip())
+    while output and not output[-1]:
+        output.pop()
+    return "\\n".join(output) + "\\n"
+'''
+
+
+def _candidate(file, function, code, line=1):
+    return {"file": file, "function": function, "line": line, "raw_code": textwrap.dedent(code)}
+
+
+# ---------------------------------------------------------------------------
+# MinHash / LSH near-duplicates
+# ---------------------------------------------------------------------------
+
+def test_get_minhash_is_deterministic():
+    normalized = normalize_code(ORIGINAL)
+    assert get_minhash(normalized) == get_minhash(normalized)
+    assert len(get_minhash(normalized)) == 128
+    # Too few tokens to compare meaningfully
+    assert get_minhash(normalize_code("def f(x):\n    return x\n")) is None
+
+
+def test_find_near_duplicates():
+    candidates = [
+        _candidate("a.py", "summarize", ORIGINAL),
+        _candidate("b.py", "aggregate", NEAR_COPY),
+        _candidate("c.py", "render", UNRELATED),
+        _candidate("d.py", "tiny", "def tiny(x):\n    return x\n"),
+    ]
+    find_near_duplicates(candidates)
+    assert [c["is_near_duplicate"] for c in candidates] == [True, True, False, False]
+    assert candidates[0]["near_duplicate_locations"][0].startswith("b.py::aggregate (Line 1) (")
+    assert candidates[1]["near_duplicate_locations"][0].startswith("a.py::summarize (Line 1) (")
+
+
+def test_find_near_duplicates_collapses_exact_clones():
+    """Exact clones share one LSH entry and are reported against every near copy."""
+    candidates = [
+        dict(_candidate("a.py", "summarize", ORIGINAL), code_hash="same"),
+        dict(_candidate("b.py", "summarize", ORIGINAL), code_hash="same"),
+        _candidate("c.py", "aggregate", NEAR_COPY),
+    ]
+    find_near_duplicates(candidates)
+    assert len(candidates[2]["near_duplicate_locations"]) == 2
+    # The exact copies are find_duplicates' business, not near-duplicates of each other
+    assert [loc.split(" ")[0] for loc in candidates[0]["near_duplicate_locations"]] == ["c.py::aggregate"]
+
+
+def test_find_near_duplicates_skips_nested_blocks():
+    """A class and its own method in the same file are similar by construction."""
+    method = textwrap.indent(textwrap.dedent(ORIGINAL), "    ")
+    candidates = [
+        _candidate("a.py", "Report", "class Report:\n" + method),
+        _candidate("a.py", "Report.summarize", method, line=2),
+    ]
+    find_near_duplicates(candidates, spans={0: (1, 15), 1: (2, 15)})
+    assert [c["is_near_duplicate"] for c in candidates] == [False, False]
+
+
+# ---------------------------------------------------------------------------
+# Statement fragments
+# ---------------------------------------------------------------------------
+
+LOADER = """
+def load(path):
+    rows = []
+    with open(path) as handle:
+        for line in handle:
+            parts = line.split(",")
+            if len(parts) > 1:
+                rows.append(parts)
+    return rows
+"""
+
+# The same with block inside an otherwise different function, with other names
+IMPORTER = """
+def import_table(source, strict=False):
+    if strict:
+        check(source)
+    table = []
+    with open(source) as stream:
+        for text in stream:
+            cells = text.split(",")
+            if len(cells) > 1:
+                table.append(cells)
+    return len(table), table
+"""
+
+
+def _fragments(sources, min_lines=5):
+    return {name: hash_fragments(ast.parse(code), min_lines) for name, code in sources.items()}
+
+
+def test_duplicate_fragments_reports_outermost_clone():
+    sources = {"a.py": LOADER, "b.py": IMPORTER}
+    lines = {name: code.splitlines() for name, code in sources.items()}
+    groups = find_duplicate_fragments(_fragments(sources, min_lines=3), lines.get)
+    # The loop inside the with block and its body are clones too, but they go away with their parent
+    assert groups == [{"lines": 5, "locations": [
+        {"file": "a.py", "line": 4, "end_line": 8},
+        {"file": "b.py", "line": 6, "end_line": 10},
+    ]}]
+
+
+def test_duplicate_fragments_min_lines():
+    assert hash_fragments(ast.parse(LOADER), min_lines=10) == []
+    assert [(f["line"], f["end_line"]) for f in hash_fragments(ast.parse(LOADER))] == [(4, 8)]
+    # Each fragment points at the nearest fragment containing it
+    fragments = hash_fragments(ast.parse(LOADER), min_lines=3)
+    assert [(f["line"], f["end_line"], f["parent"]) for f in fragments] == [(4, 8, None), (5, 8, 0), (6, 8, 1)]
+
+
+def test_duplicate_fragments_confirmed_by_normalization():
+    """Subtree hashes erase all names; confirmation restores consistent renaming."""
+    first = "def f(a, b):\n    for i in a:\n        x = i + b\n        y = x * 2\n        print(x, y)\n        a.append(y)\n"
+    second = "def g(a, b):\n    for i in a:\n        x = i + i\n        y = x * 2\n        print(x, y)\n        a.append(y)\n"
+    sources = {"a.py": first, "b.py": second}
+    fragments = _fragments(sources)
+    assert len(find_duplicate_fragments(fragments)) == 1
+    lines = {name: code.splitlines() for name, code in sources.items()}
+    assert find_duplicate_fragments(fragments, lines.get) == []
@@ -0,0 +1,11 @@
+"""Unit tests for fingerprint.py — 100% branch coverage."""
+from fingerprint import fingerprint_sources
+
+
+def test_fingerprint_sources():
+    version = fingerprint_sources(["common.py", "verify.py"], 1)
+    assert version == fingerprint_sources(["common.py", "verify.py"], 1)
+    assert version != fingerprint_sources(["common.py", "verify.py"], 2)
+    assert version != fingerprint_sources(["common.py"], 1)
+    # Missing scripts still count by name
+    assert fingerprint_sources(["missing.py"], 1) != fingerprint_sources(["other.py"], 1)
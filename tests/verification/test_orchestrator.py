@@ -5,213 +5,411 @@ from pathlib import Path
 
 import orchestrator
 from orchestrator import (
-    run_command,
-    parse_verify_output,
-    parse_benchmark_output,
-    process_job,
+    job_modules,
+    normalize_modules,
+    build_job_result,
+    run_job,
+    worker_error_result,
+    follow_results,
+    run_module_group,
     main,
 )
 
+from common import emit_result, read_results
+
 FIXTURES = Path(__file__).parent / "fixtures"
 SCRIPTS_DIR = Path(__file__).resolve().parents[2] / "skills" / "code-slob-cleanup" / "scripts"
 
 
 # ---------------------------------------------------------------------------
-# run_command
+# build_job_result
 # ---------------------------------------------------------------------------
 
-def test_run_command_success():
-    rc, out, err = run_command(["echo", "hello"], cwd="/tmp")
-    assert rc == 0
-    assert "hello" in out
+def _verify(name="f", status="PASS", error=None, counterexample=None):
+    return {"tool": "verify", "name": name, "status": status, "duration": 1.0, "error": error,
+            "counterexample": counterexample}
 
 
-def test_run_command_failure():
-    rc, out, err = run_command(["false"], cwd="/tmp")
-    assert rc != 0
+def _bench(name="f", speedup=None, orig_peak=1024, ref_peak=1024, scaling=None):
+    record = {"tool": "benchmark", "name": name, "status": "OK", "speedup": speedup,
+              "timings": {"orig": [2.0], "ref": [1.0]},
+              "memory": {"orig": {"peak": orig_peak}, "ref": {"peak": ref_peak}}}
+    if scaling:
+        record["scaling"] = {"orig": scaling[0], "ref": scaling[1]}
+    return record
 
 
-# ---------------------------------------------------------------------------
-# parse_verify_output
-# ---------------------------------------------------------------------------
+def test_build_job_result_pass(tmp_path):
+    result = build_job_result(tmp_path, True, [_verify()])
+    assert result["status"] == "PASS"
+    assert result["job_name"] == tmp_path.name
+    assert result["functions"] == [{"name": "f", "status": "PASS", "logs": "", "duration": "1.0000s"}]
 
-def test_parse_verify_pass_with_duration():
-    output = "[PASS] foo (1.2345s)\n"
-    results = parse_verify_output(output)
-    assert "foo" in results
-    assert results["foo"]["status"] == "PASS"
-    assert results["foo"]["duration"] == "1.2345s"
 
+def test_build_job_result_fail_with_counterexample(tmp_path):
+    result = build_job_result(tmp_path, False, [
+        _verify(status="FAIL", error="Mismatch for input (0,): Original=1, Refactored=2", counterexample="input (0,)")])
+    assert result["status"] == "FAIL"
+    func = result["functions"][0]
+    assert func["logs"].startswith("Mismatch for input (0,)")
+    assert func["counterexample"] == "input (0,)"
 
-def test_parse_verify_skip():
-    # The parser strips duration but leaves the rest of the name intact
-    output = "[SKIP] bar (0.0001s) (Unsatisfiable)\n"
-    results = parse_verify_output(output)
-    # name = "bar (0.0001s) (Unsatisfiable)" with duration removed → "bar (Unsatisfiable)"
-    assert len(results) == 1
-    entry = next(iter(results.values()))
-    assert entry["status"] == "SKIP"
 
+def test_build_job_result_fail_record_fails_job(tmp_path):
+    assert build_job_result(tmp_path, True, [_verify(status="FAIL")])["status"] == "FAIL"
 
-def test_parse_verify_fail_with_multiline_logs():
-    output = "[FAIL] baz (0.5s)\nAssertionError: x != y\nmore detail\n"
-    results = parse_verify_output(output)
-    assert results["baz"]["status"] == "FAIL"
-    assert "AssertionError" in results["baz"]["logs"]
-    assert "more detail" in results["baz"]["logs"]
 
+def test_build_job_result_skip_reason(tmp_path):
+    func = build_job_result(tmp_path, True, [_verify(status="SKIP", error="Timeout")])["functions"][0]
+    assert func["status"] == "SKIP"
+    assert func["logs"] == "Timeout"
 
-def test_parse_verify_no_duration():
-    output = "[PASS] noduration\n"
-    results = parse_verify_output(output)
-    assert "noduration" in results
-    assert results["noduration"]["duration"] is None
 
+def test_build_job_result_with_speedup(tmp_path):
+    stats = {"speedup": 2.5, "ci_low": 2.4, "ci_high": 2.61, "p_value": 0.001, "verdict": "faster"}
+    func = build_job_result(tmp_path, True, [_verify(), _bench(speedup=stats)])["functions"][0]
+    assert func["speedup"] == "2.50x"
+    assert func["ci"] == "95% CI 2.40x-2.61x"
+    assert func["p_value"] == 0.001
+    assert func["verdict"] == "faster"
+    assert func["timings"] == {"orig": [2.0], "ref": [1.0]}
 
-def test_parse_verify_empty_name_after_strip():
-    # Raw after stripping becomes "(1.0s)" — after removing duration name is empty,
-    # should fall back to raw
-    output = "[PASS] (1.0s)\n"
-    results = parse_verify_output(output)
-    # The key is the raw value since name is empty → reverts to raw
-    assert len(results) == 1
 
+def test_build_job_result_speedup_not_available(tmp_path):
+    func = build_job_result(tmp_path, True, [_verify(), _bench()])["functions"][0]
+    assert func["speedup"] == "N/A"
+    assert "verdict" not in func
 
-def test_parse_verify_empty_input():
-    assert parse_verify_output("") == {}
 
+def test_build_job_result_ignores_other_records(tmp_path):
+    records = [_verify(), _bench(name="other"), {"tool": "benchmark", "name": "f", "status": "SKIP", "reason": "Timeout"},
+               {"unrelated": True}]
+    func = build_job_result(tmp_path, True, records)["functions"][0]
+    assert "speedup" not in func
 
-def test_parse_verify_multiple_functions():
-    output = (
-        "[PASS] f1 (1.0s)\n"
-        "[FAIL] f2 (0.1s)\nsome error\n"
-        "[SKIP] f3 (0.0s)\n"
-    )
-    results = parse_verify_output(output)
-    assert len(results) == 3
-    assert results["f1"]["status"] == "PASS"
-    assert results["f2"]["status"] == "FAIL"
-    assert results["f3"]["status"] == "SKIP"
 
+def test_build_job_result_scaling_improvement(tmp_path):
+    result = build_job_result(tmp_path, True, [_verify(), _bench(scaling=(2.0, 1.0))])
+    assert result["status"] == "PASS"
+    assert result["functions"][0]["scaling"] == "orig ~n^2.0, ref ~n^1.0"
 
-# ---------------------------------------------------------------------------
-# parse_benchmark_output
-# ---------------------------------------------------------------------------
 
-def test_parse_benchmark_speedup():
-    output = "[SPEEDUP] foo: 2.50x\n"
-    speedups = parse_benchmark_output(output)
-    assert speedups["foo"] == "2.50x"
+def test_build_job_result_scaling_regression_fails(tmp_path):
+    result = build_job_result(tmp_path, True, [_verify(), _bench(scaling=(1.0, 2.0))])
+    assert result["status"] == "FAIL"
+    func = result["functions"][0]
+    assert func["status"] == "FAIL"
+    assert "Scaling regression" in func["logs"]
 
 
-def test_parse_benchmark_skip_is_ignored():
-    output = "[SKIP] bar (reason)\n"
-    speedups = parse_benchmark_output(output)
-    assert speedups == {}
+def test_build_job_result_scaling_keeps_verify_failure_logs(tmp_path):
+    result = build_job_result(tmp_path, False, [_verify(status="FAIL", error="AssertionError: boom"),
+                                                 _bench(scaling=(1.0, 2.0))])
+    assert "boom" in result["functions"][0]["logs"]
 
 
-def test_parse_benchmark_malformed_bare_except():
-    # Missing ": " separator — bare except in parser, continue
-    output = "[SPEEDUP] malformed_no_separator\n"
-    speedups = parse_benchmark_output(output)
-    assert speedups == {}
+def _memory_job(tmp_path, orig_kib, ref_kib, status="PASS", **kwargs):
+    records = [_verify(status=status, error="AssertionError: boom" if status == "FAIL" else None),
+               _bench(orig_peak=orig_kib * 1024, ref_peak=ref_kib * 1024)]
+    return build_job_result(tmp_path, status == "PASS", records, **kwargs)
 
 
-def test_parse_benchmark_empty():
-    assert parse_benchmark_output("") == {}
+def test_build_job_result_memory_within_ratio(tmp_path):
+    result = _memory_job(tmp_path, 100, 150)
+    assert result["status"] == "PASS"
+    assert result["functions"][0]["memory"] == "orig 100.0 KiB peak, ref 150.0 KiB peak"
+
+
+def test_build_job_result_memory_regression_fails(tmp_path):
+    result = _memory_job(tmp_path, 100, 250)
+    assert result["status"] == "FAIL"
+    assert "Memory regression" in result["functions"][0]["logs"]
+    assert "limit 2x" in result["functions"][0]["logs"]
+
+
+def test_build_job_result_memory_ratio_configurable(tmp_path):
+    assert _memory_job(tmp_path, 100, 250, memory_ratio=3.0)["status"] == "PASS"
+
+
+def test_build_job_result_memory_small_difference_ignored(tmp_path):
+    assert _memory_job(tmp_path, 1, 10)["status"] == "PASS"
+
+
+def test_build_job_result_memory_keeps_verify_failure_logs(tmp_path):
+    result = _memory_job(tmp_path, 100, 900, status="FAIL")
+    assert "boom" in result["functions"][0]["logs"]
 
 
 # ---------------------------------------------------------------------------
-# process_job
+# job_modules / run_job / worker_error_result
 # ---------------------------------------------------------------------------
 
-@patch("orchestrator.run_command")
-def test_process_job_missing_both_files(mock_run, tmp_path):
-    result = process_job(tmp_path, tmp_path, SCRIPTS_DIR)
-    assert result is None
-    mock_run.assert_not_called()
+def test_job_modules():
+    assert job_modules({"modules": ["numpy", 1]}) == ["numpy", "1"]
+    assert job_modules({"modules": "numpy"}) == []
+    assert job_modules({}) == []
 
 
-@patch("orchestrator.run_command")
-def test_process_job_missing_refactored(mock_run, tmp_path):
-    (tmp_path / "original.py").write_text("def f(): pass")
-    result = process_job(tmp_path, tmp_path, SCRIPTS_DIR)
-    assert result is None
+def test_normalize_modules():
+    assert normalize_modules(["Pandas", "numpy", " pandas ", "", "typing_extensions", "numpy"]) == \
+        ("numpy", "pandas", "typing-extensions")
+    assert normalize_modules(["Scikit.Learn>=1.0", "./Local_Pkg"]) == ("./Local_Pkg", "scikit-learn>=1.0")
+    assert normalize_modules([]) == ()
 
 
-@patch("orchestrator.run_command")
-def test_process_job_pass(mock_run, tmp_path):
-    (tmp_path / "original.py").write_text("def f(): pass")
-    (tmp_path / "refactored.py").write_text("def f(): pass")
-    mock_run.return_value = (0, "[PASS] f (1.0s)\n", "")
-    result = process_job(tmp_path, tmp_path, SCRIPTS_DIR)
-    assert result is not None
-    assert result["status"] == "PASS"
-    assert result["job_name"] == tmp_path.name
+def test_run_job_missing_files(tmp_path):
+    assert run_job(tmp_path) is None
 
 
-@patch("orchestrator.run_command")
-def test_process_job_fail(mock_run, tmp_path):
+def test_run_job_combines_records(tmp_path, monkeypatch):
+    monkeypatch.setenv(orchestrator.RESULTS_ENV_VAR, "outer.jsonl")
     (tmp_path / "original.py").write_text("def f(): pass")
     (tmp_path / "refactored.py").write_text("def f(): pass")
-    mock_run.return_value = (1, "[FAIL] f (0.5s)\nsome error\n", "")
-    result = process_job(tmp_path, tmp_path, SCRIPTS_DIR)
+    (tmp_path / "type_hints.json").write_text('{"functions": {"f": []}}')
+
+    def fake_verify(orig, ref, config, skip=()):
+        assert config == {"functions": {"f": []}}
+        # Printed text is not parsed: only the records count
+        print("[PASS] f (0.5s)")
+        emit_result(_verify(status="FAIL", error="AssertionError: boom"))
+        return False
+
+    def fake_benchmark(orig, ref, config, skip=()):
+        print("[SPEEDUP] f: 9.99x")
+        emit_result(_bench())
+
+    with patch("verify.verify_files", fake_verify), patch("benchmark.benchmark_files", fake_benchmark):
+        result = run_job(tmp_path)
     assert result["status"] == "FAIL"
+    func = result["functions"][0]
+    assert func["speedup"] == "N/A"
+    assert "boom" in func["logs"]
+    # The caller's result file setting is restored
+    assert orchestrator.os.environ[orchestrator.RESULTS_ENV_VAR] == "outer.jsonl"
 
 
-@patch("orchestrator.run_command")
-def test_process_job_with_type_hints_modules(mock_run, tmp_path):
+def test_run_job_restores_unset_result_file(tmp_path, monkeypatch):
+    monkeypatch.delenv(orchestrator.RESULTS_ENV_VAR, raising=False)
     (tmp_path / "original.py").write_text("def f(): pass")
     (tmp_path / "refactored.py").write_text("def f(): pass")
-    (tmp_path / "type_hints.json").write_text('{"modules": ["numpy"]}')
-    mock_run.return_value = (0, "[PASS] f (1.0s)\n", "")
-    process_job(tmp_path, tmp_path, SCRIPTS_DIR)
-    # Both verify and bench calls should include --with numpy
-    for call_args in mock_run.call_args_list:
-        cmd = call_args[0][0]
-        assert "--with" in cmd
-        assert "numpy" in cmd
-
-
-@patch("orchestrator.run_command")
-def test_process_job_type_hints_invalid_json(mock_run, tmp_path):
-    (tmp_path / "original.py").write_text("def f(): pass")
-    (tmp_path / "refactored.py").write_text("def f(): pass")
-    (tmp_path / "type_hints.json").write_text("{not: valid json")
-    mock_run.return_value = (0, "[PASS] f (1.0s)\n", "")
-    result = process_job(tmp_path, tmp_path, SCRIPTS_DIR)
-    assert result is not None  # invalid JSON caught; extra_modules stays []
+    with patch("verify.verify_files", return_value=True), patch("benchmark.benchmark_files"):
+        assert run_job(tmp_path)["functions"] == []
+    assert orchestrator.RESULTS_ENV_VAR not in orchestrator.os.environ
+
+
+def _cached_job(tmp_path):
+    job = tmp_path / "job"
+    job.mkdir()
+    (job / "original.py").write_text("def f(): pass\ndef g(): pass\n")
+    (job / "refactored.py").write_text("def f(): pass\ndef g(): pass\n")
+    calls = []
+
+    def fake_verify(orig, ref, config, skip=()):
+        calls.append(set(skip))
+        for name in sorted({"f", "g"} - set(skip)):
+            emit_result(_verify(name=name))
+        return True
+
+    def fake_benchmark(orig, ref, config, skip=()):
+        # Only the first benchmark of g times out
+        if "g" not in skip and len(calls) == 1:
+            emit_result({"tool": "benchmark", "name": "g", "status": "SKIP", "reason": "Timeout"})
+    return job, calls, fake_verify, fake_benchmark
+
+
+def test_run_job_uses_result_cache(tmp_path):
+    job, calls, fake_verify, fake_benchmark = _cached_job(tmp_path)
+    cache_dir = tmp_path / "cache"
+    with patch("verify.verify_files", fake_verify), patch("benchmark.benchmark_files", fake_benchmark):
+        first = run_job(job, cache_dir=cache_dir)
+        second = run_job(job, cache_dir=cache_dir)
+        # A timed out benchmark is not cached, so g runs again while f comes from the cache
+        assert calls == [set(), {"f"}]
+        assert [func.get("cached", False) for func in first["functions"]] == [False, False]
+        assert {func["name"]: func.get("cached", False) for func in second["functions"]} == {"f": True, "g": False}
+
+        # Changing one function only re-runs that function
+        (job / "refactored.py").write_text("def f(): return None\ndef g(): pass\n")
+        run_job(job, cache_dir=cache_dir)
+        assert calls[-1] == {"g"}
+
+
+def test_run_job_fully_cached_and_refresh(tmp_path):
+    job, calls, fake_verify, _ = _cached_job(tmp_path)
+    cache_dir = tmp_path / "cache"
+    with patch("verify.verify_files", fake_verify), patch("benchmark.benchmark_files"):
+        run_job(job, cache_dir=cache_dir)
+        result = run_job(job, cache_dir=cache_dir)
+        # Every unit is skipped, but the tools still run for functions without a unit
+        assert calls[-1] == {"f", "g"}
+        assert result["status"] == "PASS"
+        assert all(func["cached"] for func in result["functions"])
+        result = run_job(job, cache_dir=cache_dir, refresh=True)
+        assert calls[-1] == set()
+        assert not any(func.get("cached") for func in result["functions"])
+
+
+def test_run_job_cache_keeps_nested_functions(tmp_path, monkeypatch):
+    """A function defined under an `if` has no unit: a cached run still verifies (and fails) it."""
+    monkeypatch.setenv("BENCHMARK_RUNS", "3")
+    job = tmp_path / "job"
+    job.mkdir()
+    (job / "original.py").write_text("def add(x: int) -> int:\n    return x + 1\n\nif True:\n    def sub(x: int) -> int:\n        return x - 1\n")
+    (job / "refactored.py").write_text("def add(x: int) -> int:\n    return x + 1\n\nif True:\n    def sub(x: int) -> int:\n        return x + 1\n")
+    for _ in range(2):
+        result = run_job(job, cache_dir=tmp_path / "cache")
+        assert result["status"] == "FAIL"
+        assert {func["name"]: func["status"] for func in result["functions"]} == {"add": "PASS", "sub": "FAIL"}
+    assert [func.get("cached", False) for func in result["functions"] if func["name"] == "add"] == [True]
+
+
+def test_run_job_end_to_end():
+    result = run_job(FIXTURES / "job_pass_simple")
+    assert result["status"] == "PASS"
+    func = result["functions"][0]
+    assert func["name"] == "add_one"
+    assert func["status"] == "PASS"
+    assert "speedup" in func and "memory" in func
+    assert len(func["timings"]["orig"]) == len(func["timings"]["ref"]) > 0
 
 
-@patch("orchestrator.run_command")
-def test_process_job_type_hints_modules_not_list(mock_run, tmp_path):
-    (tmp_path / "original.py").write_text("def f(): pass")
-    (tmp_path / "refactored.py").write_text("def f(): pass")
-    (tmp_path / "type_hints.json").write_text('{"modules": {"bad": "type"}}')
-    mock_run.return_value = (0, "[PASS] f (1.0s)\n", "")
-    result = process_job(tmp_path, tmp_path, SCRIPTS_DIR)
-    # modules is not a list → extra_modules stays []
-    for call_args in mock_run.call_args_list:
-        cmd = call_args[0][0]
-        assert "--with" not in cmd
+def test_worker_error_result(tmp_path):
+    result = worker_error_result(tmp_path, "Worker exited with code 1")
+    assert result["status"] == "FAIL"
+    assert result["functions"][0]["logs"] == "Worker exited with code 1"
 
 
-@patch("orchestrator.run_command")
-def test_process_job_with_speedup(mock_run, tmp_path):
-    (tmp_path / "original.py").write_text("def f(): pass")
-    (tmp_path / "refactored.py").write_text("def f(): pass")
-    mock_run.side_effect = [
-        (0, "[PASS] f (1.0s)\n", ""),
-        (0, "[SPEEDUP] f: 2.50x\n", ""),
-    ]
-    result = process_job(tmp_path, tmp_path, SCRIPTS_DIR)
-    assert result["functions"][0]["speedup"] == "2.50x"
+# ---------------------------------------------------------------------------
+# follow_results / run_module_group
+# ---------------------------------------------------------------------------
+
+def test_follow_results_incremental(tmp_path):
+    path = tmp_path / "results.jsonl"
+    path.write_text('{"a": 1}\n{"b": ')
+    process = MagicMock()
+    process.poll.return_value = None
+    records = follow_results(path, process, poll_interval=0)
+    assert next(records) == {"a": 1}
+    # The half-written line is picked up once it is complete
+    with open(path, "a") as f:
+        f.write('2}\nnot json\n[1]\n')
+    assert next(records) == {"b": 2}
+    process.poll.return_value = 0
+    with open(path, "a") as f:
+        f.write('{"c": 3}\n')
+    assert list(records) == [{"c": 3}]
+
+
+def test_follow_results_waits_for_output(tmp_path):
+    path = tmp_path / "results.jsonl"
+    path.write_text("")
+    process = MagicMock()
+    process.poll.side_effect = [None, 0]
+    assert list(follow_results(path, process, poll_interval=0)) == []
+
+
+class _FakeProcess:
+    """Stands in for the group's orchestrator: writes its results file and exits at once."""
+    def __init__(self, lines, returncode=0, stderr_text="", exited=True):
+        self.lines, self.returncode, self.stderr_text, self.exited = lines, returncode, stderr_text, exited
+        self.killed = False
+
+    def __call__(self, cmd, cwd, env, stdout, stderr):
+        self.cmd, self.env = cmd, env
+        with open(cmd[cmd.index("--results") + 1], "a") as f:
+            f.writelines(line + "\n" for line in self.lines)
+        stderr.write(self.stderr_text)
+        return self
+
+    def poll(self):
+        return self.returncode if self.exited else None
+
+    def kill(self):
+        self.killed = True
+
+    def wait(self):
+        return self.returncode
+
+
+def _group_jobs(tmp_path, *names):
+    jobs = []
+    for name in names:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "original.py").write_text("def f(): pass")
+        (tmp_path / name / "refactored.py").write_text("def f(): pass")
+        jobs.append(tmp_path / name)
+    return jobs
+
+
+def test_run_module_group_one_environment(tmp_path):
+    jobs = _group_jobs(tmp_path, "a", "b")
+    process = _FakeProcess(['{"job_name": "a", "status": "PASS", "functions": []}', '{"job_name": "b", "status": "FAIL", "functions": []}'],
+                           returncode=1)
+    with patch("orchestrator.subprocess.Popen", process):
+        results = list(run_module_group(("numpy", "pandas"), jobs, SCRIPTS_DIR, tmp_path, workers=2, memory_ratio=1.5,
+                                        cache_dir=tmp_path / "cache", refresh=True))
+    # Failed jobs make the group's orchestrator exit with 1; every job was still reported
+    assert [(r["job_name"], r["status"]) for r in results] == [("a", "PASS"), ("b", "FAIL")]
+    cmd = process.cmd
+    assert cmd[:4] == ["uv", "run", "--with", "numpy,pandas"]
+    assert cmd[4] == str(SCRIPTS_DIR / "orchestrator.py")
+    assert cmd[5] == str(tmp_path)
+    assert cmd[cmd.index("--workers") + 1] == "2"
+    assert cmd[cmd.index("--memory-ratio") + 1] == "1.5"
+    assert cmd[cmd.index("--cache-dir") + 1] == str(tmp_path / "cache")
+    assert "--no-cache" in cmd
+    assert cmd[cmd.index("--only") + 1:] == ["a", "b"]
+    assert process.env[orchestrator.MODULES_ENV_VAR] == "numpy,pandas"
+
+
+def test_run_module_group_default_workers(tmp_path):
+    process = _FakeProcess([])
+    with patch("orchestrator.subprocess.Popen", process):
+        assert list(run_module_group(("numpy",), [tmp_path / "missing_files"], SCRIPTS_DIR, tmp_path)) == []
+    assert "--workers" not in process.cmd
+    assert "--cache-dir" not in process.cmd and "--no-cache" not in process.cmd
+
+
+def test_run_module_group_environment_failure(tmp_path):
+    jobs = _group_jobs(tmp_path, "a", "b")
+    process = _FakeProcess(['{"job_name": "a", "status": "PASS", "functions": []}', '{"not": "a job"}'], returncode=1,
+                           stderr_text="error: No solution found when resolving `--with` dependencies\n")
+    with patch("orchestrator.subprocess.Popen", process):
+        results = {r["job_name"]: r for r in run_module_group(("nosuchpkg",), jobs, SCRIPTS_DIR, tmp_path)}
+    assert results["a"]["status"] == "PASS"
+    assert results["b"]["status"] == "FAIL"
+    logs = results["b"]["functions"][0]["logs"]
+    assert logs.startswith("Environment with nosuchpkg failed (exit code 1)")
+    assert "No solution found" in logs
+
+
+def test_run_module_group_failure_without_stderr(tmp_path):
+    jobs = _group_jobs(tmp_path, "a")
+    with patch("orchestrator.subprocess.Popen", _FakeProcess([], returncode=2)):
+        results = list(run_module_group(("numpy",), jobs, SCRIPTS_DIR, tmp_path))
+    assert results[0]["functions"][0]["logs"] == "Environment with numpy failed (exit code 2)"
+
+
+def test_run_module_group_kills_abandoned_environment(tmp_path):
+    jobs = _group_jobs(tmp_path, "a", "b")
+    process = _FakeProcess(['{"job_name": "a", "status": "PASS", "functions": []}'], exited=False)
+    with patch("orchestrator.subprocess.Popen", process):
+        results = run_module_group(("numpy",), jobs, SCRIPTS_DIR, tmp_path)
+        assert next(results)["job_name"] == "a"
+        results.close()
+    assert process.killed
 
 
 # ---------------------------------------------------------------------------
 # main()
 # ---------------------------------------------------------------------------
 
+@pytest.fixture(autouse=True)
+def _restore_verify_processes(monkeypatch):
+    # main() sets the verify process cap for its workers; keep it from leaking into other tests
+    monkeypatch.delenv(orchestrator.verify.PROCESSES_ENV_VAR, raising=False)
+
+
 def test_main_nonexistent_dir(monkeypatch):
     monkeypatch.setattr("sys.argv", ["orchestrator.py", "/nonexistent_xyz_dir"])
     with pytest.raises(SystemExit) as exc_info:
@@ -219,9 +417,9 @@ def test_main_nonexistent_dir(monkeypatch):
     assert exc_info.value.code == 1
 
 
-@patch("orchestrator.process_job")
+@patch("orchestrator.run_job")
 def test_main_pass_job(mock_process, tmp_path, monkeypatch, capsys):
-    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path)])
+    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path), "--workers", "0"])
     job_dir = tmp_path / "job1"
     job_dir.mkdir()
     mock_process.return_value = {
@@ -235,9 +433,9 @@ def test_main_pass_job(mock_process, tmp_path, monkeypatch, capsys):
     assert "[PASS] f" in out
 
 
-@patch("orchestrator.process_job")
+@patch("orchestrator.run_job")
 def test_main_fail_job_exits_1(mock_process, tmp_path, monkeypatch, capsys):
-    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path)])
+    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path), "--workers", "0"])
     job_dir = tmp_path / "job1"
     job_dir.mkdir()
     mock_process.return_value = {
@@ -253,9 +451,9 @@ def test_main_fail_job_exits_1(mock_process, tmp_path, monkeypatch, capsys):
     assert "err msg" in out
 
 
-@patch("orchestrator.process_job")
+@patch("orchestrator.run_job")
 def test_main_with_speedups(mock_process, tmp_path, monkeypatch, capsys):
-    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path)])
+    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path), "--workers", "0"])
     job_dir = tmp_path / "job1"
     job_dir.mkdir()
     mock_process.return_value = {
@@ -272,31 +470,34 @@ def test_main_with_speedups(mock_process, tmp_path, monkeypatch, capsys):
     assert "3.00x" in out
 
 
-@patch("orchestrator.process_job", return_value=None)
+@patch("orchestrator.run_job", return_value=None)
 def test_main_job_returns_none(mock_process, tmp_path, monkeypatch, capsys):
-    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path)])
+    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path), "--workers", "0"])
     (tmp_path / "empty_job").mkdir()
     main()  # None results filtered — should not crash
 
 
-@patch("orchestrator.process_job")
+@patch("orchestrator.run_job")
 def test_main_skip_func(mock_process, tmp_path, monkeypatch, capsys):
-    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path)])
+    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path), "--workers", "0"])
     job_dir = tmp_path / "job1"
     job_dir.mkdir()
     mock_process.return_value = {
         "job_name": "job1",
         "status": "PASS",
-        "functions": [{"name": "f", "status": "SKIP", "duration": "0.1s", "logs": ""}],
+        "functions": [{"name": "f", "status": "SKIP", "duration": "0.1s", "logs": ""},
+                      {"name": "g", "status": "SKIP", "duration": "120.0000s", "logs": "Timeout"}],
     }
     main()
-    assert "[SKIP]" in capsys.readouterr().out
+    out = capsys.readouterr().out
+    assert "  [SKIP] f (0.1s)\n" in out
+    assert "  [SKIP] g (120.0000s): Timeout" in out
 
 
-@patch("orchestrator.process_job")
+@patch("orchestrator.run_job")
 def test_main_speedup_na_filtered(mock_process, tmp_path, monkeypatch, capsys):
     """Speedup value 'N/A' should be skipped (not appended to all_speedups)."""
-    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path)])
+    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path), "--workers", "0"])
     job_dir = tmp_path / "job1"
     job_dir.mkdir()
     mock_process.return_value = {
@@ -310,10 +511,10 @@ def test_main_speedup_na_filtered(mock_process, tmp_path, monkeypatch, capsys):
     assert "Average Speedup" not in out
 
 
-@patch("orchestrator.process_job")
+@patch("orchestrator.run_job")
 def test_main_speedup_bad_parse(mock_process, tmp_path, monkeypatch, capsys):
     """Unparseable speedup value (bare except) should not crash."""
-    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path)])
+    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path), "--workers", "0"])
     job_dir = tmp_path / "job1"
     job_dir.mkdir()
     mock_process.return_value = {
@@ -325,10 +526,10 @@ def test_main_speedup_bad_parse(mock_process, tmp_path, monkeypatch, capsys):
     main()  # bare except in orchestrator catches the float() parse failure
 
 
-@patch("orchestrator.process_job")
+@patch("orchestrator.run_job")
 def test_main_func_no_duration_no_speedup(mock_process, tmp_path, monkeypatch, capsys):
     """Functions with no duration/speedup extras print cleanly."""
-    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path)])
+    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path), "--workers", "0"])
     job_dir = tmp_path / "job1"
     job_dir.mkdir()
     mock_process.return_value = {
@@ -339,3 +540,145 @@ def test_main_func_no_duration_no_speedup(mock_process, tmp_path, monkeypatch, c
     main()
     out = capsys.readouterr().out
     assert "[PASS] f" in out
+
+
+@patch("orchestrator.run_job")
+def test_main_scaling_flag(mock_process, tmp_path, monkeypatch, capsys):
+    monkeypatch.delenv("BENCHMARK_SCALING", raising=False)
+    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path), "--scaling", "--workers", "0"])
+    (tmp_path / "job1").mkdir()
+    mock_process.return_value = {
+        "job_name": "job1",
+        "status": "PASS",
+        "functions": [{"name": "f", "status": "PASS", "duration": "1.0s", "logs": "",
+                       "scaling": "orig ~n^2.0, ref ~n^1.0"}],
+    }
+    main()
+    assert orchestrator.os.environ["BENCHMARK_SCALING"] == "1"
+    assert "Scaling: orig ~n^2.0, ref ~n^1.0" in capsys.readouterr().out
+
+
+@patch("orchestrator.run_job")
+def test_main_speedup_verdicts(mock_process, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path), "--workers", "0"])
+    (tmp_path / "job1").mkdir()
+    mock_process.return_value = {
+        "job_name": "job1",
+        "status": "PASS",
+        "functions": [
+            {"name": "f", "status": "PASS", "duration": "1.0s", "logs": "", "speedup": "1.52x",
+             "ci": "95% CI 1.41x-1.63x", "p_value": 0.001, "verdict": "faster"},
+            {"name": "g", "status": "PASS", "duration": "1.0s", "logs": "", "speedup": "0.99x",
+             "ci": "95% CI 0.90x-1.08x", "p_value": 0.6, "verdict": "inconclusive"},
+        ],
+    }
+    main()
+    out = capsys.readouterr().out
+    assert "Verdicts:        1 faster, 1 inconclusive" in out
+    assert "Speedup: 1.52x [95% CI 1.41x-1.63x, p=0.001, faster]" in out
+
+
+@patch("orchestrator.run_job")
+def test_main_memory_ratio_and_output(mock_process, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path), "--memory-ratio", "1.5", "--workers", "0"])
+    (tmp_path / "job1").mkdir()
+    mock_process.return_value = {
+        "job_name": "job1",
+        "status": "PASS",
+        "functions": [{"name": "f", "status": "PASS", "duration": "1.0s", "logs": "",
+                       "memory": "orig 1.0 KiB peak, ref 1.0 KiB peak"}],
+    }
+    main()
+    assert mock_process.call_args[0][1] == 1.5
+    assert "Memory: orig 1.0 KiB peak, ref 1.0 KiB peak" in capsys.readouterr().out
+
+
+@patch("orchestrator.run_module_group")
+@patch("orchestrator.run_job")
+def test_main_groups_jobs_by_modules(mock_run_job, mock_group, tmp_path, monkeypatch, capsys):
+    monkeypatch.delenv(orchestrator.MODULES_ENV_VAR, raising=False)
+    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path), "--workers", "0"])
+    (tmp_path / "plain").mkdir()
+    for name, modules in (("pandas_a", '["pandas"]'), ("pandas_b", '["Pandas", "pandas"]'), ("numpy_c", '["numpy"]')):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "type_hints.json").write_text(f'{{"modules": {modules}}}')
+    mock_run_job.return_value = {"job_name": "plain", "status": "PASS", "functions": []}
+    mock_group.side_effect = lambda modules, jobs, *args: (
+        {"job_name": job.name, "status": "PASS", "functions": []} for job in jobs)
+    main()
+    assert mock_run_job.call_args[0][0].name == "plain"
+    # One environment per module set, each handed all of its jobs
+    groups = {call[0][0]: [job.name for job in call[0][1]] for call in mock_group.call_args_list}
+    assert groups == {("pandas",): ["pandas_a", "pandas_b"], ("numpy",): ["numpy_c"]}
+    out = capsys.readouterr().out
+    for name in ("plain", "pandas_a", "pandas_b", "numpy_c"):
+        assert f"[PASS] {name}" in out
+
+
+@patch("orchestrator.run_module_group")
+@patch("orchestrator.run_job")
+def test_main_inside_group_environment(mock_run_job, mock_group, tmp_path, monkeypatch, capsys):
+    """Started by run_module_group: jobs needing the provided modules run here and go to the result file."""
+    monkeypatch.setenv(orchestrator.MODULES_ENV_VAR, "numpy,pandas")
+    results_path = tmp_path / "results.jsonl"
+    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path), "--workers", "0", "--results", str(results_path),
+                                     "--only", "pandas_a", "plain"])
+    (tmp_path / "plain").mkdir()
+    (tmp_path / "not_selected").mkdir()
+    (tmp_path / "pandas_a").mkdir()
+    (tmp_path / "pandas_a" / "type_hints.json").write_text('{"modules": ["pandas"]}')
+    mock_run_job.side_effect = lambda job, ratio, *cache: {"job_name": job.name, "status": "FAIL", "functions": []}
+    main()
+    mock_group.assert_not_called()
+    assert sorted(r["job_name"] for r in read_results(results_path)) == ["pandas_a", "plain"]
+    assert "[FAIL] pandas_a" in capsys.readouterr().out
+
+
+@patch("orchestrator.run_job")
+def test_main_result_cache(mock_run_job, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path), "--workers", "0"])
+    (tmp_path / "job1").mkdir()
+    # The default cache lives in the target directory but is not a job
+    (tmp_path / ".cache").mkdir()
+    mock_run_job.return_value = {
+        "job_name": "job1",
+        "status": "PASS",
+        "functions": [{"name": "f", "status": "PASS", "duration": "1.0s", "logs": "", "cached": True}],
+    }
+    main()
+    assert mock_run_job.call_count == 1
+    assert mock_run_job.call_args[0][2:] == (tmp_path.resolve() / ".cache", False)
+    # One pool worker and no module groups: the single job may use every CPU
+    assert orchestrator.os.environ[orchestrator.verify.PROCESSES_ENV_VAR] == str(orchestrator.os.cpu_count() or 4)
+    assert "[PASS] f (1.0s, cached)" in capsys.readouterr().out
+
+    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path), "--workers", "0", "--cache-dir",
+                                     str(tmp_path / "elsewhere"), "--no-cache"])
+    main()
+    assert mock_run_job.call_args[0][2:] == ((tmp_path / "elsewhere").resolve(), True)
+
+
+@patch("orchestrator.run_job", side_effect=RuntimeError("kaboom"))
+def test_main_worker_error_fails_job(mock_run_job, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path), "--workers", "0"])
+    (tmp_path / "job1").mkdir()
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+    assert exc_info.value.code == 1
+    out = capsys.readouterr().out
+    assert "[FAIL] job1" in out
+    assert "RuntimeError: kaboom" in out
+
+
+def test_main_worker_pool_processes(tmp_path, monkeypatch, capsys):
+    """Real worker processes: results come back from the pool."""
+    import shutil
+    monkeypatch.setattr("sys.argv", ["orchestrator.py", str(tmp_path), "--workers", "2"])
+    monkeypatch.setenv("BENCHMARK_RUNS", "5")
+    for name in ("job_pass_simple", "job_fail_wrong_result"):
+        shutil.copytree(FIXTURES / name, tmp_path / name)
+    with pytest.raises(SystemExit):
+        main()
+    out = capsys.readouterr().out
+    assert "[PASS] job_pass_simple" in out
+    assert "[FAIL] job_fail_wrong_result" in out
@@ -0,0 +1,108 @@
+"""Unit tests for perf_smells.py (AST performance smells and their false-positive guards)."""
+import ast
+import textwrap
+
+from perf_smells import detect_perf_smells
+
+
+def _smells(source):
+    return detect_perf_smells(ast.parse(textwrap.dedent(source)))
+
+
+def test_loop_smells():
+    source = """
+        def f(items, names, obj):
+            seen = []
+            out = ""
+            for item in items:
+                if item in seen:
+                    seen.append(item)
+                out += str(item)
+                for other in items:
+                    pass
+                names.sort(key=len)
+                first = names.pop(0)
+                obj.a.b.c(len(items), len(items))
+                obj.a.b.c()
+                obj.a.b.c()
+            return out
+        """
+    assert _smells(source) == [
+        ["list_membership_in_loop", 6],
+        ["string_concat_in_loop", 8],
+        ["nested_loop_same_collection", 9],
+        ["sort_in_loop", 11],
+        ["list_front_operation", 12],
+        ["repeated_attribute_lookup_in_loop", 13],
+        ["repeated_len_in_loop", 13],
+    ]
+
+
+def test_non_list_receivers():
+    """pop(0)/insert(0, ...) and .sort() on dicts, sets and deques are not list operations."""
+    source = """
+        from collections import deque
+
+        def f(keys):
+            cache = {}
+            queue = deque()
+            ordered = dict()
+            for key in keys:
+                cache.pop(0)
+                queue.insert(0, key)
+                ordered.pop(0, None)
+                {}.pop(0)
+                queue.sort()
+                cache.sort(key=len)
+                keys.sort(0)
+        """
+    assert _smells(source) == []
+
+
+def test_shared_iterator_loops():
+    """Nested loops that consume one iterator together are linear, not quadratic."""
+    source = """
+        def pairs(items):
+            it = iter(items)
+            for first in it:
+                for second in it:
+                    break
+            gen = (x for x in items)
+            return [(a, b) for a in gen for b in gen]
+        """
+    assert _smells(source) == []
+
+
+def test_loops_do_not_carry_into_nested_functions():
+    source = """
+        def outer(items):
+            for item in items:
+                def inner(names):
+                    return sorted(names)
+            return sorted(items)
+        """
+    assert _smells(source) == []
+
+
+def test_regex_compile_literal_pattern():
+    source = (
+        "import re\n"
+        "def f(s):\n"
+        "    return re.compile(r'\\d+').match(s)\n"
+        "def g(s):\n"
+        "    return re.compile(b'[a-z]').match(s)\n"
+    )
+    assert _smells(source) == [["regex_compile_in_function", 3], ["regex_compile_in_function", 5]]
+
+
+def test_regex_compile_runtime_pattern():
+    """A pattern built from arguments cannot be compiled once at module level."""
+    source = (
+        "import re\n"
+        "def f(separator, s):\n"
+        "    boundary = re.compile('(?P<sep>' + re.escape(separator) + ')')\n"
+        "    other = re.compile(separator)\n"
+        "    return re.compile(f'{separator}+'), boundary, other\n"
+        "PATTERN = re.compile('x')\n"
+    )
+    assert _smells(source) == []
@@ -0,0 +1,37 @@
+"""Unit tests for profiles.py (pstats dumps joined onto project blocks)."""
+import cProfile
+import profile
+
+from profiles import ProfileIndex, load_profiles
+
+
+SOURCE = "def work(n):\n    return sorted(range(n, 0, -1))\n"
+
+
+def _profiled_project(tmp_path, profiler_cls):
+    project = tmp_path / "project"
+    project.mkdir()
+    file_path = project / "mod.py"
+    file_path.write_text(SOURCE)
+    namespace = {}
+    exec(compile(SOURCE, str(file_path), "exec"), namespace)
+    profiler = profiler_cls()
+    profiler.runcall(namespace["work"], 2000)
+    dump = tmp_path / "out.pstats"
+    profiler.dump_stats(str(dump))
+    return project, file_path, ProfileIndex(load_profiles([dump]), [file_path], project)
+
+
+def test_profile_index_cprofile(tmp_path):
+    _, file_path, index = _profiled_project(tmp_path, cProfile.Profile)
+    stats = index.block_stats(file_path, [{"name": "work", "line": 1}])[0]
+    assert stats["calls"] == 1
+    # The time spent in sorted() is credited to its caller
+    assert stats["hotness"] > 0
+
+
+def test_profile_index_pure_python_profile(tmp_path):
+    """The profile module stores plain call counts per caller, with no timing to fold."""
+    _, file_path, index = _profiled_project(tmp_path, profile.Profile)
+    stats = index.block_stats(file_path, [{"name": "work", "line": 1}])[0]
+    assert stats["calls"] == 1
@@ -0,0 +1,129 @@
+"""Unit tests for result_cache.py — 100% branch coverage."""
+import json
+
+from result_cache import ResultCache, split_units, unit_of, is_transient
+
+
+SOURCE = '''import re
+
+LIMIT = 3
+
+def _helper(x):
+    return shared(x)
+
+@decorator
+def shared(x):
+    return x
+
+def caller(x):
+    return other(x)
+
+def other(x):
+    return x
+
+class Box:
+    def get(self):
+        return self.value
+'''
+
+
+def _job(tmp_path, refactored=SOURCE, type_hints=None):
+    (tmp_path / "original.py").write_text(SOURCE)
+    (tmp_path / "refactored.py").write_text(refactored)
+    if type_hints is not None:
+        (tmp_path / "type_hints.json").write_text(type_hints)
+    return tmp_path
+
+
+# ---------------------------------------------------------------------------
+# split_units / unit_of / is_transient
+# ---------------------------------------------------------------------------
+
+def test_split_units():
+    units, (context, context_refs) = split_units(SOURCE)
+    assert sorted(units) == ["Box", "caller", "other", "shared"]
+    # Decorators belong to their unit; private helpers and constants to the context
+    assert units["shared"][0].startswith("@decorator\ndef shared")
+    assert "_helper" in context and "LIMIT = 3" in context and "def shared" not in context
+    assert "other" in units["caller"][1]
+    assert "value" in units["Box"][1]
+    assert "shared" in context_refs
+
+
+def test_split_units_redefinition_and_syntax_error():
+    units, _ = split_units("def f():\n    return 1\n\ndef f():\n    return 2\n")
+    assert units["f"][0] == "def f():\n    return 1\ndef f():\n    return 2\n"
+    assert split_units("def f(:\n") is None
+
+
+def test_unit_of():
+    assert unit_of("f") == "f"
+    assert unit_of("Box.get") == "Box"
+    assert unit_of("pkg/mod.py:Box.get") == "Box"
+
+
+def test_is_transient():
+    assert is_transient({"tool": "verify", "status": "SKIP", "error": "Timeout"})
+    assert is_transient({"tool": "verify", "status": "SKIP", "error": "Worker exited with code 9"})
+    assert is_transient({"tool": "benchmark", "status": "SKIP", "reason": "Worker Error: boom"})
+    assert not is_transient({"tool": "verify", "status": "SKIP", "error": "Unable to generate valid inputs"})
+    assert not is_transient({"tool": "verify", "status": "SKIP", "error": None})
+    assert not is_transient({"tool": "verify", "status": "FAIL", "error": "Timeout"})
+
+
+# ---------------------------------------------------------------------------
+# ResultCache
+# ---------------------------------------------------------------------------
+
+def test_job_keys_follow_references(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    job = _job(tmp_path)
+    keys = cache.job_keys(job)
+    assert sorted(keys) == ["Box", "caller", "other", "shared"]
+
+    # other is referenced by caller: changing it changes both keys, and nothing else
+    changed = cache.job_keys(_job(job, SOURCE.replace("def other(x):\n    return x", "def other(x):\n    return x + 0")))
+    assert [name for name in keys if keys[name] != changed[name]] == ["caller", "other"]
+
+    # shared is used by the context (_helper), so every unit depends on it
+    changed = cache.job_keys(_job(job, SOURCE.replace("def shared(x):\n    return x", "def shared(x):\n    return -x")))
+    assert all(keys[name] != changed[name] for name in keys)
+
+
+def test_job_keys_cover_type_hints_and_settings(tmp_path, monkeypatch):
+    job = _job(tmp_path)
+    keys = ResultCache(tmp_path / "cache").job_keys(job)
+    _job(job, type_hints='{"functions": {}}')
+    with_hints = ResultCache(tmp_path / "cache").job_keys(job)
+    assert keys["other"] != with_hints["other"]
+    monkeypatch.setenv("HYPOTHESIS_MAX_EXAMPLES", "5")
+    assert ResultCache(tmp_path / "cache").job_keys(job)["other"] != with_hints["other"]
+
+
+def test_job_keys_without_units(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    assert cache.job_keys(tmp_path) == {}
+    assert cache.job_keys(_job(tmp_path, "def f(:\n")) == {}
+
+
+def test_load_and_store(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    key = "ab" * 32
+    assert cache.load(key) is None
+    cache.store(key, [{"tool": "verify", "name": "f"}])
+    assert cache.load(key) == [{"tool": "verify", "name": "f"}]
+    assert not list((tmp_path / "cache" / "ab").glob("*.tmp"))
+
+    # Corrupt and unexpected entries are misses
+    (tmp_path / "cache" / "ab" / f"{key}.json").write_text("{not json")
+    assert cache.load(key) is None
+    (tmp_path / "cache" / "ab" / f"{key}.json").write_text(json.dumps({"a": 1}))
+    assert cache.load(key) is None
+
+
+def test_store_ignores_write_errors(tmp_path):
+    (tmp_path / "cache").write_text("a file, not a directory")
+    cache = ResultCache(tmp_path / "cache")
+    cache.store("ab" * 32, [])
+    assert cache.load("ab" * 32) is None
+
@@ -0,0 +1,78 @@
+"""Unit tests for symbol_table.py (persistent definitions, import edges and re-exports)."""
+from symbol_table import SymbolTable
+
+
+FILES = {
+    "pkg/__init__.py": "from .core import Engine\nfrom .util import *\n",
+    "pkg/core.py": "class Engine:\n    pass\n\ndef helper():\n    pass\n\ndef _private():\n    pass\n",
+    "pkg/util.py": "def tool():\n    pass\n",
+    "app.py": "from pkg import Engine\n\nEngine()\n",
+}
+
+
+def _project(tmp_path):
+    root = tmp_path / "proj"
+    for rel, code in FILES.items():
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_text(code)
+    return root
+
+
+def _build(table, root):
+    paths = sorted(root.rglob("*.py"))
+    for path in paths:
+        table.update_file(path)
+    table.prune(paths)
+
+
+def test_reexports_and_star_imports(tmp_path):
+    root = _project(tmp_path)
+    with SymbolTable(tmp_path / "symbols.db", root) as table:
+        _build(table, root)
+        assert table.reexports() == {"pkg/__init__.py": [("*", "pkg/util.py"), ("Engine", "pkg/core.py")]}
+        # A star import uses every public name of the module; private names never count
+        assert table.used_outside() == {root / "pkg/core.py": {"Engine"}, root / "pkg/util.py": {"tool"}}
+        assert table.users_of("Engine") == ["app.py", "pkg/__init__.py"]
+        assert table.users_of("Engine", root / "pkg/core.py") == ["pkg/__init__.py"]
+        assert table.definitions_of("Engine") == [{"path": "pkg/core.py", "type": "Class", "line": 1, "end_line": 2}]
+
+
+def test_incremental_updates(tmp_path):
+    root = _project(tmp_path)
+    db = tmp_path / "symbols.db"
+    with SymbolTable(db, root) as table:
+        _build(table, root)
+        table.resolve()
+
+    with SymbolTable(db, root) as table:
+        assert not table.is_empty()
+        assert not table.update_file(root / "pkg/core.py")
+        (root / "app.py").write_text("from pkg.core import helper\nfrom pkg.extra import thing\n\nhelper(thing)\n")
+        assert table.update_file(root / "app.py")
+        # Only the changed file's edges are resolved again
+        assert table.conn.execute("SELECT path FROM files WHERE resolved = 0").fetchall() == [("app.py",)]
+        assert table.used_outside()[root / "pkg/core.py"] == {"Engine", "helper"}
+        assert table.users_of("Engine") == ["pkg/__init__.py"]
+
+        # Adding a file changes the module index, so the unchanged app.py is resolved again
+        assert root / "pkg/extra.py" not in table.used_outside()
+        (root / "pkg/extra.py").write_text("from .util import tool\n\ndef thing():\n    pass\n")
+        assert table.update_file(root / "pkg/extra.py")
+        assert table.used_outside()[root / "pkg/extra.py"] == {"thing"}
+        assert table.users_of("tool") == ["pkg/__init__.py", "pkg/extra.py"]
+
+        (root / "pkg/extra.py").unlink()
+        assert table.update_file(root / "pkg/extra.py")
+        (root / "app.py").unlink()
+        assert table.prune(sorted(root.rglob("*.py"))) == ["app.py"]
+        assert table.users_of("tool") == ["pkg/__init__.py"]
+        assert root / "pkg/core.py" in table.used_outside()
+
+
+def test_other_root_starts_empty(tmp_path):
+    root = _project(tmp_path)
+    db = tmp_path / "symbols.db"
+    with SymbolTable(db, root) as table:
+        _build(table, root)
+    with SymbolTable(db, root / "pkg") as table:
+        assert table.is_empty()
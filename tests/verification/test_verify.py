@@ -3,6 +3,7 @@ import inspect
 import multiprocessing
 import queue as queue_mod
 import os
+import time
 import pytest
 from unittest.mock import patch, MagicMock
 from pathlib import Path
@@ -24,7 +25,10 @@ from verify import (
     combine_results,
     worker_verify_function,
     worker_verify_class_method,
+    verify_files,
+    Mismatch,
 )
+from common import read_results, RESULTS_ENV_VAR
 
 FIXTURES = Path(__file__).parent / "fixtures"
 
@@ -402,6 +406,12 @@ def test_run_naive_fuzzing_fail():
     assert result.error is not None
 
 
+def test_run_naive_fuzzing_fail_counterexample():
+    result = run_naive_fuzzing(lambda x: 1, lambda x: 2)
+    assert result.counterexample.startswith("input [")
+    assert result.error.startswith(f"Mismatch for {result.counterexample}: ")
+
+
 def test_run_naive_fuzzing_error():
     with patch.object(NaiveRandomFuzzer, "fuzz", side_effect=RuntimeError("boom")):
         result = run_naive_fuzzing(lambda x: x, lambda x: x)
@@ -490,6 +500,36 @@ def test_hypothesis_verification_both_raise(monkeypatch):
 # combine_results
 # ---------------------------------------------------------------------------
 
+def test_mismatch_carries_counterexample():
+    with pytest.raises(AssertionError) as exc_info:
+        check_result_equivalence(1, None, 2, None, "input (0,)")
+    assert isinstance(exc_info.value, Mismatch)
+    assert exc_info.value.counterexample == "input (0,)"
+    assert str(exc_info.value) == "Mismatch for input (0,): Original=1, Refactored=2"
+
+
+def test_hypothesis_fail_counterexample():
+    def orig(x: int): return x
+    def ref(x: int): return x + (x > 5)
+    result = run_hypothesis_verification(orig, ref)
+    assert result.status == "FAIL"
+    # The shrunk input Hypothesis reports
+    assert result.counterexample == "input (6,)"
+
+
+def test_combine_emits_records(tmp_path, monkeypatch):
+    path = tmp_path / "results.jsonl"
+    monkeypatch.setenv(RESULTS_ENV_VAR, str(path))
+    combine_results("f", VerifyResult("PASS", 0.1), VerifyResult("FAIL", 0.2, "Mismatch for input [1]: x", "input [1]"))
+    combine_results("g", VerifyResult("PASS", 0.1), VerifyResult("SKIP", 0.1))
+    combine_results("h", VerifyResult("SKIP", 0.1, "h-reason"), VerifyResult("SKIP", 0.1))
+    f, g, h = read_results(path)
+    assert f == {"tool": "verify", "name": "f", "status": "FAIL", "duration": 0.3,
+                 "error": "Mismatch for input [1]: x", "counterexample": "input [1]"}
+    assert (g["status"], g["error"]) == ("PASS", None)
+    assert (h["status"], h["error"]) == ("SKIP", "Hypothesis: h-reason")
+
+
 def test_combine_hyp_fail_with_error(capsys):
     hyp = VerifyResult("FAIL", 0.1, "assertion msg")
     naive = VerifyResult("PASS", 0.1)
@@ -737,3 +777,121 @@ def test_worker_verify_class_method_load_error(capsys):
     result = q.get_nowait()
     assert result == "SKIPPED"
     assert "[SKIP]" in capsys.readouterr().out
+
+
+# ---------------------------------------------------------------------------
+# verify_files / main
+# ---------------------------------------------------------------------------
+
+def _job_paths(name):
+    return str(FIXTURES / name / "original.py"), str(FIXTURES / name / "refactored.py")
+
+
+def test_verify_files_pass_skips_private(capfd):
+    assert verify_files(*_job_paths("job_pass_private")) is True
+    out = capfd.readouterr().out
+    assert "[PASS] public_func" in out
+    assert "_helper" not in out
+
+
+def test_verify_files_fail(capfd):
+    assert verify_files(*_job_paths("job_fail_wrong_result")) is False
+    assert "[FAIL] add_one" in capfd.readouterr().out
+
+
+def test_verify_files_class_methods(capfd):
+    assert verify_files(*_job_paths("job_pass_class")) is True
+    assert "[PASS] Counter.increment" in capfd.readouterr().out
+
+
+def test_verify_files_skip(capfd):
+    assert verify_files(*_job_paths("job_pass_class"), skip={"Counter"}) is True
+    assert "Counter.increment" not in capfd.readouterr().out
+
+
+def test_verify_files_load_error(capsys, tmp_path):
+    (tmp_path / "refactored.py").write_text("def broken(:\n")
+    orig = str(FIXTURES / "job_pass_simple" / "original.py")
+    assert verify_files(orig, str(tmp_path / "refactored.py")) is False
+    out = capsys.readouterr().out
+    assert "[FAIL] refactored.py" in out
+    assert "Could not load modules" in out
+
+
+def _hang(orig_path, ref_path, func_name, config, result_queue):
+    import time
+    time.sleep(30)
+
+
+def _exit_silently(orig_path, ref_path, func_name, config, result_queue):
+    pass
+
+
+def test_verify_files_timeout(capsys, tmp_path, monkeypatch):
+    monkeypatch.setenv(RESULTS_ENV_VAR, str(tmp_path / "results.jsonl"))
+    with patch("verify.worker_verify_function", _hang):
+        assert verify_files(*_job_paths("job_pass_simple"), timeout=0.5) is True
+    assert "[SKIP] add_one (0.5000s) (Timeout)" in capsys.readouterr().out
+    record = read_results(tmp_path / "results.jsonl")[0]
+    assert (record["name"], record["status"], record["error"]) == ("add_one", "SKIP", "Timeout")
+
+
+def test_verify_files_records_from_workers(capfd, tmp_path, monkeypatch):
+    """Records written by the worker processes all reach the result file."""
+    monkeypatch.setenv(RESULTS_ENV_VAR, str(tmp_path / "results.jsonl"))
+    monkeypatch.setenv("HYPOTHESIS_MAX_EXAMPLES", "10")
+    assert verify_files(*_job_paths("job_pass_class")) is True
+    records = read_results(tmp_path / "results.jsonl")
+    assert {(r["name"], r["status"]) for r in records} == {("Counter.increment", "PASS")}
+
+
+def test_verify_files_worker_without_result(capsys):
+    with patch("verify.worker_verify_function", _exit_silently):
+        verify_files(*_job_paths("job_pass_simple"))
+    assert "Worker exited with code 0" in capsys.readouterr().out
+
+
+def _slow_pass(orig_path, ref_path, func_name, config, result_queue):
+    import time
+    time.sleep(0.4)
+    result_queue.put("SUCCESS")
+
+
+def test_verify_files_bounds_processes(tmp_path, monkeypatch):
+    """Functions run one at a time here, and each gets the whole timeout from its own start."""
+    source = "def a(x: int) -> int:\n    return x\n\ndef b(x: int) -> int:\n    return x\n"
+    (tmp_path / "original.py").write_text(source)
+    (tmp_path / "refactored.py").write_text(source)
+    monkeypatch.setenv(RESULTS_ENV_VAR, str(tmp_path / "results.jsonl"))
+    monkeypatch.setenv(verify.PROCESSES_ENV_VAR, "1")
+    started = []
+    real_process = verify.multiprocessing.Process
+
+    def recording_process(*args, **kwargs):
+        started.append(time.time())
+        return real_process(*args, **kwargs)
+
+    with patch("verify.worker_verify_function", _slow_pass), patch("verify.multiprocessing.Process", recording_process):
+        assert verify_files(str(tmp_path / "original.py"), str(tmp_path / "refactored.py"), timeout=0.7) is True
+    assert len(started) == 2 and started[1] - started[0] >= 0.35
+    assert read_results(tmp_path / "results.jsonl") == []
+
+
+def test_main_usage(monkeypatch, capsys):
+    monkeypatch.setattr("sys.argv", ["verify.py"])
+    with pytest.raises(SystemExit) as exc_info:
+        verify.main()
+    assert exc_info.value.code == 2
+    assert "Usage" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("passed, code", [(True, 0), (False, 1)])
+def test_main_exit_code(monkeypatch, passed, code):
+    orig, ref = _job_paths("job_pass_type_hints")
+    monkeypatch.setattr("sys.argv", ["verify.py", orig, ref])
+    with patch("verify.verify_files", return_value=passed) as mock_verify:
+        with pytest.raises(SystemExit) as exc_info:
+            verify.main()
+    assert exc_info.value.code == code
+    # type_hints.json next to the original is passed on as the config
+    assert mock_verify.call_args[0][2] == {"functions": {"multiply": ["int", "int"]}}
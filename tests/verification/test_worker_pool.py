@@ -0,0 +1,170 @@
+"""Unit tests for worker_pool.py — 100% branch coverage."""
+import multiprocessing
+import os
+import sys
+import time
+
+import pytest
+
+from worker_pool import WorkerPool, capture_output, _worker_loop
+
+
+def _square(x):
+    return x * x
+
+
+def _fail(x):
+    raise ValueError(f"bad {x}")
+
+
+def _die(x):
+    if x == "die":
+        os._exit(3)
+    return x
+
+
+def _child_print():
+    print("from child")
+
+
+# ---------------------------------------------------------------------------
+# capture_output
+# ---------------------------------------------------------------------------
+
+def test_capture_output_collects_prints_and_result():
+    def noisy(a, b):
+        print("to stdout")
+        print("to stderr", file=sys.stderr)
+        return a + b
+
+    text, result = capture_output(noisy, 1, 2)
+    assert result == 3
+    assert "to stdout" in text
+    assert "to stderr" in text
+
+
+def test_capture_output_collects_child_processes():
+    def spawn():
+        p = multiprocessing.Process(target=_child_print)
+        p.start()
+        p.join()
+
+    text, _ = capture_output(spawn)
+    assert "from child" in text
+
+
+def test_capture_output_restores_streams_on_error():
+    stdout = sys.stdout
+
+    def boom():
+        raise RuntimeError("x")
+
+    with pytest.raises(RuntimeError):
+        capture_output(boom)
+    assert sys.stdout is stdout
+
+
+# ---------------------------------------------------------------------------
+# _worker_loop (run in-process)
+# ---------------------------------------------------------------------------
+
+def test_worker_loop_handles_jobs_until_sentinel():
+    parent, child = multiprocessing.Pipe()
+    parent.send(("a", (3,)))
+    parent.send(("b", (4,)))
+    parent.send(None)
+    _worker_loop(_square, child)
+    assert parent.recv() == ("a", 9, None)
+    assert parent.recv() == ("b", 16, None)
+
+
+def test_worker_loop_reports_errors():
+    parent, child = multiprocessing.Pipe()
+    parent.send(("a", (1,)))
+    parent.send(None)
+    _worker_loop(_fail, child)
+    assert parent.recv() == ("a", None, "ValueError: bad 1")
+
+
+def test_worker_loop_stops_when_pipe_closes():
+    parent, child = multiprocessing.Pipe()
+    parent.close()
+    _worker_loop(_square, child)  # EOFError ends the loop
+
+
+# ---------------------------------------------------------------------------
+# WorkerPool
+# ---------------------------------------------------------------------------
+
+def test_pool_inline():
+    with WorkerPool(_square, 0) as pool:
+        pool.submit("a", 2)
+        pool.submit("b", 3)
+        assert list(pool.results()) == [("a", 4, None), ("b", 9, None)]
+
+
+def test_pool_processes():
+    with WorkerPool(_square, 2) as pool:
+        for i in range(6):
+            pool.submit(i, i)
+        results = sorted(pool.results())
+    assert results == [(i, i * i, None) for i in range(6)]
+
+
+def test_pool_more_workers_than_jobs():
+    with WorkerPool(_square, 2) as pool:
+        pool.submit("a", 5)
+        assert list(pool.results()) == [("a", 25, None)]
+
+
+def test_pool_reports_handler_errors():
+    with WorkerPool(_fail, 1) as pool:
+        pool.submit("a", 1)
+        assert list(pool.results()) == [("a", None, "ValueError: bad 1")]
+
+
+def test_pool_replaces_dead_workers():
+    with WorkerPool(_die, 1) as pool:
+        pool.submit("a", "die")
+        pool.submit("b", "ok")
+        results = list(pool.results())
+    assert ("a", None, "Worker exited with code 3") in results
+    assert ("b", "ok", None) in results
+
+
+def test_pool_restarts_idle_dead_worker():
+    pool = WorkerPool(_square, 1)
+    try:
+        pool._workers[0].process.terminate()
+        pool._workers[0].process.join()
+        pool.submit("a", 4)
+        assert list(pool.results()) == [("a", 16, None)]
+    finally:
+        pool.close()
+
+
+def test_pool_result_then_exit():
+    """A worker whose pipe closes without a result is reported once it is gone."""
+    pool = WorkerPool(_square, 1)
+    try:
+        worker = pool._workers[0]
+        worker.job = ("a", (1,))
+        # Ask the worker to stop without ever sending a result: its pipe closes (EOF)
+        worker.conn.send(None)
+        results = list(pool.results())
+        assert results[0][0] == "a"
+        assert results[0][2].startswith("Worker exited with code")
+    finally:
+        pool.close()
+
+
+def test_pool_close_tolerates_dead_and_stuck_workers():
+    pool = WorkerPool(time.sleep, 2)
+    dead, stuck = pool._workers
+    dead.process.terminate()
+    dead.process.join()
+    # The stuck worker is busy past the grace period, so it gets terminated
+    stuck.conn.send(("a", (30,)))
+    pool.close(timeout=0.2)
+    assert not stuck.process.is_alive()
+    assert pool._workers == []